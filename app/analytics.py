@@ -0,0 +1,217 @@
+"""
+Analítica transversal de l'univers: correlacions, betes i agregats per sector
+
+Tot es calcula sobre un panell alineat per dates (tickers × dates) construït un cop
+per versió de dades a partir del magatzem de preus. Les dates que falten en un ticker
+queden com a NaN: les correlacions fan servir només els dies que tenen els dos tickers
+(per parelles, amb productes de matrius) i els rendiments per període usen l'últim
+tancament conegut.
+"""
+
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.indicators import RETURN_TOLERANCE_DAYS
+from app.series import PriceSeries, to_day
+
+# Mínim de dies en comú perquè una correlació o una beta tinguin sentit
+MIN_PERIODS = 20
+
+# Finestra per defecte de les betes mòbils (dies bursàtils)
+BETA_WINDOW = 60
+
+# Benchmark per defecte: mitjana equiponderada dels rendiments de l'univers
+MARKET = "market"
+
+# Horitzons dels rendiments per sector (dies naturals; YTD es calcula a part)
+SECTOR_HORIZONS: Dict[str, int] = {"1d": 1, "1w": 7, "1m": 30, "1y": 365}
+
+
+class PricePanel:
+    """Tancaments alineats per dates: matriu (tickers × dates) amb NaN on no hi ha barra"""
+
+    def __init__(self, tickers: List[str], dates: np.ndarray, close: np.ndarray):
+        self.tickers = tickers
+        self.dates = dates
+        self.close = close
+        self.index = {ticker: i for i, ticker in enumerate(tickers)}
+
+    @classmethod
+    def from_series(cls, series_by_ticker: Dict[str, PriceSeries]) -> "PricePanel":
+        """Uneix les dates de totes les sèries i col·loca cada tancament a la seva columna"""
+        tickers = [ticker for ticker, series in series_by_ticker.items() if series]
+        if not tickers:
+            return cls([], np.empty(0, dtype="datetime64[D]"), np.empty((0, 0)))
+
+        days = {ticker: series_by_ticker[ticker].dates.astype("datetime64[D]") for ticker in tickers}
+        dates = np.unique(np.concatenate(list(days.values())))
+        close = np.full((len(tickers), len(dates)), np.nan)
+        for row, ticker in enumerate(tickers):
+            close[row, np.searchsorted(dates, days[ticker])] = series_by_ticker[ticker].close
+        return cls(tickers, dates, close)
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def filled(self) -> np.ndarray:
+        """Tancaments amb l'últim valor conegut propagat cap endavant (NaN abans de la primera barra)"""
+        valid = ~np.isnan(self.close)
+        positions = np.where(valid, np.arange(self.close.shape[1]), 0)
+        positions = np.maximum.accumulate(positions, axis=1)
+        return np.take_along_axis(self.close, positions, axis=1)
+
+    def returns(self) -> np.ndarray:
+        """Rendiments diaris simples (tickers × dates-1); NaN si falta algun dels dos dies"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.close[:, 1:] / self.close[:, :-1] - 1.0
+
+    def as_of(self) -> Optional[str]:
+        return str(self.dates[-1]) if len(self.dates) else None
+
+
+def correlation_matrix(returns: np.ndarray, min_periods: int = MIN_PERIODS) -> np.ndarray:
+    """
+    Correlació de Pearson per parelles amb els dies que tenen tots dos tickers
+    Sumes per parella com a productes de matrius amb la màscara de dies vàlids
+    """
+    valid = ~np.isnan(returns)
+    mask = valid.astype(float)
+    x = np.where(valid, returns, 0.0)
+
+    n = mask @ mask.T
+    sum_x = x @ mask.T          # Suma de x_i als dies en què j també té dada
+    sum_xx = (x * x) @ mask.T
+    sum_xy = x @ x.T
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = n * sum_xy - sum_x * sum_x.T
+        var = (n * sum_xx - sum_x * sum_x) * (n * sum_xx - sum_x * sum_x).T
+        corr = cov / np.sqrt(var)
+    corr[n < min_periods] = np.nan
+    np.fill_diagonal(corr, np.where(np.diag(n) >= min_periods, 1.0, np.nan))
+    return np.clip(corr, -1.0, 1.0)
+
+
+def benchmark_returns(panel: PricePanel, returns: np.ndarray, benchmark: str = MARKET) -> np.ndarray:
+    """Rendiments del benchmark: un ticker de l'univers o la mitjana equiponderada (market)"""
+    if benchmark == MARKET:
+        counts = (~np.isnan(returns)).sum(axis=0)
+        totals = np.nansum(returns, axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(counts > 0, totals / counts, np.nan)
+    if benchmark not in panel.index:
+        return np.full(returns.shape[1], np.nan)  # Benchmark sense dades
+    return returns[panel.index[benchmark]]
+
+
+def rolling_beta(
+    returns: np.ndarray,
+    bench: np.ndarray,
+    window: int = BETA_WINDOW,
+    min_periods: int = MIN_PERIODS
+) -> np.ndarray:
+    """
+    Beta mòbil cov(r, b) / var(b) de cada ticker (tickers × dates-1)
+    Finestres per diferència de sumes acumulades, només amb dies on hi ha les dues dades
+    """
+    valid = ~np.isnan(returns) & ~np.isnan(bench)
+    r = np.where(valid, returns, 0.0)
+    b = np.where(valid, bench, 0.0)
+
+    def window_sum(values: np.ndarray) -> np.ndarray:
+        sums = np.cumsum(np.pad(values, ((0, 0), (1, 0))), axis=1)
+        start = np.maximum(np.arange(1, values.shape[1] + 1) - window, 0)
+        return sums[:, 1:] - sums[:, start]
+
+    n = window_sum(valid.astype(float))
+    sum_r, sum_b = window_sum(r), window_sum(b)
+    sum_rb, sum_bb = window_sum(r * b), window_sum(b * b)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        beta = (n * sum_rb - sum_r * sum_b) / (n * sum_bb - sum_b * sum_b)
+    beta[n < min_periods] = np.nan
+    return beta
+
+
+def latest(values: np.ndarray) -> np.ndarray:
+    """Últim valor no NaN de cada fila"""
+    if values.shape[1] == 0:
+        return np.full(values.shape[0], np.nan)
+    valid = ~np.isnan(values)
+    positions = np.where(valid.any(axis=1), values.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1), 0)
+    return np.where(valid.any(axis=1), values[np.arange(values.shape[0]), positions], np.nan)
+
+
+def horizon_returns(panel: PricePanel) -> Dict[str, np.ndarray]:
+    """Rendiment (%) de cada ticker per horitzó, amb els tancaments propagats fins a l'última data"""
+    if not len(panel.dates):
+        return {}
+    filled = panel.filled()
+    as_of = panel.dates[-1]
+    targets = {name: as_of - np.timedelta64(days, "D") for name, days in SECTOR_HORIZONS.items()}
+    targets["ytd"] = to_day(date(int(str(as_of)[:4]) - 1, 12, 31))
+
+    last = filled[:, -1]
+    results = {}
+    for name, target in targets.items():
+        column = int(np.searchsorted(panel.dates, target, side="right")) - 1
+        if column < 0 and int((panel.dates[0] - target).astype(int)) <= RETURN_TOLERANCE_DAYS:
+            column = 0  # La sèrie comença just després de la data de referència (p. ex. 1Y)
+        base = filled[:, column] if column >= 0 else np.full(len(panel), np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            results[name] = (last / base - 1.0) * 100
+    return results
+
+
+def sector_aggregates(
+    panel: PricePanel,
+    sectors: Dict[str, str],
+    betas: Optional[np.ndarray] = None
+) -> List[Dict]:
+    """Rendiments mitjans (equiponderats) i beta mitjana per sector"""
+    if not len(panel):
+        return []
+    names = np.array([sectors.get(ticker, "") for ticker in panel.tickers])
+    labels, groups = np.unique(names, return_inverse=True)
+    returns = horizon_returns(panel)
+    columns = {f"return_{name}_pct": values for name, values in returns.items()}
+    if betas is not None:
+        columns["avg_beta"] = betas
+
+    # Mitjana per grup ignorant NaN: sumes i recomptes amb bincount
+    means = {}
+    for name, values in columns.items():
+        valid = ~np.isnan(values)
+        totals = np.bincount(groups, weights=np.where(valid, values, 0.0), minlength=len(labels))
+        counts = np.bincount(groups, weights=valid.astype(float), minlength=len(labels))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            means[name] = np.where(counts > 0, totals / counts, np.nan)
+
+    return [
+        {
+            "sector": str(label),
+            "companies": int((groups == i).sum()),
+            "tickers": [panel.tickers[j] for j in np.flatnonzero(groups == i)],
+            **{name: nan_to_none(values[i]) for name, values in means.items()}
+        }
+        for i, label in enumerate(labels)
+    ]
+
+
+def nan_to_none(value) -> Optional[float]:
+    """Escalar per a JSON (NaN -> None)"""
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def matrix_to_lists(matrix: np.ndarray) -> List[List[Optional[float]]]:
+    """Matriu a llistes per a JSON (NaN -> None)"""
+    return [[None if np.isnan(v) else v for v in row] for row in matrix.tolist()]
+
+
+def panel_window(panel: PricePanel) -> Tuple[Optional[str], Optional[str]]:
+    """Primera i última data del panell"""
+    if not len(panel.dates):
+        return None, None
+    return str(panel.dates[0]), str(panel.dates[-1])
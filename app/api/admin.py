@@ -0,0 +1,44 @@
+from fastapi import APIRouter
+from app.datasets import datasets
+from app.db import db
+from app.page_cache import api_cache, page_cache
+from app.scheduler import scheduler, PREWARM_ENABLED
+
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+
+@router.get("/scheduler")
+async def get_scheduler_status():
+    """Estat del planificador de precalentament: cua, tasca en curs i últimes execucions"""
+    return {
+        "enabled": PREWARM_ENABLED,
+        **scheduler.status()
+    }
+
+
+@router.get("/datasets")
+async def get_datasets_status():
+    """Estat dels datasets regionals en memòria"""
+    return {
+        "reload_seconds": datasets.reload_seconds,
+        "datasets": datasets.status()
+    }
+
+
+@router.post("/datasets/reload")
+async def reload_datasets():
+    """Comprova ara si han canviat els fitxers de dades regionals i els recarrega"""
+    reloaded = await db.run_blocking(datasets.check_for_changes)
+    return {
+        "reloaded": reloaded,
+        "datasets": datasets.status()
+    }
+
+
+@router.get("/page-cache")
+async def get_page_cache_status():
+    """Comptadors dels caches de respostes (renders, encerts i respostes 304)"""
+    return {
+        "pages": page_cache.stats(),
+        "api": api_cache.stats()
+    }
@@ -0,0 +1,102 @@
+from fastapi import APIRouter, HTTPException, Request
+
+from app.analytics import (
+    BETA_WINDOW, MARKET, MIN_PERIODS, benchmark_returns, correlation_matrix, latest,
+    matrix_to_lists, nan_to_none, panel_window, rolling_beta, sector_aggregates
+)
+from app.db import db
+from app.page_cache import api_cache
+from app.responses import FastJSONResponse
+
+router = APIRouter(prefix="/api/analytics", tags=["analytics"])
+
+
+def _validate_beta_params(benchmark: str, window: int):
+    """Benchmark de l'univers (o market) i finestra mínima per a les betes"""
+    if benchmark != MARKET and db.get_company_by_ticker(benchmark) is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Benchmark '{benchmark}' no vàlid. Usa '{MARKET}' o un ticker de l'univers"
+        )
+    if window < MIN_PERIODS:
+        raise HTTPException(status_code=400, detail=f"'window' ha de ser com a mínim {MIN_PERIODS}")
+
+
+@router.get("/correlation")
+async def get_correlation(request: Request, benchmark: str = MARKET, window: int = BETA_WINDOW):
+    """
+    Matriu de correlacions dels rendiments diaris de tot l'univers i beta mòbil de
+    cada ticker respecte a `benchmark` (un ticker o `market`, la mitjana equiponderada)
+    sobre els últims `window` dies bursàtils
+    """
+    _validate_beta_params(benchmark, window)
+    try:
+        version = db.get_data_version()
+        panel = await db.run_blocking(db.get_price_panel)
+
+        def compute():
+            returns = panel.returns()
+            betas = latest(rolling_beta(returns, benchmark_returns(panel, returns, benchmark), window))
+            start, end = panel_window(panel)
+            return {
+                "start": start,
+                "end": end,
+                "tickers": panel.tickers,
+                "matrix": matrix_to_lists(correlation_matrix(returns)),
+                "benchmark": benchmark,
+                "window": window,
+                "betas": {ticker: nan_to_none(beta) for ticker, beta in zip(panel.tickers, betas)}
+            }
+
+        async def render():
+            return FastJSONResponse(await db.run_blocking(compute))
+
+        return await api_cache.respond(request, f"analytics:correlation:{benchmark}:{window}", version, render)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error calculant correlacions: {str(e)}")
+
+
+@router.get("/sectors")
+async def get_sectors(request: Request, benchmark: str = MARKET, window: int = BETA_WINDOW):
+    """
+    Agregats per sector: rendiments mitjans 1D/1W/1M/YTD/1Y (equiponderats) i beta
+    mitjana respecte a `benchmark` sobre els últims `window` dies bursàtils
+    """
+    _validate_beta_params(benchmark, window)
+    try:
+        version = db.get_data_version()
+        panel = await db.run_blocking(db.get_price_panel)
+        sectors = {c.ticker: c.sector for c in db.get_companies()}
+
+        def compute():
+            returns = panel.returns()
+            betas = latest(rolling_beta(returns, benchmark_returns(panel, returns, benchmark), window))
+            start, end = panel_window(panel)
+            return {
+                "start": start,
+                "end": end,
+                "benchmark": benchmark,
+                "window": window,
+                "sectors": sector_aggregates(panel, sectors, betas)
+            }
+
+        async def render():
+            return FastJSONResponse(await db.run_blocking(compute))
+
+        return await api_cache.respond(request, f"analytics:sectors:{benchmark}:{window}", version, render)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error calculant agregats per sector: {str(e)}")
+
+
+@router.get("/highs-lows")
+async def get_highs_lows(request: Request):
+    """Empreses de l'univers que a l'última barra marquen un nou màxim o mínim de 52 setmanes"""
+    try:
+        version = db.get_data_version()
+
+        async def render():
+            return FastJSONResponse(await db.run_blocking(db.scan_highs_lows))
+
+        return await api_cache.respond(request, "analytics:highs-lows", version, render)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error cercant nous màxims i mínims: {str(e)}")
@@ -1,17 +1,89 @@
-from fastapi import APIRouter, HTTPException
+from datetime import datetime
+
+from fastapi import APIRouter, HTTPException, Request
 from typing import List, Optional
-from app.models import CompanyKPI, SeriesResponse, CompanyDetail, PriceData
+from app.models import CompanyKPI, SeriesResponse, CompanyDetail, IndicatorsResponse
 from app.db import db, REAL_DATA_AVAILABLE
+from app.downsample import METHODS, SERIES_MAX_POINTS, downsample
+from app.indicators import compute_indicator_series
+from app.page_cache import api_cache
+from app.responses import FastJSONResponse
+from app.screener import SCREENER_MAX_LIMIT, parse_sort, split_values
+from app.series import DAILY_INTERVAL, VALID_INTERVALS, VALID_RANGES
+from app.wire import FORMATS, binary_response, columnar_response, negotiate_format
+from app.services.memory_cache import memory_cache
 
 router = APIRouter(prefix="/api", tags=["companies"])
 
 
-@router.get("/companies", response_model=List[CompanyKPI])
-async def get_companies():
-    """Retorna llista d'empreses amb KPIs calculats"""
+@router.get("/companies", responses={200: {"model": List[CompanyKPI]}})
+async def get_companies(
+    request: Request,
+    exchange: Optional[str] = None,
+    sector: Optional[str] = None,
+    hq_province: Optional[str] = None,
+    q: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_change: Optional[float] = None,
+    max_change: Optional[float] = None,
+    min_mkt_cap: Optional[float] = None,
+    max_mkt_cap: Optional[float] = None,
+    sort: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None
+):
+    """
+    Retorna llista d'empreses amb KPIs calculats
+    Filtres opcionals (resolts amb els índexs del cercador, vegeu app/screener.py):
+    `exchange`, `sector`, `hq_province` (llistes separades per comes), `q` (nom o ticker),
+    rangs `min_`/`max_` de `price`, `change` (%) i `mkt_cap`
+    `sort`: camp d'ordenació (`-camp` descendent); `limit` i `cursor` per paginar
+    (el cursor de la pàgina següent va a la capçalera X-Next-Cursor; el total a X-Total-Count)
+    """
     try:
-        companies = db.get_company_kpis()
-        return companies
+        sort_field, descending = parse_sort(sort)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if limit is not None and not 1 <= limit <= SCREENER_MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"'limit' ha d'estar entre 1 i {SCREENER_MAX_LIMIT}")
+    ranges = {
+        field: (low, high)
+        for field, low, high in (
+            ("last_price", min_price, max_price),
+            ("chng_1d_pct", min_change, max_change),
+            ("mkt_cap", min_mkt_cap, max_mkt_cap)
+        )
+        if low is not None or high is not None
+    }
+    categories = {
+        field: sorted(split_values(value))
+        for field, value in (("exchange", exchange), ("sector", sector), ("hq_province", hq_province))
+        if value
+    }
+    
+    try:
+        version = db.get_data_version()
+        
+        # Els KPIs ja són models validats: es codifiquen un cop per versió i consulta, sense response_model
+        async def render():
+            index = await db.aget_screener_index()
+            mask = index.select(categories, ranges, q)
+            try:
+                rows, next_cursor = index.page(mask, sort_field, descending, limit, cursor)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            response = FastJSONResponse([c.model_dump() for c in rows])
+            response.headers["X-Total-Count"] = str(int(mask.sum()))
+            if next_cursor:
+                response.headers["X-Next-Cursor"] = next_cursor
+            return response
+        
+        # Clau a partir dels valors ja validats (l'ordre dels paràmetres a la URL no compta)
+        key = f"companies:{categories}:{ranges}:{q}:{sort_field}:{descending}:{limit}:{cursor}"
+        return await api_cache.respond(request, key, version, render)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error carregant empreses: {str(e)}")
 
@@ -26,21 +98,17 @@ async def get_company_detail(ticker: str):
             raise HTTPException(status_code=404, detail=f"Empresa {ticker} no trobada")
         
         # Calcular KPIs
-        kpis = db.get_company_kpis()
-        company_kpi = next((kpi for kpi in kpis if kpi.ticker == ticker), None)
+        company_kpi = await db.aget_company_kpi(ticker)
         
         if not company_kpi:
             raise HTTPException(status_code=404, detail=f"Dades KPI per {ticker} no trobades")
         
-        # Obtenir últimes dades de preus
-        prices = db.get_price_data(ticker)
-        if not prices:
+        # Obtenir últimes dades de preus (barra més recent, sense ordenar)
+        prices = await db.aget_price_data(ticker)
+        latest_data = prices.latest()
+        if latest_data is None:
             raise HTTPException(status_code=404, detail=f"Dades de preus per {ticker} no trobades")
         
-        # Ordenar per data (més recent primer)
-        prices.sort(key=lambda x: x.date, reverse=True)
-        latest_data = prices[0]
-        
         return CompanyDetail(
             company=company_kpi,
             latest_data=latest_data
@@ -52,28 +120,188 @@ async def get_company_detail(ticker: str):
         raise HTTPException(status_code=500, detail=f"Error carregant detalls de {ticker}: {str(e)}")
 
 
+@router.get("/companies/{ticker}/indicators", response_model=IndicatorsResponse)
+async def get_company_indicators(request: Request, ticker: str, series: bool = False):
+    """
+    Indicadors tècnics a l'última barra: SMA 20/50/200, EMA 12/26, RSI 14, volatilitat
+    anualitzada de 20 dies, drawdown i rendiments 1W/1M/YTD/1Y
+    `series=true` afegeix les sèries completes en format columnar (per a gràfics)
+    """
+    try:
+        company = db.get_company_by_ticker(ticker)
+        if not company:
+            raise HTTPException(status_code=404, detail=f"Empresa {ticker} no trobada")
+        
+        # Versió abans de llegir (vegeu la ruta de sèries)
+        version = db.get_data_version([ticker])
+        indicators = await db.aget_company_indicators(ticker)
+        if indicators is None:
+            raise HTTPException(status_code=404, detail=f"Dades de preus per {ticker} no trobades")
+        
+        async def render():
+            payload = indicators.model_dump()
+            if series:
+                prices = await db.aget_price_data(ticker)
+                payload["series"] = await db.run_blocking(compute_indicator_series, prices)
+            return FastJSONResponse(payload)
+        
+        return await api_cache.respond(request, f"indicators:{ticker}:{series}", version, render)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error calculant indicadors de {ticker}: {str(e)}")
+
+
+@router.get("/companies/{ticker}/extremes")
+async def get_company_extremes(ticker: str, windows: str = "5,20,60,252"):
+    """
+    Màxim i mínim de les últimes N barres per a cada finestra de `windows` (separades per comes)
+    Cada consulta és O(1) sobre una taula dispersa construïda un cop per versió de la sèrie
+    """
+    try:
+        sizes = [int(w) for w in windows.split(",") if w.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Finestres '{windows}' no vàlides. Exemple: 20,60,252")
+    if not sizes or min(sizes) < 1:
+        raise HTTPException(status_code=400, detail="Cada finestra ha de ser com a mínim 1")
+    
+    try:
+        if not db.get_company_by_ticker(ticker):
+            raise HTTPException(status_code=404, detail=f"Empresa {ticker} no trobada")
+        
+        prices, state = await db.run_blocking(db.get_extremes, ticker)
+        if state is None:
+            raise HTTPException(status_code=404, detail=f"Dades de preus per {ticker} no trobades")
+        
+        extremes = {}
+        for size in sizes:
+            high, low = state.window_extremes(prices, size)
+            extremes[str(size)] = {"high": high, "low": low}
+        return FastJSONResponse({
+            "ticker": ticker,
+            "as_of": prices.date_strings()[-1],
+            "high_52w": state.high_52w,
+            "low_52w": state.low_52w,
+            "windows": extremes
+        })
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error calculant extrems de {ticker}: {str(e)}")
+
+
 @router.get("/companies/{ticker}/series", response_model=SeriesResponse)
-async def get_company_series(ticker: str, range: str = "1Y"):
-    """Retorna sèries de preus per un ticker i rang específics"""
+async def get_company_series(
+    request: Request,
+    ticker: str,
+    range: str = "1Y",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    points: Optional[int] = None,
+    method: str = "lttb",
+    format: Optional[str] = None,
+    interval: str = DAILY_INTERVAL
+):
+    """
+    Retorna sèries de preus per un ticker i rang específics
+    `start`/`end` (YYYY-MM-DD, inclosos) tenen prioritat sobre `range`
+    `points` limita les barres retornades (com a molt SERIES_MAX_POINTS) reduint-les amb
+    `method`: lttb (forma del tancament), minmax (pics) o ohlc (espelmes agregades)
+    `format` (o Accept): json (per defecte), columnar o binary (vegeu app/wire.py)
+    `interval`: 1d (per defecte) o intradia (1m, 5m, 15m, 30m, 1h; només els darrers dies)
+    """
     try:
         # Validar rang
-        valid_ranges = ["1M", "3M", "1Y"]
-        if range not in valid_ranges:
+        if range not in VALID_RANGES:
             raise HTTPException(
                 status_code=400, 
-                detail=f"Rang '{range}' no vàlid. Usa: {', '.join(valid_ranges)}"
+                detail=f"Rang '{range}' no vàlid. Usa: {', '.join(VALID_RANGES)}"
             )
         
-        # Obtenir dades
-        prices = db.get_series_data(ticker, range)
-        if not prices:
-            raise HTTPException(status_code=404, detail=f"Dades de sèries per {ticker} no trobades")
+        # Validar interval
+        if interval not in VALID_INTERVALS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Interval '{interval}' no vàlid. Usa: {', '.join(VALID_INTERVALS)}"
+            )
         
-        return SeriesResponse(
-            ticker=ticker,
-            range=range,
-            prices=prices
-        )
+        # Validar dates explícites
+        for name, value in (("start", start), ("end", end)):
+            if value is not None:
+                try:
+                    datetime.strptime(value, "%Y-%m-%d")
+                except ValueError:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Data '{name}={value}' no vàlida. Format: YYYY-MM-DD"
+                    )
+        if start and end and start > end:
+            raise HTTPException(status_code=400, detail="'start' ha de ser anterior o igual a 'end'")
+        
+        # Validar reducció de punts
+        if points is not None and points < 2:
+            raise HTTPException(status_code=400, detail="'points' ha de ser com a mínim 2")
+        if method not in METHODS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Mètode '{method}' no vàlid. Usa: {', '.join(METHODS)}"
+            )
+        
+        # Validar format de resposta
+        wire_format = negotiate_format(format, request.headers.get("accept"))
+        if wire_format is None:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Format '{format}' no vàlid. Usa: {', '.join(FORMATS)}"
+            )
+        
+        # Payload acotat sigui quin sigui el rang
+        max_points = min(points or SERIES_MAX_POINTS, SERIES_MAX_POINTS)
+        
+        # Versió abans de llegir; tocar la sèrie la refresca si ha caducat (i canvia la versió)
+        version = db.get_data_version([ticker])
+        await db.aget_price_data(ticker)
+        
+        # Històric llarg i intradia: la versió inclou la cobertura de les particions
+        history_version = await db.aget_history_version(ticker, range, start, interval)
+        if history_version:
+            version = f"{version}|{history_version}"
+        
+        async def render():
+            prices = await db.aget_series_data(ticker, range, start, end, interval)
+            if not prices:
+                raise HTTPException(status_code=404, detail=f"Dades de sèries per {ticker} no trobades")
+            
+            total_points = len(prices)
+            downsampled = total_points > max_points
+            if downsampled:
+                prices = downsample(prices, max_points, method)
+            
+            # Mateixos camps que SeriesResponse, en el mateix ordre
+            meta = {
+                "ticker": ticker,
+                "range": range,
+                "start": start,
+                "end": end,
+                "interval": interval,
+                "total_points": total_points if downsampled else None,
+                "method": method if downsampled else None
+            }
+            
+            # Tots els formats es generen de les columnes, sense models Pydantic
+            if wire_format == "binary":
+                response = binary_response(prices, meta)
+            elif wire_format == "columnar":
+                response = columnar_response(prices, meta)
+            else:
+                response = FastJSONResponse({**meta, "prices": prices.to_records()})
+            response.headers["Vary"] = "Accept"
+            return response
+        
+        key = f"series:{ticker}:{range}:{interval}:{start}:{end}:{max_points}:{method}:{wire_format}"
+        return await api_cache.respond(request, key, version, render)
     
     except HTTPException:
         raise
@@ -82,13 +310,17 @@ async def get_company_series(ticker: str, range: str = "1Y"):
 
 
 @router.post("/refresh")
-async def refresh_all_data():
-    """Refresca totes les dades (neteja cache)"""
+async def refresh_all_data(repair: bool = False):
+    """
+    Refresca totes les dades (neteja cache)
+    Només es descarreguen les barres noves; `repair=true` torna a descarregar tot l'històric
+    """
     try:
-        db.refresh_data()
+        await db.run_blocking(db.refresh_data, None, repair)
         return {
             "status": "success",
             "message": "Totes les dades han estat refrescades",
+            "repair": repair,
             "real_data_enabled": db.use_real_data
         }
     except Exception as e:
@@ -96,20 +328,21 @@ async def refresh_all_data():
 
 
 @router.post("/refresh/{ticker}")
-async def refresh_ticker_data(ticker: str):
-    """Refresca dades d'un ticker específic"""
+async def refresh_ticker_data(ticker: str, repair: bool = False):
+    """Refresca dades d'un ticker específic (delta; `repair=true` per descarregar-ho tot)"""
     try:
         # Comprovar que l'empresa existeix
         company = db.get_company_by_ticker(ticker)
         if not company:
             raise HTTPException(status_code=404, detail=f"Empresa {ticker} no trobada")
         
-        db.refresh_data(ticker)
+        await db.run_blocking(db.refresh_data, ticker, repair)
         
         return {
             "status": "success",
             "message": f"Dades de {ticker} refrescades",
             "ticker": ticker,
+            "repair": repair,
             "real_data_enabled": db.use_real_data
         }
     except HTTPException:
@@ -120,15 +353,21 @@ async def refresh_ticker_data(ticker: str):
 
 @router.get("/data-source")
 async def get_data_source():
-    """Retorna informació sobre la font de dades actual"""
+    """Retorna informació sobre la font de dades actual i l'estat del cache"""
+    cache_info = await db.run_blocking(db.get_cache_info)
+    yfinance_cache = cache_info.get("yfinance", {})
+    
     return {
         "yfinance_available": REAL_DATA_AVAILABLE,
         "using_real_data": db.use_real_data,
         "source": "Yahoo Finance (real-time)" if db.use_real_data else "Mock data (fixtures)",
         "cache_enabled": True,
-        "cache_ttl_minutes": {
+        "cache_ttl_minutes": yfinance_cache.get("ttl_minutes", {
             "company_info": 1440,
             "price_data": 60,
             "realtime": 5
-        }
+        }),
+        "cache": cache_info,
+        "memory_cache": memory_cache.stats(),
+        "singleflight": db.get_fetch_stats()
     }
@@ -0,0 +1,75 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+
+from app.db import db
+from app.export import ENCODERS, EXPORT_FORMATS, MEDIA_TYPES, PYARROW_AVAILABLE
+from app.series import DAILY_INTERVAL, VALID_INTERVALS, VALID_RANGES
+
+router = APIRouter(prefix="/api", tags=["export"])
+
+
+@router.get("/export")
+async def export_prices(
+    tickers: Optional[str] = None,
+    format: str = "csv",
+    range: str = "MAX",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    interval: str = DAILY_INTERVAL
+):
+    """
+    Exporta l'històric de preus de diversos tickers en una sola resposta en streaming
+    `tickers`: llista separada per comes (per defecte tot l'univers)
+    `format`: csv (per defecte), ndjson o parquet (requereix pyarrow)
+    `range` (per defecte MAX: tot l'històric), `start`/`end` i `interval` com a la ruta de sèries
+    """
+    # Validar format
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Format '{format}' no vàlid. Usa: {', '.join(EXPORT_FORMATS)}"
+        )
+    if format == "parquet" and not PYARROW_AVAILABLE:
+        raise HTTPException(status_code=400, detail="El format parquet requereix pyarrow (pip install pyarrow)")
+
+    # Validar rang, interval i dates
+    if range not in VALID_RANGES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Rang '{range}' no vàlid. Usa: {', '.join(VALID_RANGES)}"
+        )
+    if interval not in VALID_INTERVALS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Interval '{interval}' no vàlid. Usa: {', '.join(VALID_INTERVALS)}"
+        )
+    for name, value in (("start", start), ("end", end)):
+        if value is not None:
+            try:
+                datetime.strptime(value, "%Y-%m-%d")
+            except ValueError:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Data '{name}={value}' no vàlida. Format: YYYY-MM-DD"
+                )
+
+    # Validar tickers abans de començar a enviar (després ja no es pot canviar l'estat HTTP)
+    if tickers:
+        selected = [t.strip() for t in tickers.split(",") if t.strip()]
+        unknown = [t for t in selected if db.get_company_by_ticker(t) is None]
+        if unknown:
+            raise HTTPException(status_code=404, detail=f"Empreses no trobades: {', '.join(unknown)}")
+    else:
+        selected = [c.ticker for c in db.get_companies()]
+
+    # El generador és síncron: Starlette l'itera al pool de fils, ticker a ticker
+    load = lambda ticker: db.get_series_data(ticker, range, start, end, interval)
+    filename = f"prices_{range.lower()}_{interval}.{format}"
+    return StreamingResponse(
+        ENCODERS[format](selected, load),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -0,0 +1,52 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from app.db import db
+from app.live import QUOTE_HEARTBEAT_SECONDS, quote_hub, sse_event
+
+router = APIRouter(prefix="/api/stream", tags=["stream"])
+
+
+@router.get("/quotes")
+async def stream_quotes(request: Request, tickers: Optional[str] = None):
+    """
+    Cotitzacions en directe (Server-Sent Events, `event: quote`)
+    `tickers`: llista separada per comes (per defecte tot l'univers)
+    Tots els clients comparteixen un sol poller; un client lent perd les cotitzacions més antigues
+    """
+    selected = None
+    if tickers:
+        selected = [t.strip() for t in tickers.split(",") if t.strip()]
+        unknown = [t for t in selected if db.get_company_by_ticker(t) is None]
+        if unknown:
+            raise HTTPException(status_code=404, detail=f"Empreses no trobades: {', '.join(unknown)}")
+
+    subscription = quote_hub.subscribe(selected)
+
+    async def events():
+        try:
+            while True:
+                try:
+                    quote = await asyncio.wait_for(subscription.queue.get(), timeout=QUOTE_HEARTBEAT_SECONDS)
+                    yield sse_event(quote)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+        finally:
+            quote_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/status")
+async def get_stream_status():
+    """Estat del poller compartit: subscriptors, tickers vigilats, crides i descarts"""
+    return quote_hub.status()
@@ -0,0 +1,179 @@
+"""
+Dades regionals estàtiques (demografia, habitatge, medi ambient) carregades en memòria
+
+Cada fitxer de data/ es llegeix i es valida un sol cop a l'arrencada contra el seu model.
+Les pàgines serveixen des de memòria; un vigilant en segon pla comprova el mtime dels
+fitxers i els torna a carregar quan canvien. Un fitxer nou invàlid no substitueix el vigent.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from pydantic import BaseModel, ValidationError
+
+from app.models import DemographicsDataset, EnvironmentDataset, HousingDataset
+
+# Nom del dataset -> (fitxer a data/, model de validació)
+DATASETS: Dict[str, tuple] = {
+    "demographics": ("demographics.json", DemographicsDataset),
+    "housing": ("housing.json", HousingDataset),
+    "environment": ("environment.json", EnvironmentDataset)
+}
+
+# Segons entre comprovacions de canvis als fitxers
+DATASET_RELOAD_SECONDS = float(os.getenv("DATASET_RELOAD_SECONDS", "5"))
+
+
+class _Loaded:
+    __slots__ = ("data", "model", "mtime", "loaded_at")
+
+    def __init__(self, data: Dict, model: BaseModel, mtime: float):
+        self.data = data
+        self.model = model
+        self.mtime = mtime
+        self.loaded_at = time.time()
+
+
+class DatasetStore:
+    """Datasets validats en memòria amb recàrrega per mtime"""
+
+    def __init__(self, data_dir: str = "data", reload_seconds: float = DATASET_RELOAD_SECONDS):
+        self.data_dir = data_dir
+        self.reload_seconds = reload_seconds
+        self._loaded: Dict[str, _Loaded] = {}
+        self._errors: Dict[str, str] = {}
+        self._failed_mtimes: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stop: Optional[asyncio.Event] = None
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.data_dir, DATASETS[name][0])
+
+    def _load(self, name: str) -> _Loaded:
+        """Llegeix i valida un dataset (bloquejant)"""
+        model_cls = DATASETS[name][1]
+        path = self._path(name)
+        mtime = os.stat(path).st_mtime
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        model = model_cls(**data)
+        return _Loaded(data, model, mtime)
+
+    def load_all(self):
+        """Carrega tots els datasets (a l'arrencada)"""
+        for name in DATASETS:
+            self.reload(name)
+
+    def reload(self, name: str) -> bool:
+        """Torna a carregar un dataset; si falla es manté la versió anterior"""
+        try:
+            loaded = self._load(name)
+        except (OSError, ValueError, ValidationError) as e:
+            self._errors[name] = str(e)[:200]
+            print(f"⚠️  Error carregant {DATASETS[name][0]}: {str(e)[:100]}")
+            return False
+
+        with self._lock:
+            self._loaded[name] = loaded
+        self._errors.pop(name, None)
+        return True
+
+    def check_for_changes(self) -> int:
+        """Recarrega els datasets amb el fitxer modificat; retorna quants s'han recarregat"""
+        reloaded = 0
+        for name in DATASETS:
+            try:
+                mtime = os.stat(self._path(name)).st_mtime
+            except OSError:
+                continue
+            current = self._loaded.get(name)
+            if current is not None and mtime == current.mtime:
+                continue
+            if self._failed_mtimes.get(name) == mtime:
+                continue  # Ja ha fallat amb aquesta versió del fitxer
+            if self.reload(name):
+                self._failed_mtimes.pop(name, None)
+                reloaded += 1
+                print(f"🔄 Dataset {name} recarregat")
+            else:
+                self._failed_mtimes[name] = mtime
+        return reloaded
+
+    def get(self, name: str) -> Dict:
+        """Dades tal com estan al fitxer (per als templates), ja validades"""
+        return self._get(name).data
+
+    def get_model(self, name: str) -> BaseModel:
+        """Dades validades com a model Pydantic"""
+        return self._get(name).model
+
+    def get_version(self, name: str) -> str:
+        """Versió del dataset carregat (mtime del fitxer): canvia en cada recàrrega"""
+        return repr(self._get(name).mtime)
+
+    def _get(self, name: str) -> _Loaded:
+        loaded = self._loaded.get(name)
+        if loaded is None:
+            # Sense lifespan (scripts, tests): càrrega mandrosa
+            if not self.reload(name):
+                raise RuntimeError(f"Dataset {name} no disponible: {self._errors.get(name)}")
+            loaded = self._loaded[name]
+        return loaded
+
+    async def start(self):
+        """Carrega tots els datasets i arrenca el vigilant de canvis"""
+        await asyncio.get_running_loop().run_in_executor(None, self.load_all)
+        if self.reload_seconds <= 0 or (self._task and not self._task.done()):
+            return
+        self._stop = asyncio.Event()
+        self._task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        """Atura el vigilant"""
+        if not self._task:
+            return
+        self._stop.set()
+        await self._task
+        self._task = None
+
+    async def _watch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=self.reload_seconds)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await loop.run_in_executor(None, self.check_for_changes)
+            except Exception as e:
+                print(f"⚠️  Error comprovant datasets: {e}")
+
+    def status(self) -> Dict:
+        """Estat de cada dataset: moment de càrrega, mtime del fitxer i últim error"""
+        return {
+            name: {
+                "file": DATASETS[name][0],
+                "loaded": name in self._loaded,
+                "loaded_at": (
+                    datetime.fromtimestamp(self._loaded[name].loaded_at).isoformat()
+                    if name in self._loaded else None
+                ),
+                "file_mtime": (
+                    datetime.fromtimestamp(self._loaded[name].mtime).isoformat()
+                    if name in self._loaded else None
+                ),
+                "error": self._errors.get(name)
+            }
+            for name in DATASETS
+        }
+
+
+# Instància global (es carrega al lifespan de l'aplicació)
+datasets = DatasetStore()
@@ -1,8 +1,20 @@
+import asyncio
+import functools
+import hashlib
+import itertools
 import json
 import os
-from typing import List, Dict, Optional
-from datetime import datetime, timedelta
-from app.models import Company, PriceData, CompanyKPI
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Any, Callable, List, Dict, Optional, Tuple
+from app.models import Company, CompanyIndicators, CompanyKPI
+from app.series import DAILY_INTERVAL, DateLike, PriceSeries, is_short_history, period_for_start, range_start
+from app.analytics import PricePanel
+from app.indicators import IndicatorStore
+from app.kpis import KPIStore, compute_kpi
+from app.rolling import ExtremesState, ExtremesStore
+from app.screener import ScreenerIndex
+from app.services.memory_cache import memory_cache
 
 # Intentar importar serveis de dades reals
 try:
@@ -25,12 +37,56 @@ REAL_DATA_AVAILABLE = YFINANCE_AVAILABLE or ALPHAVANTAGE_AVAILABLE
 if not REAL_DATA_AVAILABLE:
     print("⚠️  Cap servei de dades reals disponible. Usant dades mock.")
 
+# Segons fins a tornar a consultar el servei una sèrie que s'ha servit caducada
+STALE_RECHECK_SECONDS = float(os.getenv("STALE_RECHECK_SECONDS", "15"))
+
+# Fils màxims per a I/O bloquejant (yfinance, Alpha Vantage, lectures de fitxers)
+DATA_EXECUTOR_WORKERS = int(os.getenv("DATA_EXECUTOR_WORKERS", "8"))
+
+# Prefix de les sèries del DataManager dins del cache en memòria compartit
+_PRICES_PREFIX = "prices:"
+
+
+def _fingerprint(prices: PriceSeries) -> tuple:
+    """
+    Empremta del contingut d'una sèrie (per no canviar la versió si no hi ha dades noves)
+    Hash de totes les columnes: una revisió de qualsevol OHLCV en canvia la versió
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for column in (prices.dates, prices.open, prices.high, prices.low, prices.close, prices.volume):
+        digest.update(column.tobytes())
+    return (len(prices), digest.hexdigest())
+
 
 class DataManager:
-    def __init__(self, data_dir: str = "data", use_real_data: bool = True):
+    def __init__(
+        self,
+        data_dir: str = "data",
+        use_real_data: bool = True,
+        max_workers: int = DATA_EXECUTOR_WORKERS
+    ):
         self.data_dir = data_dir
         self._companies_cache = None
-        self._prices_cache = {}
+        self._companies_by_ticker: Dict[str, Company] = {}
+        # Sèries resoltes per ticker al cache LRU compartit (claus "prices:{ticker}_{real|mock}")
+        self._prices_cache = memory_cache
+        
+        # Versió de la sèrie de cada ticker: canvia només quan el contingut de la sèrie canvia
+        self._version_counter = itertools.count(1)
+        self._series_versions: Dict[str, int] = {}
+        self._series_fingerprints: Dict[str, tuple] = {}
+        # Canvia a cada neteja de cache (les versions tornen a 0 i no serien úniques)
+        self._generation = 0
+        self._kpi_store = KPIStore()
+        self._indicator_store = IndicatorStore()
+        self._extremes_store = ExtremesStore()
+        # Panell alineat de tot l'univers per a l'analítica transversal: (versió de dades, panell)
+        self._panel: Optional[tuple] = None
+        # Índexs del cercador sobre els KPIs: (versió de dades, índex)
+        self._screener: Optional[tuple] = None
+        
+        # Pool de fils acotat: les rutes async deleguen aquí tota la feina bloquejant
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="data-io")
         
         # Activar dades reals si està disponible i activat
         self.use_real_data = use_real_data and REAL_DATA_AVAILABLE
@@ -51,6 +107,56 @@ class DataManager:
         else:
             print("📊 Usant dades mock des de fitxers JSON")
     
+    async def run_blocking(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Executa una funció bloquejant al pool de fils sense aturar l'event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+    
+    async def aget_company_kpis(self) -> List[CompanyKPI]:
+        """Versió no bloquejant de get_company_kpis"""
+        return await self.run_blocking(self.get_company_kpis)
+    
+    async def aget_screener_index(self) -> ScreenerIndex:
+        """Versió no bloquejant de get_screener_index"""
+        return await self.run_blocking(self.get_screener_index)
+    
+    async def aget_company_kpi(self, ticker: str) -> Optional[CompanyKPI]:
+        """Versió no bloquejant de get_company_kpi"""
+        return await self.run_blocking(self.get_company_kpi, ticker)
+    
+    async def aget_company_indicators(self, ticker: str) -> Optional[CompanyIndicators]:
+        """Versió no bloquejant de get_company_indicators"""
+        return await self.run_blocking(self.get_company_indicators, ticker)
+    
+    async def aget_price_data(self, ticker: str) -> PriceSeries:
+        """Versió no bloquejant de get_price_data"""
+        return await self.run_blocking(self.get_price_data, ticker)
+    
+    async def aget_series_data(
+        self,
+        ticker: str,
+        range_param: str = "1Y",
+        start: Optional[DateLike] = None,
+        end: Optional[DateLike] = None,
+        interval: str = DAILY_INTERVAL
+    ) -> PriceSeries:
+        """Versió no bloquejant de get_series_data"""
+        return await self.run_blocking(self.get_series_data, ticker, range_param, start, end, interval)
+    
+    async def aget_history_version(
+        self,
+        ticker: str,
+        range_param: str = "1Y",
+        start: Optional[DateLike] = None,
+        interval: str = DAILY_INTERVAL
+    ) -> str:
+        """Versió no bloquejant de get_history_version"""
+        return await self.run_blocking(self.get_history_version, ticker, range_param, start, interval)
+    
+    def shutdown(self):
+        """Atura el pool de fils (sense esperar les tasques pendents)"""
+        self._executor.shutdown(wait=False)
+    
     def get_companies(self) -> List[Company]:
         """Carrega llista d'empreses des del JSON"""
         if self._companies_cache is None:
@@ -58,28 +164,32 @@ class DataManager:
             with open(companies_path, 'r', encoding='utf-8') as f:
                 data = json.load(f)
                 self._companies_cache = [Company(**company) for company in data]
+                self._companies_by_ticker = {c.ticker: c for c in self._companies_cache}
         return self._companies_cache
     
-    def get_price_data(self, ticker: str, force_mock: bool = False) -> List[PriceData]:
+    def get_price_data(self, ticker: str, force_mock: bool = False, force_refresh: bool = False) -> PriceSeries:
         """
         Carrega dades de preus per un ticker
         Intenta múltiples fonts: Yahoo Finance -> Alpha Vantage -> Mock
+        Amb force_refresh s'ignoren els caches i es torna a descarregar de la font real
         """
         # Si ja està en cache, retornar-lo
         cache_key = f"{ticker}_{'real' if self.use_real_data and not force_mock else 'mock'}"
-        if cache_key in self._prices_cache:
-            return self._prices_cache[cache_key]
+        if not force_refresh:
+            cached = self._prices_cache.get(_PRICES_PREFIX + cache_key)
+            if cached is not None:
+                return cached
         
-        prices = []
+        prices = PriceSeries.empty()
         
         # Intentar obtenir dades reals
         if self.use_real_data and not force_mock:
             # 1. Intentar amb Yahoo Finance (yfinance)
             if YFINANCE_AVAILABLE and stock_service:
                 try:
-                    real_data = stock_service.get_historical_data(ticker, period="1y")
+                    real_data = stock_service.get_historical_data(ticker, period="1y", force=force_refresh)
                     if real_data:
-                        prices = [PriceData(**price) for price in real_data]
+                        prices = real_data
                         print(f"✅ Dades obtingudes de Yahoo Finance per {ticker}")
                 except Exception as e:
                     print(f"⚠️  Yahoo Finance error per {ticker}: {str(e)[:50]}")
@@ -87,151 +197,402 @@ class DataManager:
             # 2. Si Yahoo Finance ha fallat, intentar amb Alpha Vantage
             if not prices and self.alphavantage_service:
                 try:
-                    real_data = self.alphavantage_service.get_historical_data(ticker, period="1y")
+                    real_data = self.alphavantage_service.get_historical_data(
+                        ticker, period="1y", force=force_refresh
+                    )
                     if real_data:
-                        prices = [PriceData(**price) for price in real_data]
+                        prices = real_data
                         print(f"✅ Dades obtingudes d'Alpha Vantage per {ticker}")
                 except Exception as e:
                     print(f"⚠️  Alpha Vantage error per {ticker}: {str(e)[:50]}")
         
+        # Un refresc forçat fallit manté la sèrie que ja teníem
+        if not prices and force_refresh:
+            cached = self._prices_cache.get(_PRICES_PREFIX + cache_key)
+            if cached is not None:
+                return cached
+        
         # 3. Fallback a dades mock si no s'han obtingut dades reals
         if not prices:
             prices_path = os.path.join(self.data_dir, "prices", f"{ticker}.json")
             if os.path.exists(prices_path):
                 with open(prices_path, 'r', encoding='utf-8') as f:
                     data = json.load(f)
-                    prices = [PriceData(**price) for price in data]
+                    prices = PriceSeries.from_records(data)
                     print(f"📊 Usant dades mock per {ticker}")
         
         # Guardar al cache
         if prices:
-            self._prices_cache[cache_key] = prices
+            self._store_prices(ticker, cache_key, prices)
         
         return prices
     
+    def _store_prices(self, ticker: str, cache_key: str, prices: PriceSeries):
+        """Desa una sèrie al cache en memòria i n'incrementa la versió si el contingut ha canviat"""
+        # Les dades reals es tornen a demanar al servei quan vencen; les mock no caduquen
+        ttl = self._real_prices_ttl(ticker) if cache_key.endswith("_real") else None
+        self._prices_cache.set(_PRICES_PREFIX + cache_key, prices, ttl=ttl)
+        
+        fingerprint = _fingerprint(prices)
+        if self._series_fingerprints.get(ticker) != fingerprint or ticker not in self._series_versions:
+            self._series_fingerprints[ticker] = fingerprint
+            self._series_versions[ticker] = next(self._version_counter)
+    
+    def _real_prices_ttl(self, ticker: Optional[str] = None) -> Optional[float]:
+        """
+        TTL en segons de les sèries reals segons la font principal
+        Amb `ticker`, el que li queda al cache del servei: una sèrie servida caducada
+        (refresc en segon pla) es torna a demanar aviat en lloc d'amagar-ne la nova un TTL sencer
+        """
+        if YFINANCE_AVAILABLE and stock_service:
+            ttl = stock_service.cache_ttl["price_data"] * 60
+            age = stock_service.get_cache_age(ticker) if ticker else None
+        elif self.alphavantage_service:
+            ttl = self.alphavantage_service.cache_ttl["price_data"] * 60
+            age = self.alphavantage_service.get_cache_age(ticker) if ticker else None
+        else:
+            return None
+        if age is None or ttl <= 0:
+            return ttl
+        return max(ttl - age, STALE_RECHECK_SECONDS)
+    
+    def prefetch_prices(self, tickers: List[str]) -> int:
+        """
+        Carrega en una sola petició multi-símbol els tickers que encara no són en memòria
+        Retorna el nombre de sèries carregades pel lot
+        """
+        if not (self.use_real_data and YFINANCE_AVAILABLE and stock_service):
+            return 0
+        
+        cold = [t for t in tickers if f"{_PRICES_PREFIX}{t}_real" not in self._prices_cache]
+        if len(cold) < 2:
+            return 0  # Un sol ticker: el camí individual ja és una única petició
+        
+        try:
+            batch = stock_service.get_multiple_tickers(cold, period="1y")
+        except Exception as e:
+            print(f"⚠️  Yahoo Finance error en lot: {str(e)[:50]}")
+            return 0
+        
+        for ticker, series in batch.items():
+            if series:
+                self._store_prices(ticker, f"{ticker}_real", series)
+        return len(batch)
+    
+    def warm_ticker(self, ticker: str) -> bool:
+        """
+        Precalenta un ticker: torna a descarregar la sèrie (si hi ha dades reals)
+        i recalcula el seu KPI. Retorna True si el ticker té KPI disponible
+        """
+        if self.use_real_data:
+            self.get_price_data(ticker, force_refresh=True)
+        return self.get_company_kpi(ticker) is not None
+    
+    def get_series_version(self, ticker: str) -> int:
+        """Versió actual de la sèrie d'un ticker (0 si no està carregada)"""
+        return self._series_versions.get(ticker, 0)
+    
+    def get_data_version(self, tickers: Optional[List[str]] = None) -> str:
+        """
+        Versió combinada de les dades d'un conjunt de tickers (per defecte tots)
+        Inclou el dia actual perquè els rangs relatius (1M, 1Y) canvien cada dia
+        Una sèrie carregada amb el TTL vençut es marca amb `*`: la versió canvia en caducar
+        (i la resposta es torna a generar, recarregant preus) sense esperar el planificador
+        """
+        if tickers is None:
+            tickers = [c.ticker for c in self.get_companies()]
+        source = "real" if self.use_real_data else "mock"
+        parts = [date.today().isoformat(), str(self._generation)]
+        for ticker in tickers:
+            version = self.get_series_version(ticker)
+            expired = version and f"{_PRICES_PREFIX}{ticker}_{source}" not in self._prices_cache
+            parts.append(f"{ticker}:{version}{'*' if expired else ''}")
+        return "|".join(parts)
+    
+    def get_company_kpi(self, ticker: str) -> Optional[CompanyKPI]:
+        """
+        KPIs d'una empresa des del magatzem materialitzat
+        Només es recalculen si la sèrie del ticker ha canviat
+        """
+        company = self.get_company_by_ticker(ticker)
+        if not company:
+            return None
+        
+        prices = self.get_price_data(ticker)
+        if not prices:
+            return None
+        
+        version = self.get_series_version(ticker)
+        kpi = self._kpi_store.get(ticker, version)
+        if kpi is None:
+            kpi = compute_kpi(company, prices, self._extremes_store.get(ticker, version, prices))
+            if kpi:
+                self._kpi_store.put(ticker, version, kpi)
+        return kpi
+    
+    def get_current_quote(self, ticker: str) -> Optional[Dict]:
+        """
+        Cotització actual d'un ticker (font del flux en directe, vegeu app/live.py)
+        Amb Yahoo Finance usa el preu intradia (cache de 5 minuts); si no, l'última barra
+        """
+        if self.use_real_data and YFINANCE_AVAILABLE and stock_service:
+            quote = stock_service.get_current_price(ticker)
+            if quote:
+                return quote
+        
+        prices = self.get_price_data(ticker)
+        latest, previous = prices.latest(), prices.previous()
+        if latest is None:
+            return None
+        previous_close = previous.close if previous else latest.open
+        return {
+            "ticker": ticker,
+            "current_price": latest.close,
+            "open": latest.open,
+            "high": latest.high,
+            "low": latest.low,
+            "volume": latest.volume,
+            "previous_close": previous_close,
+            "change": latest.close - previous_close,
+            "change_percent": (latest.close - previous_close) / previous_close * 100 if previous_close else 0.0,
+            "timestamp": latest.date
+        }
+    
+    def get_company_indicators(self, ticker: str) -> Optional[CompanyIndicators]:
+        """
+        Indicadors tècnics d'una empresa a l'última barra
+        Es reutilitzen per versió de sèrie i s'avancen en O(1) si només hi ha una barra nova
+        """
+        if not self.get_company_by_ticker(ticker):
+            return None
+        prices = self.get_price_data(ticker)
+        return self._indicator_store.get(ticker, self.get_series_version(ticker), prices)
+    
+    def get_extremes(self, ticker: str) -> Tuple[PriceSeries, Optional[ExtremesState]]:
+        """Sèrie de preus d'un ticker i el seu estat d'extrems mòbils per a la versió actual"""
+        prices = self.get_price_data(ticker)
+        return prices, self._extremes_store.get(ticker, self.get_series_version(ticker), prices)
+    
+    def scan_highs_lows(self) -> Dict[str, List[Dict]]:
+        """Empreses que avui marquen un nou màxim o mínim de 52 setmanes"""
+        tickers = [c.ticker for c in self.get_companies()]
+        self.prefetch_prices(tickers)
+        
+        result = {"new_highs": [], "new_lows": []}
+        for ticker in tickers:
+            prices, state = self.get_extremes(ticker)
+            if state is None:
+                continue
+            as_of = prices.date_strings()[-1]
+            if state.is_new_high:
+                result["new_highs"].append(
+                    {"ticker": ticker, "date": as_of, "high": state.last_high, "previous_high_52w": state.prior_high}
+                )
+            if state.is_new_low:
+                result["new_lows"].append(
+                    {"ticker": ticker, "date": as_of, "low": state.last_low, "previous_low_52w": state.prior_low}
+                )
+        return result
+    
+    def get_price_panel(self) -> PricePanel:
+        """
+        Panell de tancaments (tickers × dates) de tot l'univers
+        Es construeix un cop per versió de dades i es comparteix entre peticions
+        """
+        version = self.get_data_version()
+        cached = self._panel
+        if cached and cached[0] == version:
+            return cached[1]
+        
+        tickers = [c.ticker for c in self.get_companies()]
+        self.prefetch_prices(tickers)
+        panel = PricePanel.from_series({ticker: self.get_price_data(ticker) for ticker in tickers})
+        # La versió es torna a llegir: si una sèrie ha canviat mentre es llegia, es reconstruirà
+        self._panel = (self.get_data_version(), panel)
+        return panel
+    
     def get_company_kpis(self) -> List[CompanyKPI]:
-        """Calcula KPIs per totes les empreses"""
+        """KPIs de totes les empreses (calculats incrementalment per ticker)"""
         companies = self.get_companies()
-        kpis = []
+        self.prefetch_prices([c.ticker for c in companies])
         
+        kpis = []
         for company in companies:
-            prices = self.get_price_data(company.ticker)
-            if not prices:
-                continue
-                
-            # Ordenar per data (més recent primer)
-            prices.sort(key=lambda x: x.date, reverse=True)
-            
-            latest = prices[0]
-            previous = prices[1] if len(prices) > 1 else latest
-            
-            # Calcular màxim/mínim 52 setmanes
-            high_52w = max(p.high for p in prices[:252] if p.high)  # ~252 dies bursàtils/any
-            low_52w = min(p.low for p in prices[:252] if p.low)
-            
-            # Mock market cap (preu * shares fictícies)
-            mkt_cap = latest.close * 1000000  # Mock: 1M shares
-            
-            # Variació percentual
-            chng_1d_pct = ((latest.close - previous.close) / previous.close) * 100 if previous.close > 0 else 0
-            
-            kpi = CompanyKPI(
-                name=company.name,
-                ticker=company.ticker,
-                exchange=company.exchange,
-                sector=company.sector,
-                hq_province=company.hq_province,
-                last_price=latest.close,
-                chng_1d_pct=chng_1d_pct,
-                high_52w=high_52w,
-                low_52w=low_52w,
-                mkt_cap=mkt_cap
-            )
-            kpis.append(kpi)
-        
+            kpi = self.get_company_kpi(company.ticker)
+            if kpi:
+                kpis.append(kpi)
         return kpis
     
+    def get_screener_index(self) -> ScreenerIndex:
+        """
+        Índexs per camp dels KPIs de l'univers (vegeu app/screener.py)
+        Es construeixen un cop per versió de dades, com el panell de preus
+        """
+        version = self.get_data_version()
+        cached = self._screener
+        if cached and cached[0] == version:
+            return cached[1]
+        
+        index = ScreenerIndex(self.get_company_kpis())
+        self._screener = (self.get_data_version(), index)
+        return index
+    
     def get_company_by_ticker(self, ticker: str) -> Optional[Company]:
         """Troba empresa per ticker"""
-        companies = self.get_companies()
-        return next((c for c in companies if c.ticker == ticker), None)
-    
-    def get_series_data(self, ticker: str, range_param: str = "1Y") -> List[PriceData]:
-        """Obté sèries de preus per un rang específic"""
-        # Mapejar range_param al format de yfinance/alphavantage
-        period_map = {
-            "1M": "1mo",
-            "3M": "3mo",
-            "1Y": "1y"
-        }
+        self.get_companies()
+        return self._companies_by_ticker.get(ticker)
+    
+    def get_series_data(
+        self,
+        ticker: str,
+        range_param: str = "1Y",
+        start: Optional[DateLike] = None,
+        end: Optional[DateLike] = None,
+        interval: str = DAILY_INTERVAL
+    ) -> PriceSeries:
+        """
+        Obté sèries de preus per un rang específic o per dates explícites
+        El tall es fa amb cerca binària sobre la sèrie ordenada (vista sense còpia)
         
-        # Si usem dades reals, obtenir directament el període correcte
+        Rangs curts diaris: cache per període. Històric llarg (5Y, 10Y, MAX) i intradia:
+        emmagatzematge per particions, que només descarrega el que falta.
+        """
+        if start is None:
+            start = range_start(range_param)
+        intraday = interval != DAILY_INTERVAL
+        short = is_short_history(start, interval)
+        
+        # Si usem dades reals, obtenir el període més petit que cobreixi el rang
         if self.use_real_data:
-            period = period_map.get(range_param, "1y")
+            period = period_for_start(start)
             
             # Intentar amb Yahoo Finance
             if YFINANCE_AVAILABLE and stock_service:
                 try:
-                    real_data = stock_service.get_historical_data(ticker, period=period)
+                    if short:
+                        real_data = stock_service.get_historical_data(ticker, period=period)
+                    else:
+                        real_data = stock_service.get_history(ticker, start=start, interval=interval)
                     if real_data:
-                        return [PriceData(**price) for price in real_data]
+                        return real_data.slice_dates(start, end)
                 except Exception as e:
                     print(f"⚠️  Yahoo Finance error sèrie {ticker}: {str(e)[:50]}")
             
-            # Intentar amb Alpha Vantage
-            if self.alphavantage_service:
+            # Intentar amb Alpha Vantage (només diari; l'històric llarg necessita outputsize=full)
+            if self.alphavantage_service and not intraday:
                 try:
-                    real_data = self.alphavantage_service.get_historical_data(ticker, period=period)
+                    real_data = self.alphavantage_service.get_historical_data(
+                        ticker, period=period, outputsize="compact" if short else "full"
+                    )
                     if real_data:
-                        return [PriceData(**price) for price in real_data]
+                        return real_data.slice_dates(start, end)
                 except Exception as e:
                     print(f"⚠️  Alpha Vantage error sèrie {ticker}: {str(e)[:50]}")
         
-        # Fallback: obtenir totes les dades i filtrar
-        prices = self.get_price_data(ticker)
-        if not prices:
-            return []
-        
-        # Ordenar per data
-        prices.sort(key=lambda x: x.date)
+        # Les dades simulades són diàries: no hi ha intradia
+        if intraday:
+            return PriceSeries.empty(intraday=True)
         
-        # Filtrar per rang
-        if range_param == "1M":
-            cutoff_days = 30
-        elif range_param == "3M":
-            cutoff_days = 90
-        else:  # 1Y
-            cutoff_days = 365
+        # Fallback: obtenir totes les dades i tallar pel rang
+        prices = self.get_price_data(ticker)
+        return prices.slice_dates(start, end)
+    
+    def get_history_version(
+        self,
+        ticker: str,
+        range_param: str = "1Y",
+        start: Optional[DateLike] = None,
+        interval: str = DAILY_INTERVAL
+    ) -> str:
+        """
+        Versió de l'històric llarg o intradia d'un ticker (cobertura i última descàrrega)
+        Buida si la petició se serveix del cache per període (ja inclòs a get_data_version)
+        """
+        if start is None:
+            start = range_start(range_param)
+        if not (self.use_real_data and YFINANCE_AVAILABLE and stock_service) or is_short_history(start, interval):
+            return ""
+        try:
+            manifest = stock_service.ensure_history(ticker, start, interval)
+        except Exception as e:
+            print(f"⚠️  Yahoo Finance error històric {ticker}: {str(e)[:50]}")
+            return ""
+        return f"{manifest.get('covered_from')}@{manifest.get('fetched_at')}"
+    
+    def get_fetch_stats(self) -> Dict[str, Dict[str, int]]:
+        """Estadístiques de coalescència (single-flight) per font de dades"""
+        stats = {}
+        if YFINANCE_AVAILABLE and stock_service:
+            stats["yfinance"] = stock_service.get_flight_stats()
+        if self.alphavantage_service:
+            stats["alphavantage"] = self.alphavantage_service.get_flight_stats()
+        return stats
+    
+    def get_cache_info(self) -> Dict[str, Dict]:
+        """TTL, gràcia i edat (segons) del cache de preus de cada font i ticker"""
+        tickers = [c.ticker for c in self.get_companies()]
         
-        cutoff_date = (datetime.now() - timedelta(days=cutoff_days)).strftime('%Y-%m-%d')
-        filtered_prices = [p for p in prices if p.date >= cutoff_date]
+        def ages(get_age) -> Dict[str, Optional[float]]:
+            result = {}
+            for ticker in tickers:
+                age = get_age(ticker)
+                result[ticker] = round(age, 1) if age is not None else None
+            return result
         
-        return filtered_prices
+        info = {}
+        if YFINANCE_AVAILABLE and stock_service:
+            info["yfinance"] = {
+                "ttl_minutes": stock_service.cache_ttl,
+                "grace_minutes": stock_service.cache_grace,
+                "age_seconds": ages(stock_service.get_cache_age)
+            }
+        if self.alphavantage_service:
+            info["alphavantage"] = {
+                "ttl_minutes": self.alphavantage_service.cache_ttl,
+                "grace_minutes": self.alphavantage_service.cache_grace,
+                "age_seconds": ages(self.alphavantage_service.get_cache_age),
+                "rate_limit": self.alphavantage_service.rate_limiter.status()
+            }
+        return info
     
     def clear_cache(self):
         """Neteja cache en memòria"""
-        self._prices_cache = {}
+        self._prices_cache.discard_where(lambda key: key.startswith(_PRICES_PREFIX))
         self._companies_cache = None
+        self._companies_by_ticker = {}
+        self._series_versions = {}
+        self._series_fingerprints = {}
+        self._generation += 1
+        self._kpi_store.invalidate()
+        self._indicator_store.invalidate()
+        self._extremes_store.invalidate()
         print("🗑️  Cache netejat")
     
-    def refresh_data(self, ticker: Optional[str] = None):
+    def refresh_data(self, ticker: Optional[str] = None, repair: bool = False):
         """
         Refresca dades (neteja cache i força re-descàrrega)
+        Per defecte només es descarreguen les barres noves (delta a partir del registre
+        de descàrregues); amb `repair` s'esborra també el registre i es descarrega tot
         """
         if self.use_real_data:
             # Netejar cache de Yahoo Finance
             if YFINANCE_AVAILABLE and stock_service:
-                stock_service.clear_cache(ticker)
+                stock_service.clear_cache(ticker, repair=repair)
             
             # Netejar cache d'Alpha Vantage
             if self.alphavantage_service:
-                self.alphavantage_service.clear_cache(ticker)
+                self.alphavantage_service.clear_cache(ticker, repair=repair)
         
         if ticker:
             # Netejar cache d'un ticker específic
-            keys_to_remove = [k for k in self._prices_cache.keys() if k.startswith(ticker)]
-            for key in keys_to_remove:
-                del self._prices_cache[key]
+            prefix = f"{_PRICES_PREFIX}{ticker}_"
+            self._prices_cache.discard_where(lambda key: key.startswith(prefix))
+            self._series_versions.pop(ticker, None)
+            self._series_fingerprints.pop(ticker, None)
+            self._generation += 1
+            self._kpi_store.invalidate(ticker)
+            self._indicator_store.invalidate(ticker)
+            self._extremes_store.invalidate(ticker)
             print(f"🔄 Dades de {ticker} refrescades")
         else:
             # Netejar tot el cache
@@ -0,0 +1,111 @@
+"""
+Reducció de punts de sèries de preus per als gràfics
+
+- LTTB (Largest-Triangle-Three-Buckets): tria les barres que millor conserven la forma del tancament
+- min/max: per cada bucket es queda la barra del mínim i la del màxim (conserva pics)
+- OHLC: agrega buckets de barres consecutives en espelmes (open, màx, mín, close, volum sumat)
+
+Totes retornen una PriceSeries de com a molt `max_points` barres, ordenada per data.
+"""
+
+import os
+from typing import Tuple
+
+import numpy as np
+
+from app.series import PriceSeries
+
+METHODS: Tuple[str, ...] = ("lttb", "minmax", "ohlc")
+
+# Punts màxims que retorna l'API de sèries (encara que es demanin més)
+SERIES_MAX_POINTS = int(os.getenv("SERIES_MAX_POINTS", "2000"))
+
+# Punts per defecte dels gràfics de la pàgina de detall
+CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "500"))
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Índexs dels punts triats per LTTB (inclou sempre el primer i l'últim)"""
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out <= 2:
+        return np.array([0, n - 1][:max(n_out, 1)])
+
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+    every = (n - 2) / (n_out - 2)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    a = 0
+
+    for i in range(n_out - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+
+        # Punt mitjà del bucket següent
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        # Triangle de màxima àrea entre el punt anterior, el candidat i la mitjana següent
+        areas = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+
+    selected[-1] = n - 1
+    return selected
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Índexs del mínim i el màxim de cada bucket (n_out / 2 buckets)"""
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+
+    buckets = max(n_out // 2, 1)
+    bounds = np.linspace(0, n, buckets + 1).astype(np.int64)
+    indices = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        if end <= start:
+            continue
+        chunk = y[start:end]
+        indices.append(start + int(np.argmin(chunk)))
+        indices.append(start + int(np.argmax(chunk)))
+    return np.unique(np.array(indices, dtype=np.int64))
+
+
+def ohlc_buckets(series: PriceSeries, n_out: int) -> PriceSeries:
+    """Agrega barres consecutives en com a molt n_out espelmes (data = primera barra del bucket)"""
+    n = len(series)
+    if n_out >= n:
+        return series
+
+    starts = np.unique(np.linspace(0, n, n_out + 1).astype(np.int64)[:-1])
+    ends = np.append(starts[1:], n)
+    return PriceSeries(
+        series.dates[starts],
+        series.open[starts],
+        np.maximum.reduceat(series.high, starts),
+        np.minimum.reduceat(series.low, starts),
+        series.close[ends - 1],
+        np.add.reduceat(series.volume, starts)
+    )
+
+
+def downsample(series: PriceSeries, max_points: int, method: str = "lttb") -> PriceSeries:
+    """Redueix una sèrie a com a molt `max_points` barres amb el mètode indicat"""
+    if len(series) <= max_points:
+        return series
+
+    if method == "ohlc":
+        return ohlc_buckets(series, max_points)
+    if method == "minmax":
+        return series[minmax_indices(series.close, max_points)]
+    if method == "lttb":
+        x = series.dates.astype(np.int64)
+        return series[lttb_indices(x, series.close, max_points)]
+    raise ValueError(f"Mètode de reducció desconegut: {method}")
@@ -0,0 +1,133 @@
+"""
+Exportació massiva de l'històric de preus en streaming
+
+Els generadors recorren els tickers d'un en un i emeten blocs de com a molt
+EXPORT_CHUNK_ROWS barres, de manera que la memòria no creix amb l'univers exportat:
+només hi ha a la vegada la sèrie d'un ticker (la del magatzem, sense còpia) i el bloc
+que s'està codificant.
+
+- csv: capçalera + una línia per barra
+- ndjson: un objecte JSON per barra
+- parquet: un row group per bloc (requereix pyarrow, opcional)
+"""
+
+import io
+import os
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from app.responses import dumps
+from app.series import PriceSeries
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    pa = None
+    pq = None
+    PYARROW_AVAILABLE = False
+
+EXPORT_FORMATS: Tuple[str, ...] = ("csv", "ndjson", "parquet")
+
+MEDIA_TYPES: Dict[str, str] = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet"
+}
+
+# Barres per bloc (cada bloc és una escriptura a la resposta)
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "5000"))
+
+COLUMNS = ("ticker", "date", "open", "high", "low", "close", "volume")
+
+# Font de sèries: ticker -> PriceSeries (p. ex. db.get_series_data amb el rang ja fixat)
+SeriesSource = Callable[[str], PriceSeries]
+
+
+def iter_chunks(tickers: List[str], load: SeriesSource, chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[Tuple[str, PriceSeries]]:
+    """Recorre els tickers i en retorna la sèrie a trossos (vistes sense còpia)"""
+    for ticker in tickers:
+        series = load(ticker)
+        for lo in range(0, len(series), chunk_rows):
+            yield ticker, series[lo:lo + chunk_rows]
+
+
+def iter_csv(tickers: List[str], load: SeriesSource, chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[bytes]:
+    """CSV amb capçalera; un bloc de text per tros"""
+    yield (",".join(COLUMNS) + "\n").encode("utf-8")
+    for ticker, chunk in iter_chunks(tickers, load, chunk_rows):
+        columns = chunk.to_columns()
+        lines = [
+            f"{ticker},{d},{o!r},{h!r},{l!r},{c!r},{v}\n"
+            for d, o, h, l, c, v in zip(
+                columns["date"], columns["open"], columns["high"],
+                columns["low"], columns["close"], columns["volume"]
+            )
+        ]
+        yield "".join(lines).encode("utf-8")
+
+
+def iter_ndjson(tickers: List[str], load: SeriesSource, chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[bytes]:
+    """Un objecte JSON per barra, separats per salts de línia"""
+    for ticker, chunk in iter_chunks(tickers, load, chunk_rows):
+        lines = [dumps({"ticker": ticker, **record}) for record in chunk.to_records()]
+        yield b"\n".join(lines) + b"\n"
+
+
+class _Drain(io.RawIOBase):
+    """Fitxer de només escriptura que acumula bytes fins que es buiden amb `take`"""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def take(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def iter_parquet(tickers: List[str], load: SeriesSource, chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[bytes]:
+    """Parquet escrit per row groups; els bytes de cada grup s'envien en acabar-lo"""
+    schema = pa.schema([
+        ("ticker", pa.string()),
+        ("date", pa.string()),
+        ("open", pa.float64()),
+        ("high", pa.float64()),
+        ("low", pa.float64()),
+        ("close", pa.float64()),
+        ("volume", pa.int64())
+    ])
+    sink = _Drain()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for ticker, chunk in iter_chunks(tickers, load, chunk_rows):
+            table = pa.table({
+                "ticker": [ticker] * len(chunk),
+                "date": chunk.date_strings(),
+                "open": chunk.open,
+                "high": chunk.high,
+                "low": chunk.low,
+                "close": chunk.close,
+                "volume": chunk.volume
+            }, schema=schema)
+            writer.write_table(table)
+            data = sink.take()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.take()  # Peu del fitxer (metadades)
+
+
+ENCODERS: Dict[str, Callable[..., Iterator[bytes]]] = {
+    "csv": iter_csv,
+    "ndjson": iter_ndjson,
+    "parquet": iter_parquet
+}
@@ -0,0 +1,378 @@
+"""
+Indicadors tècnics vectoritzats sobre PriceSeries
+
+Les sèries completes (per a gràfics) es calculen amb finestres mòbils de NumPy:
+sumes acumulades per a mitjanes i desviacions, i mitjanes exponencials per blocs
+en forma tancada (sense bucle per barra).
+
+Els valors de l'última barra es materialitzen per ticker i versió de sèrie a
+IndicatorStore. Quan la sèrie nova només afegeix una barra (o revisa l'última, p. ex.
+la del dia en curs), l'estat s'avança en O(1) en lloc de recalcular tota la finestra.
+"""
+
+import math
+import threading
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.models import CompanyIndicators
+from app.series import PriceSeries, to_day
+
+SMA_WINDOWS: Tuple[int, ...] = (20, 50, 200)
+EMA_SPANS: Tuple[int, ...] = (12, 26)
+RSI_PERIOD = 14
+VOLATILITY_WINDOW = 20
+TRADING_DAYS = 252
+
+# Rendiments per dies naturals des de l'última barra (YTD es calcula a part)
+RETURN_DAYS: Dict[str, int] = {"1w": 7, "1m": 30, "1y": 365}
+
+# Marge si l'inici de la sèrie cau just després de la data de referència (p. ex. 1Y sobre una sèrie d'1 any)
+RETURN_TOLERANCE_DAYS = 7
+
+
+# --- Càlcul vectoritzat --------------------------------------------------------
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Mitjana mòbil simple (NaN fins a tenir `window` valors)"""
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        sums = np.cumsum(np.concatenate([[0.0], values]))
+        out[window - 1:] = (sums[window:] - sums[:-window]) / window
+    return out
+
+
+def rolling_std(values: np.ndarray, window: int) -> np.ndarray:
+    """Desviació estàndard mòbil mostral (NaN fins a tenir `window` valors)"""
+    out = np.full(len(values), np.nan)
+    if len(values) >= window and window > 1:
+        sums = np.cumsum(np.concatenate([[0.0], values]))
+        squares = np.cumsum(np.concatenate([[0.0], values * values]))
+        total = sums[window:] - sums[:-window]
+        total_sq = squares[window:] - squares[:-window]
+        variance = (total_sq - total * total / window) / (window - 1)
+        out[window - 1:] = np.sqrt(np.maximum(variance, 0.0))
+    return out
+
+
+def ewm(values: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    Mitjana exponencial y[t] = alpha*x[t] + (1-alpha)*y[t-1], amb y[0] = x[0]
+
+    Es resol per blocs en forma tancada (cumsum amb pesos (1-alpha)^-j); la mida del
+    bloc es tria perquè els pesos no desbordin.
+    """
+    n = len(values)
+    out = np.empty(n)
+    if n == 0:
+        return out
+    decay = 1.0 - alpha
+    block = n if decay <= 0 else max(1, int(100 * math.log(10) / -math.log(decay)))
+    previous = float(values[0])
+    for lo in range(0, n, block):
+        chunk = values[lo:lo + block]
+        k = np.arange(1, len(chunk) + 1)
+        powers = decay ** k
+        weighted = np.cumsum(chunk * decay ** -(k - 1)) * alpha
+        out[lo:lo + len(chunk)] = powers * previous + weighted * decay ** (k - 1)
+        previous = float(out[lo + len(chunk) - 1])
+    return out
+
+
+def ema(values: np.ndarray, span: int) -> np.ndarray:
+    """Mitjana mòbil exponencial (alpha = 2 / (span + 1))"""
+    return ewm(values, 2.0 / (span + 1))
+
+
+def rsi(close: np.ndarray, period: int = RSI_PERIOD) -> np.ndarray:
+    """Índex de força relativa amb suavitzat de Wilder (alpha = 1 / period)"""
+    out = np.full(len(close), np.nan)
+    if len(close) < 2:
+        return out
+    changes = np.diff(close)
+    avg_gain = ewm(np.maximum(changes, 0.0), 1.0 / period)
+    avg_loss = ewm(np.maximum(-changes, 0.0), 1.0 / period)
+    out[1:] = _rsi_from_averages(avg_gain, avg_loss)
+    return out
+
+
+def _rsi_from_averages(avg_gain, avg_loss):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(avg_loss > 0, 100.0 - 100.0 / (1.0 + avg_gain / avg_loss), 100.0)
+
+
+def drawdown(close: np.ndarray) -> np.ndarray:
+    """Caiguda percentual des del màxim acumulat"""
+    if len(close) == 0:
+        return np.empty(0)
+    return (close / np.maximum.accumulate(close) - 1.0) * 100
+
+
+def log_returns(close: np.ndarray) -> np.ndarray:
+    """Rendiments logarítmics diaris (una barra menys que la sèrie)"""
+    return np.diff(np.log(close))
+
+
+def compute_indicator_series(series: PriceSeries) -> Dict[str, List]:
+    """Totes les sèries d'indicadors en format columnar (NaN -> None per a JSON)"""
+    close = series.close
+    columns = {"date": series.date_strings()}
+    for window in SMA_WINDOWS:
+        columns[f"sma_{window}"] = rolling_mean(close, window)
+    for span in EMA_SPANS:
+        columns[f"ema_{span}"] = ema(close, span)
+    columns[f"rsi_{RSI_PERIOD}"] = rsi(close)
+    volatility = np.full(len(close), np.nan)
+    if len(close) > 1:
+        volatility[1:] = rolling_std(log_returns(close), VOLATILITY_WINDOW) * math.sqrt(TRADING_DAYS) * 100
+    columns[f"volatility_{VOLATILITY_WINDOW}d"] = volatility
+    columns["drawdown_pct"] = drawdown(close)
+    return {
+        name: values if name == "date" else [None if math.isnan(v) else v for v in values.tolist()]
+        for name, values in columns.items()
+    }
+
+
+def _close_on_or_before(series: PriceSeries, target: np.datetime64) -> Optional[float]:
+    """Tancament de l'última barra no posterior a `target` (cerca binària)"""
+    days = series.dates.astype("datetime64[D]")
+    index = int(np.searchsorted(days, target, side="right")) - 1
+    if index < 0:
+        if int((days[0] - target).astype(int)) > RETURN_TOLERANCE_DAYS:
+            return None
+        index = 0
+    return float(series.close[index])
+
+
+def period_returns(series: PriceSeries) -> Dict[str, Optional[float]]:
+    """Rendiments 1W/1M/YTD/1Y (%) respecte a l'última barra"""
+    last = float(series.close[-1])
+    as_of = series.dates[-1].astype("datetime64[D]")
+    year = int(str(as_of)[:4])
+    targets = {name: as_of - np.timedelta64(days, "D") for name, days in RETURN_DAYS.items()}
+    targets["ytd"] = to_day(date(year - 1, 12, 31))
+
+    returns = {}
+    for name, target in targets.items():
+        base = _close_on_or_before(series, target)
+        returns[f"return_{name}_pct"] = (last / base - 1.0) * 100 if base else None
+    return returns
+
+
+# --- Estat incremental -------------------------------------------------------
+
+class IndicatorState:
+    """
+    Valors dels indicadors a l'última barra i acumuladors per avançar-los en O(1)
+
+    Les finestres (SMA, volatilitat) es mantenen com a sumes: en afegir una barra se
+    suma la nova i es resta la que surt, que es llegeix de la mateixa sèrie.
+    La sèrie també pot perdre barres per l'inici (el cache d'1 any llisca cada dia): el pic
+    i el drawdown màxim només es recalculen si surt de la finestra la barra del pic o la del
+    pic on comença el drawdown màxim. L'EMA i l'RSI conserven la llavor original: amb
+    una finestra d'un any la diferència amb recalcular-los és de l'ordre de 1e-6.
+    """
+
+    def __init__(self):
+        self.length = 0
+        self.first_date = None
+        self.last_date = None
+        self.last_close = 0.0
+        self.sma_sums: Dict[int, float] = {}
+        self.emas: Dict[int, float] = {}
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.return_sum = 0.0
+        self.return_sq_sum = 0.0
+        self.peak = 0.0
+        self.peak_date = None  # Última barra amb el tancament màxim
+        self.max_drawdown = 0.0
+        self.drawdown_peak_date = None  # Pic on comença el drawdown màxim
+
+    @classmethod
+    def from_series(cls, series: PriceSeries) -> "IndicatorState":
+        """Estat complet calculat amb operacions vectoritzades"""
+        state = cls()
+        close = series.close
+        state.length = len(series)
+        state.first_date = series.dates[0]
+        state.last_date = series.dates[-1]
+        state.last_close = float(close[-1])
+        for window in SMA_WINDOWS:
+            state.sma_sums[window] = float(close[-window:].sum())
+        for span in EMA_SPANS:
+            state.emas[span] = float(ema(close, span)[-1])
+        if len(close) > 1:
+            changes = np.diff(close)
+            state.avg_gain = float(ewm(np.maximum(changes, 0.0), 1.0 / RSI_PERIOD)[-1])
+            state.avg_loss = float(ewm(np.maximum(-changes, 0.0), 1.0 / RSI_PERIOD)[-1])
+            window_returns = log_returns(close[-(VOLATILITY_WINDOW + 1):])
+            state.return_sum = float(window_returns.sum())
+            state.return_sq_sum = float((window_returns * window_returns).sum())
+        state._reset_drawdown(series)
+        return state
+
+    def _reset_drawdown(self, series: PriceSeries):
+        """Pic i drawdown màxim de tota la sèrie (vectoritzat)"""
+        close = series.close
+        running_max = np.maximum.accumulate(close)
+        last = len(close) - 1
+        self.peak = float(running_max[-1])
+        self.peak_date = series.dates[last - int(np.argmax(close[::-1] == running_max[-1]))]
+        trough = int(np.argmin(close / running_max))
+        self.max_drawdown = float((close[trough] / running_max[trough] - 1.0) * 100)
+        if self.max_drawdown == 0.0:
+            self.drawdown_peak_date = self.peak_date  # Sense caigudes: no depèn de cap pic antic
+            return
+        before = close[:trough + 1][::-1]
+        self.drawdown_peak_date = series.dates[trough - int(np.argmax(before == running_max[trough]))]
+
+    def copy(self) -> "IndicatorState":
+        state = IndicatorState()
+        state.__dict__.update(self.__dict__)
+        state.sma_sums = dict(self.sma_sums)
+        state.emas = dict(self.emas)
+        return state
+
+    def advance(self, series: PriceSeries) -> "IndicatorState":
+        """
+        Nou estat amb l'última barra de `series`: la sèrie d'aquest estat més una barra,
+        potser sense algunes barres de l'inici (finestra lliscant)
+        """
+        state = self.copy()
+        close = series.close
+        n = len(series)
+        new = float(close[-1])
+
+        for window in SMA_WINDOWS:
+            leaving = float(close[-window - 1]) if n > window else 0.0
+            state.sma_sums[window] += new - leaving
+        for span in EMA_SPANS:
+            alpha = 2.0 / (span + 1)
+            state.emas[span] = alpha * new + (1 - alpha) * state.emas[span]
+
+        change = new - self.last_close
+        alpha = 1.0 / RSI_PERIOD
+        if self.length == 1:
+            state.avg_gain, state.avg_loss = max(change, 0.0), max(-change, 0.0)
+        else:
+            state.avg_gain = alpha * max(change, 0.0) + (1 - alpha) * self.avg_gain
+            state.avg_loss = alpha * max(-change, 0.0) + (1 - alpha) * self.avg_loss
+
+        entering = math.log(new / self.last_close)
+        state.return_sum += entering
+        state.return_sq_sum += entering * entering
+        if n > VOLATILITY_WINDOW + 1:
+            leaving = math.log(float(close[-VOLATILITY_WINDOW - 1]) / float(close[-VOLATILITY_WINDOW - 2]))
+            state.return_sum -= leaving
+            state.return_sq_sum -= leaving * leaving
+
+        first_date = series.dates[0]
+        if first_date > self.peak_date or first_date > self.drawdown_peak_date:
+            state._reset_drawdown(series)  # El pic ha sortit de la finestra
+        else:
+            if new >= self.peak:
+                state.peak, state.peak_date = new, series.dates[-1]
+            current = (new / state.peak - 1.0) * 100
+            if current < self.max_drawdown:
+                state.max_drawdown, state.drawdown_peak_date = current, state.peak_date
+        state.first_date = first_date
+        state.length = n
+        state.last_date = series.dates[-1]
+        state.last_close = new
+        return state
+
+    def _volatility(self) -> Optional[float]:
+        count = min(self.length - 1, VOLATILITY_WINDOW)
+        if count < VOLATILITY_WINDOW:
+            return None
+        variance = (self.return_sq_sum - self.return_sum ** 2 / count) / (count - 1)
+        return math.sqrt(max(variance, 0.0)) * math.sqrt(TRADING_DAYS) * 100
+
+    def snapshot(self, ticker: str, series: PriceSeries) -> CompanyIndicators:
+        """Indicadors a l'última barra"""
+        values = {
+            f"sma_{window}": self.sma_sums[window] / window if self.length >= window else None
+            for window in SMA_WINDOWS
+        }
+        values.update({f"ema_{span}": self.emas[span] for span in EMA_SPANS})
+        values[f"rsi_{RSI_PERIOD}"] = (
+            float(_rsi_from_averages(self.avg_gain, self.avg_loss)) if self.length > RSI_PERIOD else None
+        )
+        values[f"volatility_{VOLATILITY_WINDOW}d"] = self._volatility()
+        values.update(period_returns(series))
+        return CompanyIndicators(
+            ticker=ticker,
+            as_of=series.date_strings()[-1],
+            last_price=self.last_close,
+            drawdown_pct=(self.last_close / self.peak - 1.0) * 100,
+            max_drawdown_pct=self.max_drawdown,
+            **values
+        )
+
+
+class IndicatorStore:
+    """Indicadors per ticker i versió de sèrie, avançats incrementalment quan es pot"""
+
+    def __init__(self):
+        # ticker -> (versió, estat a l'última barra, estat a la penúltima, indicadors)
+        self._entries: Dict[str, Tuple[int, IndicatorState, Optional[IndicatorState], CompanyIndicators]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "incremental": 0, "full": 0}
+
+    def get(self, ticker: str, version: int, series: PriceSeries) -> Optional[CompanyIndicators]:
+        """Indicadors de la sèrie amb aquesta versió (recalculats només si cal)"""
+        if not series:
+            return None
+        entry = self._entries.get(ticker)
+        if entry and entry[0] == version:
+            self.stats["hits"] += 1
+            return entry[3]
+
+        state, previous = self._advance(entry, series)
+        indicators = state.snapshot(ticker, series)
+        with self._lock:
+            current = self._entries.get(ticker)
+            if current is None or current[0] <= version:
+                self._entries[ticker] = (version, state, previous, indicators)
+        return indicators
+
+    def _advance(
+        self,
+        entry: Optional[Tuple],
+        series: PriceSeries
+    ) -> Tuple[IndicatorState, Optional[IndicatorState]]:
+        """(estat nou, estat a la penúltima barra): O(1) si la sèrie afegeix o revisa l'última barra"""
+        if entry and len(series) > 1:
+            _, state, previous, _ = entry
+            prior_date, prior_close = series.dates[-2], float(series.close[-2])
+            # La sèrie pot haver perdut barres per l'inici (finestra lliscant), però no guanyar-ne
+            slid = series.dates[0] >= state.first_date
+            # Una barra nova just després de l'última coneguda
+            if slid and state.last_date == prior_date and state.last_close == prior_close:
+                self.stats["incremental"] += 1
+                return state.advance(series), state
+            # L'última barra revisada (p. ex. la del dia en curs amb un preu nou)
+            if slid and state.last_date == series.dates[-1]:
+                if previous is None:
+                    # L'estat a la penúltima barra només es calcula quan arriba una revisió
+                    self.stats["full"] += 1
+                    previous = IndicatorState.from_series(series[:-1])
+                if previous.last_date == prior_date and previous.last_close == prior_close:
+                    self.stats["incremental"] += 1
+                    return previous.advance(series), previous
+        self.stats["full"] += 1
+        return IndicatorState.from_series(series), None
+
+    def invalidate(self, ticker: Optional[str] = None):
+        """Elimina els indicadors d'un ticker (o tots)"""
+        with self._lock:
+            if ticker:
+                self._entries.pop(ticker, None)
+            else:
+                self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
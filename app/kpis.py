@@ -0,0 +1,89 @@
+"""
+Magatzem materialitzat de KPIs per ticker
+Cada KPI es recalcula només quan canvia la versió de la sèrie de preus del ticker
+"""
+
+import threading
+from typing import Dict, Optional, Tuple
+
+from app.models import Company, CompanyKPI
+from app.rolling import WINDOW_52W, ExtremesState
+from app.series import PriceSeries
+
+
+def compute_kpi(
+    company: Company,
+    prices: PriceSeries,
+    extremes: Optional[ExtremesState] = None
+) -> Optional[CompanyKPI]:
+    """
+    Calcula els KPIs d'una empresa a partir de la seva sèrie de preus
+    Amb `extremes` el màxim/mínim de 52 setmanes ve de les cues mòbils (O(1))
+    """
+    if not prices:
+        return None
+
+    # La sèrie està ordenada per data ascendent: l'última barra és la més recent
+    last_close = float(prices.close[-1])
+    previous_close = float(prices.close[-2]) if len(prices) > 1 else last_close
+
+    # Màxim/mínim 52 setmanes (~252 dies bursàtils/any), ignorant valors buits
+    if extremes is not None and extremes.high_52w is not None and extremes.low_52w is not None:
+        high_52w, low_52w = extremes.high_52w, extremes.low_52w
+    else:
+        highs = prices.high[-WINDOW_52W:]
+        lows = prices.low[-WINDOW_52W:]
+        high_52w = float(highs[highs > 0].max())
+        low_52w = float(lows[lows > 0].min())
+
+    # Mock market cap (preu * shares fictícies)
+    mkt_cap = last_close * 1000000  # Mock: 1M shares
+
+    # Variació percentual
+    chng_1d_pct = ((last_close - previous_close) / previous_close) * 100 if previous_close > 0 else 0
+
+    return CompanyKPI(
+        name=company.name,
+        ticker=company.ticker,
+        exchange=company.exchange,
+        sector=company.sector,
+        hq_province=company.hq_province,
+        last_price=last_close,
+        chng_1d_pct=chng_1d_pct,
+        high_52w=high_52w,
+        low_52w=low_52w,
+        mkt_cap=mkt_cap
+    )
+
+
+class KPIStore:
+    """KPIs indexats per ticker amb la versió de sèrie que els ha produït"""
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[int, CompanyKPI]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, ticker: str, version: int) -> Optional[CompanyKPI]:
+        """Retorna el KPI si està calculat per aquesta versió de la sèrie (O(1))"""
+        entry = self._entries.get(ticker)
+        if entry and entry[0] == version:
+            return entry[1]
+        return None
+
+    def put(self, ticker: str, version: int, kpi: CompanyKPI):
+        """Desa el KPI d'un ticker (només si és més nou que l'existent)"""
+        with self._lock:
+            current = self._entries.get(ticker)
+            if current is None or current[0] <= version:
+                self._entries[ticker] = (version, kpi)
+
+    def invalidate(self, ticker: Optional[str] = None):
+        """Elimina el KPI d'un ticker (o tots)"""
+        with self._lock:
+            if ticker:
+                self._entries.pop(ticker, None)
+            else:
+                self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,217 @@
+"""
+Cotitzacions en directe: un sol poller compartit i repartiment a tots els subscriptors
+
+- QuoteHub: mentre hi ha subscriptors, consulta la font de cotitzacions un cop per
+  ticker i cicle (unió dels tickers subscrits), sigui quin sigui el nombre de clients,
+  i publica les cotitzacions que han canviat.
+- Cada subscriptor té una cua acotada: si un client lent l'omple, es descarta la
+  cotització més antiga (drop-oldest) i el poller no s'atura mai per culpa seva.
+- La font és qualsevol funció bloquejant ticker -> dict (o None). Per defecte és
+  db.get_current_quote; FakeQuoteSource genera un passeig aleatori local per a proves.
+"""
+
+import asyncio
+import json
+import os
+import random
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set
+
+from app.db import db
+
+# Segons entre cicles del poller
+QUOTE_POLL_SECONDS = float(os.getenv("QUOTE_POLL_SECONDS", "30"))
+
+# Cotitzacions pendents per client abans de descartar les més antigues
+QUOTE_QUEUE_SIZE = int(os.getenv("QUOTE_QUEUE_SIZE", "100"))
+
+# Segons sense cotitzacions després dels quals s'envia un comentari keep-alive
+QUOTE_HEARTBEAT_SECONDS = float(os.getenv("QUOTE_HEARTBEAT_SECONDS", "15"))
+
+QuoteSource = Callable[[str], Optional[Dict]]
+
+
+class FakeQuoteSource:
+    """Font local de cotitzacions: passeig aleatori per ticker (sense xarxa)"""
+
+    def __init__(
+        self,
+        base: Optional[Callable[[str], Optional[float]]] = None,
+        volatility: float = 0.002,
+        seed: Optional[int] = None
+    ):
+        self.base = base
+        self.volatility = volatility
+        self.calls: Dict[str, int] = {}
+        self._prices: Dict[str, tuple] = {}  # ticker -> (tancament anterior, preu actual)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __call__(self, ticker: str) -> Optional[Dict]:
+        with self._lock:
+            self.calls[ticker] = self.calls.get(ticker, 0) + 1
+            if ticker not in self._prices:
+                start = (self.base(ticker) if self.base else None) or 100.0
+                self._prices[ticker] = (start, start)
+            previous_close, price = self._prices[ticker]
+            price = round(price * (1 + self._random.gauss(0, self.volatility)), 4)
+            self._prices[ticker] = (previous_close, price)
+        return quote_dict(ticker, price, previous_close)
+
+
+def quote_dict(ticker: str, price: float, previous_close: float, **extra) -> Dict:
+    """Cotització amb els camps de StockDataService.get_current_price"""
+    change = price - previous_close
+    return {
+        "ticker": ticker,
+        "current_price": price,
+        "previous_close": previous_close,
+        "change": change,
+        "change_percent": change / previous_close * 100 if previous_close else 0.0,
+        **extra,
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+class Subscription:
+    """Cua acotada d'un client amb descart de la cotització més antiga"""
+
+    def __init__(self, tickers: Optional[Set[str]], maxsize: int = QUOTE_QUEUE_SIZE):
+        self.tickers = tickers  # None: tot l'univers
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def wants(self, ticker: str) -> bool:
+        return self.tickers is None or ticker in self.tickers
+
+    def offer(self, quote: Dict):
+        """Encua sense bloquejar; si la cua és plena descarta la més antiga"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(quote)
+
+
+class QuoteHub:
+    """Poller compartit de cotitzacions i repartiment als subscriptors"""
+
+    def __init__(
+        self,
+        source: Optional[QuoteSource] = None,
+        universe: Optional[Callable[[], List[str]]] = None,
+        poll_seconds: float = QUOTE_POLL_SECONDS,
+        queue_size: int = QUOTE_QUEUE_SIZE
+    ):
+        self.source = source or db.get_current_quote
+        self.universe = universe or (lambda: [c.ticker for c in db.get_companies()])
+        self.poll_seconds = poll_seconds
+        self.queue_size = queue_size
+        self._subscribers: Set[Subscription] = set()
+        self._latest: Dict[str, Dict] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.stats = {"polls": 0, "upstream_calls": 0, "errors": 0, "published": 0, "dropped": 0}
+
+    def subscribe(self, tickers: Optional[List[str]] = None) -> Subscription:
+        """Nou subscriptor; rep de seguida l'última cotització coneguda i arrenca el poller si cal"""
+        subscription = Subscription(set(tickers) if tickers else None, self.queue_size)
+        for ticker, quote in self._latest.items():
+            if subscription.wants(ticker):
+                subscription.offer(quote)
+        self._subscribers.add(subscription)
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        else:
+            self._wakeup.set()  # Tickers nous: no esperar al cicle següent
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Treu el subscriptor (el poller s'atura sol quan no en queda cap)"""
+        self.stats["dropped"] += subscription.dropped
+        subscription.dropped = 0
+        self._subscribers.discard(subscription)
+
+    def _watched(self) -> List[str]:
+        """Unió dels tickers subscrits (cada ticker es consulta un sol cop per cicle)"""
+        if any(s.tickers is None for s in self._subscribers):
+            return self.universe()
+        return sorted(set().union(*(s.tickers for s in self._subscribers)))
+
+    async def _run(self):
+        while self._subscribers:
+            await self.poll()
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def poll(self):
+        """Un cicle: consulta cada ticker vigilat al pool de fils i publica els canvis"""
+        tickers = self._watched()
+        self.stats["polls"] += 1
+        self.stats["upstream_calls"] += len(tickers)
+        results = await asyncio.gather(
+            *(db.run_blocking(self.source, ticker) for ticker in tickers), return_exceptions=True
+        )
+        for ticker, quote in zip(tickers, results):
+            if isinstance(quote, Exception):
+                self.stats["errors"] += 1
+                continue
+            if quote:
+                self.publish(ticker, quote)
+
+    def publish(self, ticker: str, quote: Dict):
+        """Reparteix la cotització si ha canviat respecte a l'última publicada"""
+        previous = self._latest.get(ticker)
+        if previous and previous.get("current_price") == quote.get("current_price") \
+                and previous.get("change") == quote.get("change"):
+            return
+        self._latest[ticker] = quote
+        self.stats["published"] += 1
+        for subscription in list(self._subscribers):
+            if subscription.wants(ticker):
+                subscription.offer(quote)
+
+    async def stop(self):
+        """Atura el poller (en aturar l'aplicació)"""
+        self._subscribers.clear()
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def status(self) -> Dict:
+        return {
+            "running": bool(self._task and not self._task.done()),
+            "subscribers": len(self._subscribers),
+            "watched": len(self._watched()) if self._subscribers else 0,
+            "poll_seconds": self.poll_seconds,
+            "queue_size": self.queue_size,
+            **self.stats,
+            "dropped": self.stats["dropped"] + sum(s.dropped for s in self._subscribers)
+        }
+
+
+def sse_event(quote: Dict) -> str:
+    """Cotització en format Server-Sent Events"""
+    return f"event: quote\nid: {quote['timestamp']}\ndata: {json.dumps(quote)}\n\n"
+
+
+def _default_source() -> Optional[QuoteSource]:
+    """QUOTE_SOURCE=fake activa la font local (parteix de l'últim tancament conegut)"""
+    if os.getenv("QUOTE_SOURCE", "").lower() == "fake":
+        def last_close(ticker: str) -> Optional[float]:
+            latest = db.get_price_data(ticker).latest()
+            return latest.close if latest else None
+        return FakeQuoteSource(base=last_close)
+    return None
+
+
+# Instància global (el poller només corre mentre hi ha clients connectats)
+quote_hub = QuoteHub(_default_source())
@@ -1,89 +1,164 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse
+from app.api.admin import router as admin_router
+from app.api.analytics import router as analytics_router
 from app.api.companies import router as companies_router
+from app.api.export import router as export_router
+from app.api.stream import router as stream_router
+from app.datasets import datasets
 from app.db import db
-import random
-import json
+from app.downsample import CHART_MAX_POINTS, SERIES_MAX_POINTS, downsample
+from app.live import quote_hub
+from app.page_cache import page_cache
+from app.scheduler import scheduler, PREWARM_ENABLED
+from app.screener import parse_sort, split_values
+from typing import Optional
+from urllib.parse import urlencode
 import os
+import random
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Carrega els datasets, arrenca el precalentament en segon pla i allibera recursos (i el flux en directe) en aturar"""
+    await datasets.start()
+    if PREWARM_ENABLED:
+        await scheduler.start()
+    yield
+    await quote_hub.stop()
+    await scheduler.stop()
+    await datasets.stop()
+    db.shutdown()
+
 
 # Crear aplicació FastAPI
 app = FastAPI(
     title="Catalunya Stocks Dashboard",
     description="Dashboard d'empreses catalanes en borsa",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Muntar fitxers estàtics
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
+# Empreses per pàgina al llistat
+COMPANIES_PAGE_SIZE = int(os.getenv("COMPANIES_PAGE_SIZE", "50"))
+
 # Configurar templates
 templates = Jinja2Templates(directory="app/templates")
 
 # Incluir rutes API
 app.include_router(companies_router)
+app.include_router(admin_router)
+app.include_router(export_router)
+app.include_router(analytics_router)
+app.include_router(stream_router)
 
 
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
     """Pàgina d'inici amb 3 empreses destacades"""
     try:
-        # Obtenir totes les empreses amb KPIs
-        companies = db.get_company_kpis()
-        
-        if len(companies) < 3:
-            raise HTTPException(status_code=500, detail="No hi ha prou empreses per mostrar")
-        
-        # Seleccionar 3 empreses destacades (les primeres 3 per simplicitat)
-        featured_companies = companies[:3]
+        # Versió de les dades abans de llegir-les (un refresc entremig força un nou render)
+        version = db.get_data_version()
         
-        # Per cada empresa destacada, obtenir dades per sparkline
-        sparkline_data = {}
-        for company in featured_companies:
-            # Obtenir últimes 30 dades per sparkline
-            prices = db.get_series_data(company.ticker, "1M")
-            if prices:
-                sparkline_data[company.ticker] = [p.close for p in prices[-30:]]  # Últims 30 punts
-            else:
-                sparkline_data[company.ticker] = []
+        async def render():
+            # Obtenir totes les empreses amb KPIs (només si no hi ha render vàlid al cache)
+            companies = await db.aget_company_kpis()
+            
+            if len(companies) < 3:
+                raise HTTPException(status_code=500, detail="No hi ha prou empreses per mostrar")
+            
+            # Seleccionar 3 empreses destacades (les primeres 3 per simplicitat)
+            featured_companies = companies[:3]
+            
+            # Per cada empresa destacada, obtenir dades per sparkline
+            sparkline_data = {}
+            for company in featured_companies:
+                # Sèrie d'1 mes reduïda a 30 punts per la sparkline
+                prices = await db.aget_series_data(company.ticker, "1M")
+                if prices:
+                    sparkline_data[company.ticker] = downsample(prices, 30).close.tolist()  # Com a molt 30 punts
+                else:
+                    sparkline_data[company.ticker] = []
+            
+            return templates.TemplateResponse("home.html", {
+                "request": request,
+                "featured_companies": [c.dict() for c in featured_companies],
+                "sparkline_data": sparkline_data,
+                "title": "Empreses catalanes en borsa"
+            })
         
-        return templates.TemplateResponse("home.html", {
-            "request": request,
-            "featured_companies": [c.dict() for c in featured_companies],
-            "sparkline_data": sparkline_data,
-            "title": "Empreses catalanes en borsa"
-        })
+        return await page_cache.respond(request, "home", version, render)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error carregant pàgina d'inici: {str(e)}")
 
 
 @app.get("/companies", response_class=HTMLResponse)
-async def companies_page(request: Request):
-    """Pàgina amb llistat complet d'empreses"""
+async def companies_page(
+    request: Request,
+    exchange: Optional[str] = None,
+    sector: Optional[str] = None,
+    q: Optional[str] = None,
+    sort: Optional[str] = None,
+    cursor: Optional[str] = None
+):
+    """Pàgina amb llistat d'empreses filtrat i paginat al servidor (índexs del cercador)"""
     try:
-        companies = db.get_company_kpis()
+        sort_field, descending = parse_sort(sort)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        version = db.get_data_version()
         
-        # Obtenir llistes úniques per filtres
-        exchanges = list(set(c.exchange for c in companies))
-        sectors = list(set(c.sector for c in companies))
+        async def render():
+            index = await db.aget_screener_index()
+            categories = {
+                field: split_values(value)
+                for field, value in (("exchange", exchange), ("sector", sector))
+                if value
+            }
+            mask = index.select(categories, q=q)
+            try:
+                companies, next_cursor = index.page(mask, sort_field, descending, COMPANIES_PAGE_SIZE, cursor)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            
+            # Enllaç a la pàgina següent amb els mateixos filtres
+            next_url = None
+            if next_cursor:
+                params = {"exchange": exchange, "sector": sector, "q": q, "sort": sort, "cursor": next_cursor}
+                next_url = "/companies?" + urlencode({k: v for k, v in params.items() if v})
+            
+            return templates.TemplateResponse("companies.html", {
+                "request": request,
+                "companies": [c.dict() for c in companies],
+                "total": int(mask.sum()),
+                "exchanges": index.categories("exchange"),
+                "sectors": index.categories("sector"),
+                "filters": {"exchange": exchange or "", "sector": sector or "", "q": q or "", "sort": sort or ""},
+                "next_url": next_url,
+                "title": "Totes les empreses"
+            })
         
-        return templates.TemplateResponse("companies.html", {
-            "request": request,
-            "companies": [c.dict() for c in companies],
-            "exchanges": exchanges,
-            "sectors": sectors,
-            "title": "Totes les empreses"
-        })
+        key = f"companies:{exchange or ''}:{sector or ''}:{q or ''}:{sort_field}:{descending}:{cursor or ''}"
+        return await page_cache.respond(request, key, version, render)
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error carregant llista d'empreses: {str(e)}")
 
 
 @app.get("/company/{ticker}", response_class=HTMLResponse)
-async def company_detail(request: Request, ticker: str):
-    """Pàgina de detall d'una empresa"""
+async def company_detail(request: Request, ticker: str, points: int = CHART_MAX_POINTS):
+    """Pàgina de detall d'una empresa (`points` limita les barres dels gràfics)"""
     try:
         # Obtenir empresa
         company = db.get_company_by_ticker(ticker)
@@ -91,23 +166,31 @@ async def company_detail(request: Request, ticker: str):
             raise HTTPException(status_code=404, detail=f"Empresa {ticker} no trobada")
         
         # Obtenir KPIs
-        kpis = db.get_company_kpis()
-        company_kpi = next((kpi for kpi in kpis if kpi.ticker == ticker), None)
+        version = db.get_data_version([ticker])
+        company_kpi = await db.aget_company_kpi(ticker)
         
         if not company_kpi:
             raise HTTPException(status_code=404, detail=f"Dades KPI per {ticker} no trobades")
         
-        # Obtenir dades de preus per defecte (1Y)
-        prices = db.get_series_data(ticker, "1Y")
-        if not prices:
-            raise HTTPException(status_code=404, detail=f"Dades de preus per {ticker} no trobades")
+        points = max(2, min(points, SERIES_MAX_POINTS))
         
-        return templates.TemplateResponse("company_detail.html", {
-            "request": request,
-            "company": company_kpi.dict(),
-            "prices": [p.dict() for p in prices],
-            "title": f"{company.name} ({ticker})"
-        })
+        async def render():
+            # Obtenir dades de preus per defecte (1Y), reduïdes per al gràfic
+            prices = await db.aget_series_data(ticker, "1Y")
+            if not prices:
+                raise HTTPException(status_code=404, detail=f"Dades de preus per {ticker} no trobades")
+            indicators = await db.aget_company_indicators(ticker)
+            
+            return templates.TemplateResponse("company_detail.html", {
+                "request": request,
+                "company": company_kpi.dict(),
+                "indicators": indicators.model_dump() if indicators else None,
+                "prices": downsample(prices, points).to_columns(),
+                "points": points,
+                "title": f"{company.name} ({ticker})"
+            })
+        
+        return await page_cache.respond(request, f"company:{ticker}:{points}", version, render)
     
     except HTTPException:
         raise
@@ -119,18 +202,21 @@ async def company_detail(request: Request, ticker: str):
 async def demographics_page(request: Request):
     """Pàgina de demografia"""
     try:
-        # Carregar dades demogràfiques
-        demographics_path = os.path.join("data", "demographics.json")
-        with open(demographics_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        # Dades demogràfiques (en memòria, validades a l'arrencada)
+        # La versió es llegeix abans que les dades: una recàrrega entremig força un nou render
+        version = datasets.get_version("demographics")
+        data = datasets.get("demographics")
+        
+        async def render():
+            return templates.TemplateResponse("demographics.html", {
+                "request": request,
+                "overview": data["overview"],
+                "regions": data["regions"],
+                "age_groups": data["age_groups"],
+                "title": "Demografia de Catalunya"
+            })
         
-        return templates.TemplateResponse("demographics.html", {
-            "request": request,
-            "overview": data["overview"],
-            "regions": data["regions"],
-            "age_groups": data["age_groups"],
-            "title": "Demografia de Catalunya"
-        })
+        return await page_cache.respond(request, "demographics", version, render)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error carregant demografia: {str(e)}")
@@ -140,20 +226,23 @@ async def demographics_page(request: Request):
 async def housing_page(request: Request):
     """Pàgina d'habitatge"""
     try:
-        # Carregar dades d'habitatge
-        housing_path = os.path.join("data", "housing.json")
-        with open(housing_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        # Dades d'habitatge (en memòria, validades a l'arrencada)
+        # La versió es llegeix abans que les dades: una recàrrega entremig força un nou render
+        version = datasets.get_version("housing")
+        data = datasets.get("housing")
         
-        return templates.TemplateResponse("housing.html", {
-            "request": request,
-            "overview": data["overview"],
-            "prices": data["prices"],
-            "construction": data["construction"],
-            "mortgages": data["mortgages"],
-            "historical_prices": data["historical_prices"],
-            "title": "Habitatge a Catalunya"
-        })
+        async def render():
+            return templates.TemplateResponse("housing.html", {
+                "request": request,
+                "overview": data["overview"],
+                "prices": data["prices"],
+                "construction": data["construction"],
+                "mortgages": data["mortgages"],
+                "historical_prices": data["historical_prices"],
+                "title": "Habitatge a Catalunya"
+            })
+        
+        return await page_cache.respond(request, "housing", version, render)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error carregant habitatge: {str(e)}")
@@ -163,21 +252,24 @@ async def housing_page(request: Request):
 async def environment_page(request: Request):
     """Pàgina de medi ambient"""
     try:
-        # Carregar dades de medi ambient
-        environment_path = os.path.join("data", "environment.json")
-        with open(environment_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        # Dades de medi ambient (en memòria, validades a l'arrencada)
+        # La versió es llegeix abans que les dades: una recàrrega entremig força un nou render
+        version = datasets.get_version("environment")
+        data = datasets.get("environment")
+        
+        async def render():
+            return templates.TemplateResponse("environment.html", {
+                "request": request,
+                "overview": data["overview"],
+                "air_quality": data["air_quality"],
+                "energy": data["energy"],
+                "waste": data["waste"],
+                "renewable_evolution": data["renewable_evolution"],
+                "co2_emissions_evolution": data["co2_emissions_evolution"],
+                "title": "Medi Ambient a Catalunya"
+            })
         
-        return templates.TemplateResponse("environment.html", {
-            "request": request,
-            "overview": data["overview"],
-            "air_quality": data["air_quality"],
-            "energy": data["energy"],
-            "waste": data["waste"],
-            "renewable_evolution": data["renewable_evolution"],
-            "co2_emissions_evolution": data["co2_emissions_evolution"],
-            "title": "Medi Ambient a Catalunya"
-        })
+        return await page_cache.respond(request, "environment", version, render)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error carregant medi ambient: {str(e)}")
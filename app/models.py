@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
 from datetime import date
 
 
@@ -33,9 +33,37 @@ class CompanyKPI(BaseModel):
     mkt_cap: float
 
 
+class CompanyIndicators(BaseModel):
+    ticker: str
+    as_of: str  # Data de l'última barra
+    last_price: float
+    sma_20: Optional[float] = None
+    sma_50: Optional[float] = None
+    sma_200: Optional[float] = None
+    ema_12: float
+    ema_26: float
+    rsi_14: Optional[float] = None
+    volatility_20d: Optional[float] = None  # Anualitzada (%)
+    drawdown_pct: float  # Des del màxim de la sèrie
+    max_drawdown_pct: float
+    return_1w_pct: Optional[float] = None
+    return_1m_pct: Optional[float] = None
+    return_ytd_pct: Optional[float] = None
+    return_1y_pct: Optional[float] = None
+
+
+class IndicatorsResponse(CompanyIndicators):
+    series: Optional[Dict[str, List[Optional[Union[float, str]]]]] = None  # Columnes per a gràfics
+
+
 class SeriesResponse(BaseModel):
     ticker: str
     range: str
+    start: Optional[str] = None
+    end: Optional[str] = None
+    interval: str = "1d"  # 1d o intradia (1m, 5m, 15m, 30m, 1h)
+    total_points: Optional[int] = None  # Barres abans de reduir (si s'ha reduït)
+    method: Optional[str] = None  # Mètode de reducció aplicat
     prices: List[PriceData]
 
 
@@ -70,7 +98,7 @@ class DemographicsOverview(BaseModel):
     birth_rate: float
     death_rate: float
     life_expectancy: float
-    regions: List[PopulationData]
+    regions: List[PopulationData] = []
 
 
 # Models per Habitatge
@@ -153,3 +181,46 @@ class EnvironmentOverview(BaseModel):
     co2_reduction_1y: float
     green_energy_capacity_mw: float
     waste_per_capita: float
+
+
+# Evolucions anuals (gràfics històrics)
+class HousingHistoricalPrice(BaseModel):
+    year: int
+    avg_price_m2: float
+    avg_rent: float
+
+
+class RenewableEvolution(BaseModel):
+    year: int
+    renewable_percentage: float
+    capacity_mw: float
+
+
+class CO2EmissionsEvolution(BaseModel):
+    year: int
+    emissions_tons: float
+    reduction_pct: float
+
+
+# Fitxers de dades regionals complets (data/*.json)
+class DemographicsDataset(BaseModel):
+    overview: DemographicsOverview
+    regions: List[PopulationData]
+    age_groups: List[AgeGroupData]
+
+
+class HousingDataset(BaseModel):
+    overview: HousingOverview
+    prices: List[HousingPriceData]
+    construction: List[ConstructionData]
+    mortgages: List[MortgageData]
+    historical_prices: List[HousingHistoricalPrice]
+
+
+class EnvironmentDataset(BaseModel):
+    overview: EnvironmentOverview
+    air_quality: List[AirQualityData]
+    energy: List[EnergyData]
+    waste: List[WasteData]
+    renewable_evolution: List[RenewableEvolution]
+    co2_emissions_evolution: List[CO2EmissionsEvolution]
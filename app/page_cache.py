@@ -0,0 +1,119 @@
+"""
+Cache de respostes renderitzades (pàgines HTML i JSON de l'API) amb ETag i respostes 304
+
+Cada resposta es desa per clau (ruta i paràmetres) juntament amb la versió de les dades
+que la van produir (versions de sèries, dia actual, mtime dels datasets). Mentre la versió
+no canvia, es serveixen els mateixos bytes sense tornar a renderitzar ni serialitzar, i les
+peticions condicionals (If-None-Match) que coincideixen reben un 304 sense cos.
+"""
+
+import hashlib
+import os
+from typing import Awaitable, Callable, Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from app.services.memory_cache import LRUCache
+
+# Segons que navegadors i CDN poden reutilitzar una pàgina sense revalidar
+PAGE_CACHE_MAX_AGE = int(os.getenv("PAGE_CACHE_MAX_AGE", "60"))
+
+
+# Capçaleres que es recalculen per a cada resposta servida del cache
+_SKIP_HEADERS = ("content-length", "content-type", "etag", "cache-control")
+
+
+class _Page:
+    __slots__ = ("version", "body", "etag", "media_type", "headers")
+
+    def __init__(self, version: str, body: bytes, etag: str, media_type: Optional[str], headers: Dict[str, str]):
+        self.version = version
+        self.body = body
+        self.etag = etag
+        self.media_type = media_type
+        self.headers = headers
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.body)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comprova la capçalera If-None-Match (llista d'ETags, prefix W/ o *)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate == etag:
+            return True
+        if candidate.startswith("W/") and candidate[2:] == etag:
+            return True
+    return False
+
+
+class PageCache:
+    """Una entrada per clau: la resposta de l'última versió de dades renderitzada"""
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024, max_age: int = PAGE_CACHE_MAX_AGE):
+        self.max_age = max_age
+        self._pages = LRUCache(max_entries=max_entries, max_bytes=max_bytes)
+        self._stats = {"rendered": 0, "served_from_cache": 0, "not_modified": 0}
+
+    def _headers(self, page: _Page) -> Dict[str, str]:
+        headers = dict(page.headers)
+        headers["ETag"] = page.etag
+        headers["Cache-Control"] = f"public, max-age={self.max_age}, must-revalidate"
+        return headers
+
+    async def respond(
+        self,
+        request: Request,
+        key: str,
+        version: str,
+        render: Callable[[], Awaitable[Response]]
+    ) -> Response:
+        """
+        Retorna la resposta `key` per a aquesta versió de dades
+        304 si el client ja la té; els bytes desats si no ha canviat; si no, la renderitza
+        """
+        page = self._pages.get(key)
+        if page is not None and page.version == version:
+            self._stats["served_from_cache"] += 1
+        else:
+            response = await render()
+            if response.status_code != 200:
+                return response
+            body = bytes(response.body)
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            headers = {
+                name: value for name, value in response.headers.items()
+                if name.lower() not in _SKIP_HEADERS
+            }
+            page = _Page(version, body, etag, response.media_type, headers)
+            self._pages.set(key, page)
+            self._stats["rendered"] += 1
+
+        if _etag_matches(request.headers.get("if-none-match"), page.etag):
+            self._stats["not_modified"] += 1
+            return Response(status_code=304, headers=self._headers(page))
+
+        return Response(content=page.body, media_type=page.media_type, headers=self._headers(page))
+
+    def clear(self):
+        """Descarta totes les respostes desades"""
+        self._pages.discard_where(lambda key: True)
+
+    def stats(self) -> Dict:
+        """Comptadors de renders, encerts i 304"""
+        stats = dict(self._stats)
+        cache_stats = self._pages.stats()
+        stats["pages"] = cache_stats["entries"]
+        stats["bytes"] = cache_stats["bytes"]
+        stats["max_age"] = self.max_age
+        return stats
+
+
+# Instàncies globals: pàgines HTML i respostes de l'API
+page_cache = PageCache()
+api_cache = PageCache(max_entries=1024)
@@ -0,0 +1,63 @@
+"""
+Resposta JSON ràpida per a les rutes calentes de l'API
+
+Usa orjson si està instal·lat (fallback a json de la llibreria estàndard) i serialitza
+dades ja validades (diccionaris, llistes, arrays de NumPy) sense passar pel
+`response_model` de FastAPI ni per `jsonable_encoder`.
+"""
+
+import json
+import math
+from typing import Any
+
+import numpy as np
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+def _default(value: Any) -> Any:
+    """Tipus que json no sap serialitzar (escalars i arrays de NumPy)"""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Tipus no serialitzable: {type(value).__name__}")
+
+
+def _finite(value: Any) -> Any:
+    """Copia amb NaN/Inf -> None, com fa orjson (json amb allow_nan=False fallaria)"""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {k: _finite(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(v) for v in value]
+    if isinstance(value, (np.ndarray, np.generic)):
+        return _finite(value.tolist())
+    return value
+
+
+def dumps(content: Any) -> bytes:
+    """Codifica a JSON compacte UTF-8"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(
+        _finite(content),
+        default=_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse que codifica amb orjson (o json compacte si no hi és)"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,218 @@
+"""
+Extrems mòbils: màxim/mínim de 52 setmanes en O(1) amortitzat i consultes de finestra en O(1)
+
+- MonotonicDeque: màxim (o mínim) d'una finestra que avança una barra cada cop.
+  Cada valor entra i surt un sol cop de la cua: afegir una barra és O(1) amortitzat.
+- SparseTable: taula de potències de dos construïda un cop per versió de sèrie
+  (O(n log n), vectoritzada) que respon el màxim/mínim de qualsevol interval en O(1).
+- ExtremesStore: estat per ticker (cues de 52 setmanes + taula) que s'avança amb
+  la barra nova quan la sèrie només n'afegeix una. Cada avanç crea un estat nou:
+  els estats ja retornats no canvien mai (els poden llegir altres fils).
+"""
+
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.series import PriceSeries
+
+# Barres de la finestra de 52 setmanes (~252 dies bursàtils/any)
+WINDOW_52W = 252
+
+
+class MonotonicDeque:
+    """Màxim (o mínim) d'una finestra lliscant de `window` barres"""
+
+    def __init__(self, window: int, maximum: bool = True):
+        self.window = window
+        self.maximum = maximum
+        # (índex absolut, valor) amb valors estrictament decreixents (o creixents si és mínim)
+        self._items: deque = deque()
+
+    def copy(self) -> "MonotonicDeque":
+        """Còpia independent (com a molt `window` elements)"""
+        other = MonotonicDeque(self.window, self.maximum)
+        other._items = self._items.copy()
+        return other
+
+    def push(self, index: int, value: float):
+        """Afegeix la barra `index` i descarta les que surten de la finestra"""
+        items = self._items
+        if self.maximum:
+            while items and items[-1][1] <= value:
+                items.pop()
+        else:
+            while items and items[-1][1] >= value:
+                items.pop()
+        items.append((index, value))
+        self.expire(index)
+
+    def expire(self, index: int):
+        """Treu els valors anteriors a la finestra que acaba a `index`"""
+        items = self._items
+        while items and items[0][0] <= index - self.window:
+            items.popleft()
+
+    @property
+    def value(self) -> Optional[float]:
+        return self._items[0][1] if self._items else None
+
+
+class SparseTable:
+    """Màxim o mínim de qualsevol interval [lo, hi) en O(1) després d'O(n log n)"""
+
+    def __init__(self, values: np.ndarray, maximum: bool = True):
+        self._op = np.maximum if maximum else np.minimum
+        self._levels: List[np.ndarray] = [np.asarray(values, dtype=np.float64)]
+        span = 1
+        while span * 2 <= len(values):
+            previous = self._levels[-1]
+            self._levels.append(self._op(previous[:-span], previous[span:]))
+            span *= 2
+
+    def query(self, lo: int, hi: int) -> Optional[float]:
+        """Extrem de values[lo:hi] (None si l'interval és buit)"""
+        lo = max(lo, 0)
+        hi = min(hi, len(self._levels[0]))
+        if hi <= lo:
+            return None
+        level = (hi - lo).bit_length() - 1
+        row = self._levels[level]
+        return float(self._op(row[lo], row[hi - (1 << level)]))
+
+
+class ExtremesState:
+    """Màxim/mínim de 52 setmanes d'un ticker, avançable barra a barra"""
+
+    def __init__(self, window: int = WINDOW_52W):
+        self.window = window
+        self.count = 0  # Barres vistes (índex absolut de la propera barra)
+        self.last_date = None
+        self.last_high = 0.0
+        self.last_low = 0.0
+        self.prior_high: Optional[float] = None  # Extrems de la finestra abans de l'última barra
+        self.prior_low: Optional[float] = None
+        self._highs = MonotonicDeque(window, maximum=True)
+        self._lows = MonotonicDeque(window, maximum=False)
+        self._tables: Optional[Tuple[SparseTable, SparseTable]] = None
+
+    @classmethod
+    def from_series(cls, series: PriceSeries, window: int = WINDOW_52W) -> "ExtremesState":
+        """Estat a partir de les últimes `window` + 1 barres"""
+        state = cls(window)
+        tail = series[-(window + 1):]
+        for high, low in zip(tail.high.tolist(), tail.low.tolist()):
+            state._push(high, low)
+        state.last_date = series.dates[-1]
+        return state
+
+    def _push(self, high: float, low: float):
+        self.prior_high = self._highs.value
+        self.prior_low = self._lows.value
+        # Els valors buits (<= 0) no compten però la finestra avança igualment
+        if high > 0:
+            self._highs.push(self.count, high)
+        else:
+            self._highs.expire(self.count)
+        if low > 0:
+            self._lows.push(self.count, low)
+        else:
+            self._lows.expire(self.count)
+        self.count += 1
+        self.last_high = high
+        self.last_low = low
+
+    def copy(self) -> "ExtremesState":
+        """Còpia independent de les cues (sense taules: són de la sèrie anterior)"""
+        state = ExtremesState(self.window)
+        state.__dict__.update(self.__dict__)
+        state._highs = self._highs.copy()
+        state._lows = self._lows.copy()
+        state._tables = None
+        return state
+
+    def advance(self, series: PriceSeries) -> "ExtremesState":
+        """Nou estat amb l'última barra de `series` (que ha d'allargar en una la d'aquest estat)"""
+        state = self.copy()
+        state._push(float(series.high[-1]), float(series.low[-1]))
+        state.last_date = series.dates[-1]
+        return state
+
+    @property
+    def high_52w(self) -> Optional[float]:
+        return self._highs.value
+
+    @property
+    def low_52w(self) -> Optional[float]:
+        return self._lows.value
+
+    @property
+    def is_new_high(self) -> bool:
+        """L'última barra supera el màxim de la finestra anterior"""
+        return self.prior_high is not None and self.last_high > self.prior_high
+
+    @property
+    def is_new_low(self) -> bool:
+        """L'última barra cau per sota del mínim de la finestra anterior"""
+        return self.prior_low is not None and 0 < self.last_low < self.prior_low
+
+    def window_extremes(self, series: PriceSeries, bars: int) -> Tuple[Optional[float], Optional[float]]:
+        """(màxim, mínim) de les últimes `bars` barres amb taules dispersa (O(1) per consulta)"""
+        tables = self._tables
+        if tables is None:
+            # Dos fils poden construir-les alhora: el resultat és el mateix i s'assigna sencer
+            highs = np.where(series.high > 0, series.high, -np.inf)
+            lows = np.where(series.low > 0, series.low, np.inf)
+            tables = (SparseTable(highs, maximum=True), SparseTable(lows, maximum=False))
+            self._tables = tables
+        n = len(series)
+        high = tables[0].query(n - bars, n)
+        low = tables[1].query(n - bars, n)
+        return (
+            high if high is not None and np.isfinite(high) else None,
+            low if low is not None and np.isfinite(low) else None
+        )
+
+
+class ExtremesStore:
+    """Estat d'extrems per ticker i versió de sèrie"""
+
+    def __init__(self, window: int = WINDOW_52W):
+        self.window = window
+        self._entries: Dict[str, Tuple[int, ExtremesState]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "incremental": 0, "full": 0}
+
+    def get(self, ticker: str, version: int, series: PriceSeries) -> Optional[ExtremesState]:
+        """Estat per a aquesta versió: avança en O(1) si la sèrie només afegeix una barra"""
+        if not series:
+            return None
+        with self._lock:
+            entry = self._entries.get(ticker)
+            if entry and entry[0] == version:
+                self.stats["hits"] += 1
+                return entry[1]
+
+            state = entry[1] if entry else None
+            if (state is not None and len(series) > 1 and state.last_date == series.dates[-2]
+                    and state.last_high == float(series.high[-2]) and state.last_low == float(series.low[-2])):
+                state = state.advance(series)
+                self.stats["incremental"] += 1
+            else:
+                state = ExtremesState.from_series(series, self.window)
+                self.stats["full"] += 1
+            self._entries[ticker] = (version, state)
+            return state
+
+    def invalidate(self, ticker: Optional[str] = None):
+        """Elimina l'estat d'un ticker (o tots)"""
+        with self._lock:
+            if ticker:
+                self._entries.pop(ticker, None)
+            else:
+                self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,170 @@
+"""
+Planificador en segon pla que precalenta tot l'univers abans que caduqui el cache
+
+S'inicia des del lifespan de FastAPI. Fa una primera càrrega de tots els tickers
+(en lot) i després refresca cada ticker de forma escalonada abans del seu TTL,
+deixant un espai mínim entre descàrregues per respectar els rate limits.
+"""
+
+import asyncio
+import heapq
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app.db import DataManager, db, stock_service, YFINANCE_AVAILABLE
+
+# Fracció del TTL després de la qual es refresca un ticker (abans que caduqui)
+REFRESH_LEAD_FRACTION = 0.8
+
+
+def _default_refresh_seconds(manager: DataManager) -> float:
+    """Interval de refresc per ticker a partir del TTL de preus de la font activa"""
+    if YFINANCE_AVAILABLE and stock_service:
+        ttl_minutes = stock_service.cache_ttl["price_data"]
+    elif manager.alphavantage_service:
+        ttl_minutes = manager.alphavantage_service.cache_ttl["price_data"]
+    else:
+        ttl_minutes = 60
+    return ttl_minutes * 60 * REFRESH_LEAD_FRACTION
+
+
+def _default_min_spacing(manager: DataManager) -> float:
+    """Segons mínims entre descàrregues (Alpha Vantage gratuït: 5 req/min)"""
+    if YFINANCE_AVAILABLE and stock_service:
+        return 1.0
+    if manager.alphavantage_service:
+        return 12.0
+    return 0.0
+
+
+class PrewarmScheduler:
+    """Cua de refrescos per ticker ordenada per hora de venciment"""
+
+    def __init__(
+        self,
+        manager: DataManager,
+        refresh_seconds: Optional[float] = None,
+        min_spacing_seconds: Optional[float] = None
+    ):
+        self.manager = manager
+        self.refresh_seconds = refresh_seconds or _default_refresh_seconds(manager)
+        self.min_spacing_seconds = (
+            min_spacing_seconds if min_spacing_seconds is not None else _default_min_spacing(manager)
+        )
+
+        self._queue: List[Tuple[float, str]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._last_runs: Dict[str, Dict] = {}
+        self._current: Optional[str] = None
+        self._started_at: Optional[str] = None
+        self._runs = 0
+        self._failures = 0
+
+    async def start(self):
+        """Arrenca el bucle de precalentament (idempotent)"""
+        if self._task and not self._task.done():
+            return
+        self._stop = asyncio.Event()
+        self._started_at = datetime.now().isoformat()
+        self._task = asyncio.create_task(self._run())
+        print(f"⏰ Planificador de precalentament actiu (refresc cada {self.refresh_seconds / 60:.0f} min)")
+
+    async def stop(self):
+        """Atura el bucle i espera que acabi la tasca en curs"""
+        if not self._task:
+            return
+        self._stop.set()
+        try:
+            await asyncio.wait_for(self._task, timeout=30)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+        self._task = None
+
+    async def _run(self):
+        # Primera càrrega de tot l'univers (descàrrega en lot dels tickers freds)
+        start = time.perf_counter()
+        try:
+            kpis = await self.manager.aget_company_kpis()
+            print(f"🔥 Univers precalentat: {len(kpis)} empreses en {time.perf_counter() - start:.1f}s")
+        except Exception as e:
+            print(f"⚠️  Error en el precalentament inicial: {e}")
+
+        # Escalonar els refrescos al llarg de l'interval perquè no caduquin tots alhora
+        tickers = [c.ticker for c in self.manager.get_companies()]
+        now = time.time()
+        self._queue = []
+        for i, ticker in enumerate(tickers):
+            due = now + self.refresh_seconds * (i + 1) / max(len(tickers), 1)
+            heapq.heappush(self._queue, (due, ticker))
+
+        while not self._stop.is_set() and self._queue:
+            due, ticker = self._queue[0]
+            wait = due - time.time()
+            if wait > 0:
+                if await self._sleep(wait):
+                    break
+                continue
+
+            heapq.heappop(self._queue)
+            await self._refresh(ticker)
+            heapq.heappush(self._queue, (time.time() + self.refresh_seconds, ticker))
+
+            # Espai mínim entre descàrregues upstream
+            if self.min_spacing_seconds and await self._sleep(self.min_spacing_seconds):
+                break
+
+    async def _sleep(self, seconds: float) -> bool:
+        """Espera fins a `seconds` o fins que s'aturi; retorna True si s'ha aturat"""
+        try:
+            await asyncio.wait_for(self._stop.wait(), timeout=seconds)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _refresh(self, ticker: str):
+        """Refresca un ticker al pool de fils i en desa el resultat"""
+        self._current = ticker
+        start = time.perf_counter()
+        error = None
+        try:
+            ok = await self.manager.run_blocking(self.manager.warm_ticker, ticker)
+        except Exception as e:
+            ok = False
+            error = str(e)[:200]
+
+        self._runs += 1
+        if not ok:
+            self._failures += 1
+        self._last_runs[ticker] = {
+            "at": datetime.now().isoformat(),
+            "ok": ok,
+            "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+            "error": error
+        }
+        self._current = None
+
+    def status(self) -> Dict:
+        """Estat del planificador: cua, tasca en curs i última execució per ticker"""
+        now = time.time()
+        return {
+            "running": bool(self._task and not self._task.done()),
+            "started_at": self._started_at,
+            "refresh_seconds": self.refresh_seconds,
+            "min_spacing_seconds": self.min_spacing_seconds,
+            "current": self._current,
+            "runs": self._runs,
+            "failures": self._failures,
+            "queue": [
+                {"ticker": ticker, "due_in_seconds": round(max(0.0, due - now), 1)}
+                for due, ticker in sorted(self._queue)
+            ],
+            "last_runs": self._last_runs
+        }
+
+
+# Instància global (s'arrenca al lifespan de l'aplicació si PREWARM_ENABLED != 0)
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "1") not in ("0", "false", "False")
+scheduler = PrewarmScheduler(db)
@@ -0,0 +1,166 @@
+"""
+Cercador d'empreses (screener) amb índexs per camp sobre els KPIs de l'univers
+
+L'índex es construeix un cop per versió de dades, al costat del magatzem de KPIs:
+- Camps categòrics (borsa, sector, província): hash valor -> files (arrays d'enters).
+- Camps numèrics (preu, variació, capitalització, extrems 52s): ordre de les files
+  per (valor, ticker); els rangs es resolen amb cerca binària sobre l'array ordenat.
+- Text (`q`): nom i ticker en minúscules, cercats de forma vectoritzada.
+
+La paginació és per clau (keyset): el cursor codifica (valor d'ordenació, ticker) de
+l'última fila retornada i la pàgina següent continua amb cerca binària, sense OFFSET.
+"""
+
+import base64
+import json
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.models import CompanyKPI
+
+CATEGORICAL_FIELDS = ("exchange", "sector", "hq_province")
+NUMERIC_FIELDS = ("last_price", "chng_1d_pct", "mkt_cap", "high_52w", "low_52w")
+
+# Ordenacions acceptades (`-camp` és descendent); `order` és l'ordre original de l'univers
+DEFAULT_SORT = "order"
+SORT_FIELDS = (DEFAULT_SORT, "ticker", "name") + NUMERIC_FIELDS
+
+# Límit màxim de files per pàgina
+SCREENER_MAX_LIMIT = 1000
+
+
+class ScreenerIndex:
+    """Índexs per camp d'una llista de KPIs (immutables: un per versió de dades)"""
+
+    def __init__(self, kpis: List[CompanyKPI]):
+        self.kpis = kpis
+        self.tickers = np.array([k.ticker for k in kpis], dtype=str)
+
+        # Hash per valor categòric -> files (en l'ordre de l'univers)
+        self._categorical: Dict[str, Dict[str, np.ndarray]] = {}
+        for field in CATEGORICAL_FIELDS:
+            rows: Dict[str, List[int]] = {}
+            for i, kpi in enumerate(kpis):
+                rows.setdefault(getattr(kpi, field), []).append(i)
+            self._categorical[field] = {value: np.array(r, dtype=np.int64) for value, r in rows.items()}
+
+        # Valors de cada camp ordenable i ordre de les files per (valor, ticker)
+        self._values: Dict[str, np.ndarray] = {DEFAULT_SORT: np.arange(len(kpis), dtype=np.float64)}
+        self._values["ticker"] = self.tickers
+        self._values["name"] = np.array([k.name.lower() for k in kpis], dtype=str)
+        for field in NUMERIC_FIELDS:
+            self._values[field] = np.array([getattr(k, field) for k in kpis], dtype=np.float64)
+        self._orders: Dict[str, np.ndarray] = {
+            field: np.lexsort((self.tickers, values)) for field, values in self._values.items()
+        }
+        self._sorted: Dict[str, Tuple[np.ndarray, np.ndarray]] = {
+            field: (self._values[field][order], self.tickers[order]) for field, order in self._orders.items()
+        }
+
+        self._text = np.char.add(np.char.add(self._values["name"], " "), np.char.lower(self.tickers))
+
+    def __len__(self) -> int:
+        return len(self.kpis)
+
+    def categories(self, field: str) -> List[str]:
+        """Valors diferents d'un camp categòric (ordenats, per als filtres de la UI)"""
+        return sorted(self._categorical[field])
+
+    def select(
+        self,
+        categories: Optional[Dict[str, List[str]]] = None,
+        ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+        q: Optional[str] = None
+    ) -> np.ndarray:
+        """Màscara de files que compleixen tots els filtres (OR dins d'un camp, AND entre camps)"""
+        mask = np.ones(len(self), dtype=bool)
+        for field, values in (categories or {}).items():
+            index = self._categorical[field]
+            hits = [index[v] for v in values if v in index]
+            field_mask = np.zeros(len(self), dtype=bool)
+            if hits:
+                field_mask[np.concatenate(hits)] = True
+            mask &= field_mask
+
+        for field, (low, high) in (ranges or {}).items():
+            values, _ = self._sorted[field]
+            start = 0 if low is None else int(np.searchsorted(values, low, side="left"))
+            end = len(values) if high is None else int(np.searchsorted(values, high, side="right"))
+            field_mask = np.zeros(len(self), dtype=bool)
+            field_mask[self._orders[field][start:end]] = True
+            mask &= field_mask
+
+        if q:
+            mask &= np.char.find(self._text, q.lower()) >= 0
+        return mask
+
+    def page(
+        self,
+        mask: np.ndarray,
+        sort: str = DEFAULT_SORT,
+        descending: bool = False,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[CompanyKPI], Optional[str]]:
+        """
+        Files seleccionades en l'ordre demanat a partir del cursor
+        Retorna (pàgina, cursor de la pàgina següent o None si és l'última)
+        """
+        order = self._orders[sort]
+        if cursor:
+            value, ticker = decode_cursor(cursor, sort)
+            values, tickers = self._sorted[sort]
+            lo = int(np.searchsorted(values, value, side="left"))
+            hi = int(np.searchsorted(values, value, side="right"))
+            if descending:
+                end = lo + int(np.searchsorted(tickers[lo:hi], ticker, side="left"))
+                candidates = order[:end][::-1]
+            else:
+                start = lo + int(np.searchsorted(tickers[lo:hi], ticker, side="right"))
+                candidates = order[start:]
+        else:
+            candidates = order[::-1] if descending else order
+
+        rows = candidates[mask[candidates]]
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            last = int(rows[-1])
+            next_cursor = encode_cursor(self._values[sort][last], self.tickers[last])
+        return [self.kpis[i] for i in rows.tolist()], next_cursor
+
+
+def encode_cursor(value, ticker: str) -> str:
+    """Cursor opac (base64 URL-safe) amb el valor d'ordenació i el ticker de l'última fila"""
+    value = value.item() if isinstance(value, np.generic) else value
+    raw = json.dumps([value, str(ticker)], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[object, str]:
+    """(valor, ticker) d'un cursor; ValueError si no és vàlid per a aquesta ordenació"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, ticker = json.loads(raw)
+    except Exception:
+        raise ValueError(f"Cursor '{cursor}' no vàlid")
+    textual = sort in ("ticker", "name")
+    if not isinstance(ticker, str) or isinstance(value, str) != textual or isinstance(value, bool):
+        raise ValueError(f"Cursor '{cursor}' no vàlid per a l'ordenació '{sort}'")
+    return value, ticker
+
+
+def parse_sort(sort: Optional[str]) -> Tuple[str, bool]:
+    """`camp` o `-camp` -> (camp, descendent); ValueError si el camp no és ordenable"""
+    sort = sort or DEFAULT_SORT
+    descending = sort.startswith("-")
+    field = sort.lstrip("-")
+    if field not in SORT_FIELDS:
+        raise ValueError(f"Ordenació '{sort}' no vàlida. Usa: {', '.join(SORT_FIELDS)} (prefix '-' per descendent)")
+    return field, descending
+
+
+def split_values(param: Optional[str]) -> List[str]:
+    """Llista separada per comes d'un paràmetre de filtre"""
+    return [v.strip() for v in param.split(",") if v.strip()] if param else []
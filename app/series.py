@@ -0,0 +1,339 @@
+"""
+Sèries de preus columnars (OHLCV) basades en arrays de NumPy
+Substitueixen les llistes de PriceData: els models Pydantic només es creen a la frontera de l'API
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+from app.models import PriceData
+
+# Tipus de la columna de dates (diàries) i de marques de temps (intradia)
+DATE_DTYPE = "datetime64[D]"
+INTRADAY_DTYPE = "datetime64[s]"
+
+# Dies de calendari de cada rang de l'API
+RANGE_DAYS = {
+    "1M": 30,
+    "3M": 90,
+    "1Y": 365,
+    "5Y": 1825,
+    "10Y": 3650
+}
+
+# Rangs acceptats per l'API (YTD: des de l'1 de gener; MAX: tot l'històric)
+VALID_RANGES = ("1M", "3M", "YTD", "1Y", "5Y", "10Y", "MAX")
+
+# Interval diari i intervals intradia amb els dies màxims que serveix Yahoo Finance
+DAILY_INTERVAL = "1d"
+INTRADAY_MAX_DAYS = {
+    "1m": 7,
+    "5m": 60,
+    "15m": 60,
+    "30m": 60,
+    "1h": 730
+}
+VALID_INTERVALS = (DAILY_INTERVAL,) + tuple(INTRADAY_MAX_DAYS)
+
+# Fins a aquests dies d'històric diari n'hi ha prou amb un sol període en cache;
+# més enllà es fa servir l'emmagatzematge per particions anuals
+SHORT_HISTORY_DAYS = 365
+
+# Períodes de yfinance ordenats de menor a major, amb els dies que cobreixen
+PERIOD_DAYS = [
+    ("1mo", 30),
+    ("3mo", 90),
+    ("6mo", 180),
+    ("1y", 365),
+    ("2y", 730),
+    ("5y", 1825),
+    ("10y", 3650)
+]
+
+DateLike = Union[str, date, datetime, np.datetime64]
+
+
+def to_day(value: DateLike) -> np.datetime64:
+    """Converteix una data (str YYYY-MM-DD, date o datetime64) a datetime64[D]"""
+    if isinstance(value, str):
+        value = value[:10]
+    elif isinstance(value, datetime):
+        value = value.date()
+    return np.datetime64(value, "D")
+
+
+def range_start(range_param: str, today: Optional[date] = None) -> Optional[np.datetime64]:
+    """Primera data inclosa en un rang de l'API (None per MAX: tot l'històric)"""
+    today = today or datetime.now().date()
+    if range_param == "MAX":
+        return None
+    if range_param == "YTD":
+        return to_day(date(today.year, 1, 1))
+    days = RANGE_DAYS.get(range_param, RANGE_DAYS["1Y"])
+    return to_day(today - timedelta(days=days))
+
+
+def days_since(start: Optional[DateLike], today: Optional[date] = None) -> Optional[int]:
+    """Dies de calendari des de `start` fins avui (None si no hi ha inici)"""
+    if start is None:
+        return None
+    today = today or datetime.now().date()
+    return int((to_day(today) - to_day(start)).astype(int))
+
+
+def period_for_start(start: Optional[DateLike], today: Optional[date] = None) -> str:
+    """Període de yfinance més petit que cobreix des de `start` fins avui"""
+    days = days_since(start, today)
+    if days is None:
+        return "max"
+    for period, period_days in PERIOD_DAYS:
+        if days <= period_days:
+            return period
+    return "max"
+
+
+def period_start(period: str, today: Optional[date] = None) -> Optional[np.datetime64]:
+    """Primera data que cobreix un període de yfinance (None per max o períodes desconeguts)"""
+    today = today or datetime.now().date()
+    if period == "ytd":
+        return to_day(date(today.year, 1, 1))
+    days = dict(PERIOD_DAYS, **{"1d": 1, "5d": 5}).get(period)
+    if days is None:
+        return None
+    return to_day(today - timedelta(days=days))
+
+
+def is_short_history(start: Optional[DateLike], interval: str = DAILY_INTERVAL) -> bool:
+    """True si la petició es pot servir del cache per període (diari i fins a 1 any)"""
+    days = days_since(start)
+    return interval == DAILY_INTERVAL and days is not None and days <= SHORT_HISTORY_DAYS
+
+
+class PriceSeries:
+    """
+    Sèrie OHLCV columnar i immutable, ordenada per data ascendent
+
+    Cada columna és un array de NumPy de la mateixa longitud: `dates` (datetime64[D] per
+    barres diàries o datetime64[s] per intradia), `open`/`high`/`low`/`close` (float64)
+    i `volume` (int64).
+    Les columnes són de només lectura: una sèrie en cache es pot compartir entre fils
+    sense còpies ni locks. Indexar amb un slice retorna una vista sense còpia.
+    """
+
+    __slots__ = ("dates", "open", "high", "low", "close", "volume")
+
+    def __init__(
+        self,
+        dates: np.ndarray,
+        open: np.ndarray,
+        high: np.ndarray,
+        low: np.ndarray,
+        close: np.ndarray,
+        volume: np.ndarray
+    ):
+        self.dates = dates
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        for name in self.__slots__:
+            getattr(self, name).flags.writeable = False
+
+    @classmethod
+    def empty(cls, intraday: bool = False) -> "PriceSeries":
+        """Sèrie buida"""
+        return cls(
+            np.empty(0, dtype=INTRADAY_DTYPE if intraday else DATE_DTYPE),
+            np.empty(0, dtype=np.float64),
+            np.empty(0, dtype=np.float64),
+            np.empty(0, dtype=np.float64),
+            np.empty(0, dtype=np.float64),
+            np.empty(0, dtype=np.int64)
+        )
+
+    @classmethod
+    def from_columns(
+        cls,
+        dates: Iterable,
+        open: Iterable[float],
+        high: Iterable[float],
+        low: Iterable[float],
+        close: Iterable[float],
+        volume: Iterable[int],
+        intraday: bool = False
+    ) -> "PriceSeries":
+        """
+        Construeix una sèrie a partir de columnes en qualsevol ordre
+        Ordena per data un sol cop i elimina dates duplicades (es queda l'última)
+        Amb `intraday` les dates es guarden amb resolució de segons
+        """
+        dates = np.asarray(dates).astype(INTRADAY_DTYPE if intraday else DATE_DTYPE)
+        columns = [
+            np.asarray(open, dtype=np.float64),
+            np.asarray(high, dtype=np.float64),
+            np.asarray(low, dtype=np.float64),
+            np.asarray(close, dtype=np.float64),
+            np.nan_to_num(np.asarray(volume, dtype=np.float64)).astype(np.int64)
+        ]
+
+        if len(dates) > 1:
+            # Ordenació estable: entre duplicats, l'última aparició queda al final
+            order = np.argsort(dates, kind="stable")
+            dates = dates[order]
+            columns = [col[order] for col in columns]
+
+            keep = np.ones(len(dates), dtype=bool)
+            keep[:-1] = dates[1:] != dates[:-1]
+            if not keep.all():
+                dates = dates[keep]
+                columns = [col[keep] for col in columns]
+
+        return cls(dates, *columns)
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> "PriceSeries":
+        """Construeix una sèrie des de diccionaris {date, open, high, low, close, volume}"""
+        records = list(records)
+        if not records:
+            return cls.empty()
+
+        return cls.from_columns(
+            [r["date"][:10] for r in records],
+            [r.get("open", r["close"]) for r in records],
+            [r.get("high", r["close"]) for r in records],
+            [r.get("low", r["close"]) for r in records],
+            [r["close"] for r in records],
+            [r.get("volume", 0) for r in records]
+        )
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def __bool__(self) -> bool:
+        return len(self.dates) > 0
+
+    def __getitem__(self, index) -> "PriceSeries":
+        """Subsèrie: slice (vista sense còpia) o màscara/índexs (còpia)"""
+        if isinstance(index, (int, np.integer)):
+            raise TypeError("Usa bar(i) per obtenir una barra individual")
+        return PriceSeries(
+            self.dates[index],
+            self.open[index],
+            self.high[index],
+            self.low[index],
+            self.close[index],
+            self.volume[index]
+        )
+
+    def slice_dates(self, start: Optional[DateLike] = None, end: Optional[DateLike] = None) -> "PriceSeries":
+        """
+        Subsèrie amb dates dins de [start, end] (ambdós inclosos)
+        Cerca binària sobre les dates ordenades: O(log n) i vista sense còpia
+        """
+        lo = 0 if start is None else int(np.searchsorted(self.dates, to_day(start), side="left"))
+        if end is None:
+            hi = len(self.dates)
+        elif self.is_intraday:
+            # Intradia: el dia final s'inclou sencer
+            hi = int(np.searchsorted(self.dates, to_day(end) + np.timedelta64(1, "D"), side="left"))
+        else:
+            hi = int(np.searchsorted(self.dates, to_day(end), side="right"))
+        return self[lo:max(lo, hi)]
+
+    @property
+    def is_intraday(self) -> bool:
+        """True si les dates tenen resolució inferior al dia"""
+        return self.dates.dtype != np.dtype(DATE_DTYPE)
+
+    @staticmethod
+    def concat(parts: List["PriceSeries"]) -> "PriceSeries":
+        """Uneix sèries consecutives ja ordenades i sense solapaments (p. ex. particions)"""
+        parts = [part for part in parts if part]
+        if not parts:
+            return PriceSeries.empty()
+        if len(parts) == 1:
+            return parts[0]
+        return PriceSeries(*[
+            np.concatenate([getattr(part, name) for part in parts])
+            for name in PriceSeries.__slots__
+        ])
+
+    @staticmethod
+    def merge(old: "PriceSeries", new: "PriceSeries") -> "PriceSeries":
+        """Combina dues sèries; per dates repetides guanya la barra de `new`"""
+        if not old:
+            return new
+        if not new:
+            return old
+        return PriceSeries.from_columns(
+            *[np.concatenate([getattr(old, name), getattr(new, name)]) for name in PriceSeries.__slots__],
+            intraday=old.is_intraday or new.is_intraday
+        )
+
+    def latest(self) -> Optional[PriceData]:
+        """Barra més recent (O(1)); None si la sèrie és buida"""
+        return self.bar(-1) if len(self.dates) else None
+
+    def previous(self) -> Optional[PriceData]:
+        """Barra anterior a la més recent (O(1)); None si no n'hi ha"""
+        return self.bar(-2) if len(self.dates) > 1 else None
+
+    def reversed(self) -> "PriceSeries":
+        """
+        Vista en ordre descendent (la barra més recent primer), sense còpia
+        Només per presentació: slice_dates() requereix l'ordre ascendent
+        """
+        return self[::-1]
+
+    @property
+    def nbytes(self) -> int:
+        """Memòria ocupada per les columnes"""
+        return sum(getattr(self, name).nbytes for name in self.__slots__)
+
+    def date_strings(self) -> List[str]:
+        """Dates en format YYYY-MM-DD (YYYY-MM-DDTHH:MM:SS per intradia)"""
+        return np.datetime_as_string(self.dates, unit="s" if self.is_intraday else "D").tolist()
+
+    def bar(self, i: int) -> PriceData:
+        """Barra i-èssima com a model Pydantic"""
+        return PriceData(
+            date=str(np.datetime_as_string(self.dates[i], unit="s" if self.is_intraday else "D")),
+            open=float(self.open[i]),
+            high=float(self.high[i]),
+            low=float(self.low[i]),
+            close=float(self.close[i]),
+            volume=int(self.volume[i])
+        )
+
+    def to_records(self) -> List[Dict]:
+        """Llista de diccionaris (per JSON i templates)"""
+        return [
+            {"date": d, "open": o, "high": h, "low": lo, "close": c, "volume": v}
+            for d, o, h, lo, c, v in zip(
+                self.date_strings(),
+                self.open.tolist(),
+                self.high.tolist(),
+                self.low.tolist(),
+                self.close.tolist(),
+                self.volume.tolist()
+            )
+        ]
+
+    def to_columns(self) -> Dict[str, List]:
+        """Una llista per camp (format columnar per JSON compacte i gràfics)"""
+        return {
+            "date": self.date_strings(),
+            "open": self.open.tolist(),
+            "high": self.high.tolist(),
+            "low": self.low.tolist(),
+            "close": self.close.tolist(),
+            "volume": self.volume.tolist()
+        }
+
+    def to_models(self) -> List[PriceData]:
+        """Llista de PriceData (només a la frontera de l'API)"""
+        return [PriceData(**record) for record in self.to_records()]
+
@@ -5,50 +5,84 @@ API més fiable que Yahoo Finance amb 500 requests/dia gratuïts
 
 import requests
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import json
 import os
 from pathlib import Path
 import time
 
+import numpy as np
+
+from app.series import PERIOD_DAYS, PriceSeries
+from app.services.cache_policy import STALE, EXPIRED, BackgroundRefresher, cache_state, load_minutes
+from app.services.series_cache import atomic_write_bytes, cache_age as series_cache_age, read_series, write_series
+from app.services.rate_limit import TokenBucketLimiter
+from app.services.delta_log import DELTA, FULL, DeltaLog
+from app.services.memory_cache import memory_cache
+from app.services.singleflight import SingleFlight
+
 
 class AlphaVantageService:
     """Gestor de dades bursàtils d'Alpha Vantage amb cache"""
     
     BASE_URL = "https://www.alphavantage.co/query"
     
-    def __init__(self, api_key: Optional[str] = None, cache_dir: str = "data/cache/alphavantage"):
+    # Barres que retorna outputsize=compact (finestra màxima d'una descàrrega incremental)
+    COMPACT_BARS = 100
+    
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        cache_dir: str = "data/cache/alphavantage",
+        cache_ttl: Optional[Dict[str, int]] = None,
+        cache_grace: Optional[Dict[str, int]] = None
+    ):
         self.api_key = api_key or os.getenv("ALPHAVANTAGE_API_KEY")
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         
-        # Cache en memòria
-        self._memory_cache = {}
+        # Cache en memòria (LRU compartit, primer nivell davant del disc)
+        self._memory_cache = memory_cache
         
-        # Temps de vida del cache (en minuts)
-        self.cache_ttl = {
+        # Coalescència de descàrregues concurrents del mateix ticker
+        self._flight = SingleFlight()
+        self._refresher = BackgroundRefresher(self._flight, max_workers=1)
+        
+        # Registre append-only de descàrregues (completes i incrementals)
+        self._log = DeltaLog(self.cache_dir / "log", source="alphavantage")
+        
+        # Temps de vida del cache (en minuts), configurable amb AV_CACHE_TTL_<TIPUS>
+        self.cache_ttl = load_minutes({
             "company_info": 1440,  # 24 hores
             "price_data": 60,      # 1 hora
             "intraday": 5          # 5 minuts
-        }
-        
-        # Rate limiting (5 requests per minut per API gratuïta)
-        self.last_request_time = 0
-        self.min_request_interval = 12  # segons (5 req/min = 12s entre requests)
-    
-    def _wait_for_rate_limit(self):
-        """Espera si cal per no excedir el rate limit"""
-        elapsed = time.time() - self.last_request_time
-        if elapsed < self.min_request_interval:
-            wait_time = self.min_request_interval - elapsed
-            print(f"⏳ Esperant {wait_time:.1f}s per rate limit...")
-            time.sleep(wait_time)
-        self.last_request_time = time.time()
+        }, "AV_CACHE_TTL", cache_ttl)
+        
+        # Finestra de gràcia després del TTL (en minuts), configurable amb AV_CACHE_GRACE_<TIPUS>
+        # Dins la gràcia es serveixen dades caducades i es refresquen en segon pla
+        self.cache_grace = load_minutes({
+            "company_info": 1440,
+            "price_data": 240,
+            "intraday": 0
+        }, "AV_CACHE_GRACE", cache_grace)
+        
+        # Rate limiting compartit entre workers (API gratuïta: 5 req/min, 500 req/dia)
+        self.rate_limiter = TokenBucketLimiter(
+            self.cache_dir / "rate_limit.state",
+            per_minute=int(os.getenv("AV_RATE_PER_MINUTE", "5")),
+            per_day=int(os.getenv("AV_RATE_PER_DAY", "500"))
+        )
+        # Temps màxim d'espera d'un token abans de desistir (segons; només refrescos en segon pla)
+        self.rate_limit_timeout = float(os.getenv("AV_RATE_TIMEOUT", "60"))
     
     def _get_cache_path(self, cache_key: str) -> Path:
         """Genera path per fitxer de cache"""
         return self.cache_dir / f"{cache_key}.json"
     
+    def _get_series_path(self, cache_key: str) -> Path:
+        """Genera path per fitxer de cache binari d'una sèrie de preus"""
+        return self.cache_dir / f"{cache_key}.bin"
+    
     def _is_cache_valid(self, cache_path: Path, ttl_minutes: int) -> bool:
         """Comprova si el cache és vàlid segons TTL"""
         if not cache_path.exists():
@@ -59,6 +93,25 @@ class AlphaVantageService:
         
         return age < timedelta(minutes=ttl_minutes)
     
+    def _read_json_cache(self, cache_path: Path, ttl_minutes: int) -> Optional[Dict]:
+        """Llegeix un JSON vàlid del cache: primer de memòria i, si no hi és, del disc"""
+        key = str(cache_path)
+        cached_data = self._memory_cache.get(key)
+        if cached_data is not None:
+            return cached_data
+        
+        try:
+            age = time.time() - cache_path.stat().st_mtime
+        except OSError:
+            return None
+        if age >= ttl_minutes * 60:
+            return None
+        
+        cached_data = self._read_cache(cache_path)
+        if cached_data:
+            self._memory_cache.set(key, cached_data, ttl=ttl_minutes * 60 - age)
+        return cached_data
+    
     def _read_cache(self, cache_path: Path) -> Optional[Dict]:
         """Llegeix dades del cache"""
         try:
@@ -68,16 +121,60 @@ class AlphaVantageService:
             print(f"Error llegint cache {cache_path}: {e}")
             return None
     
-    def _write_cache(self, cache_path: Path, data: Dict):
-        """Escriu dades al cache"""
+    def _write_cache(self, cache_path: Path, data: Dict, ttl_minutes: Optional[int] = None):
+        """Escriu dades al cache (atòmic: els lectors mai veuen un fitxer a mig escriure)"""
+        if ttl_minutes:
+            self._memory_cache.set(str(cache_path), data, ttl=ttl_minutes * 60)
+        try:
+            atomic_write_bytes(cache_path, [json.dumps(data, ensure_ascii=False).encode('utf-8')])
+        except Exception as e:
+            print(f"Error escrivint cache {cache_path}: {e}")
+    
+    def _read_series_cache(self, cache_path: Path, force: bool = False) -> Tuple[Optional[PriceSeries], str]:
+        """
+        Llegeix una sèrie del cache binari (memory-mapped) i en classifica l'edat
+        Retorna (sèrie o None, estat fresh/stale/expired)
+        """
+        if force:
+            return None, EXPIRED
+        
+        # Primer nivell: memòria (sense syscalls); segon nivell: fitxer binari
+        cached = self._memory_cache.get_entry(str(cache_path))
+        if cached is None:
+            cached = read_series(cache_path)
+            if not cached or not cached[0]:
+                return None, EXPIRED
+            self._remember_series(cache_path, *cached)
+        
+        series, header = cached
+        state = cache_state(
+            time.time() - header["fetched_at"],
+            self.cache_ttl["price_data"],
+            self.cache_grace["price_data"]
+        )
+        return (series if state != EXPIRED else None), state
+    
+    def _remember_series(self, cache_path: Path, series: PriceSeries, header: Dict):
+        """Desa una sèrie al cache en memòria fins a la seva edat màxima (TTL + gràcia)"""
+        max_age = (self.cache_ttl["price_data"] + self.cache_grace["price_data"]) * 60
+        remaining = max_age - (time.time() - header["fetched_at"])
+        if remaining > 0:
+            self._memory_cache.set(str(cache_path), series, ttl=remaining, meta=header)
+    
+    def _write_series_cache(self, cache_path: Path, series: PriceSeries):
+        """Desa una sèrie al cache binari i a memòria"""
+        self._remember_series(cache_path, series, {"fetched_at": time.time(), "source": "alphavantage"})
         try:
-            with open(cache_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            write_series(cache_path, series, source="alphavantage")
         except Exception as e:
             print(f"Error escrivint cache {cache_path}: {e}")
     
-    def _make_request(self, params: Dict) -> Optional[Dict]:
-        """Fa una petició a l'API d'Alpha Vantage"""
+    def _make_request(self, params: Dict, wait: bool = False) -> Optional[Dict]:
+        """
+        Fa una petició a l'API d'Alpha Vantage
+        Sense `wait` no s'espera el rate limit: si no hi ha token la petició es descarta de
+        seguida (no s'ocupa cap fil del pool de dades). Només els refrescos en segon pla esperen.
+        """
         if not self.api_key:
             print("❌ API key d'Alpha Vantage no configurada")
             return None
@@ -85,8 +182,19 @@ class AlphaVantageService:
         # Afegir API key
         params['apikey'] = self.api_key
         
-        # Rate limiting
-        self._wait_for_rate_limit()
+        # Rate limiting (token bucket compartit entre processos)
+        if wait:
+            if not self.rate_limiter.acquire(timeout=self.rate_limit_timeout):
+                print("⚠️  Quota d'Alpha Vantage exhaurida o espera massa llarga, petició descartada")
+                return None
+        else:
+            retry_in = self.rate_limiter.try_acquire()
+            if retry_in is None:
+                print("⚠️  Quota diària d'Alpha Vantage exhaurida, petició descartada")
+                return None
+            if retry_in > 0:
+                print(f"⚠️  Sense tokens d'Alpha Vantage (pròxim en {retry_in:.1f}s), petició descartada")
+                return None
         
         try:
             response = requests.get(self.BASE_URL, params=params, timeout=10)
@@ -133,10 +241,9 @@ class AlphaVantageService:
         cache_path = self._get_cache_path(cache_key)
         
         # Comprovar cache
-        if self._is_cache_valid(cache_path, self.cache_ttl["company_info"]):
-            cached_data = self._read_cache(cache_path)
-            if cached_data:
-                return cached_data
+        cached_data = self._read_json_cache(cache_path, self.cache_ttl["company_info"])
+        if cached_data:
+            return cached_data
         
         # Obtenir dades d'Alpha Vantage
         params = {
@@ -165,7 +272,7 @@ class AlphaVantageService:
         }
         
         # Guardar al cache
-        self._write_cache(cache_path, company_data)
+        self._write_cache(cache_path, company_data, self.cache_ttl["company_info"])
         
         return company_data
     
@@ -173,80 +280,139 @@ class AlphaVantageService:
         self, 
         ticker: str, 
         period: str = "1y",
-        outputsize: str = "compact"  # compact=100 punts, full=20+ anys
-    ) -> Optional[List[Dict]]:
+        outputsize: str = "compact",  # compact=100 punts, full=20+ anys
+        force: bool = False,
+        repair: bool = False
+    ) -> Optional[PriceSeries]:
         """
         Obté dades històriques diàries (TIME_SERIES_DAILY)
         
+        Quan el cache caduca i ja en tenim la cua, n'hi ha prou amb `compact` (les últimes
+        100 barres) per completar-lo, també per a l'històric `full`.
+        
         Args:
             ticker: Símbol de l'empresa
-            period: Període (1mo, 3mo, 6mo, 1y) - filtrat localment
+            period: Període (1mo, 3mo, 6mo, 1y, ..., max) - filtrat localment
             outputsize: 'compact' (100 punts) o 'full' (tot l'històric)
+            force: Ignorar el TTL i actualitzar ara (delta)
+            repair: Descartar el que tenim i tornar a descarregar amb `outputsize`
         
         Returns:
-            Llista de diccionaris amb dades OHLCV
+            Sèrie OHLCV columnar ordenada per data
         """
         av_ticker = self._convert_ticker_format(ticker)
         cache_key = f"daily_{av_ticker.replace('.', '_')}_{outputsize}"
-        cache_path = self._get_cache_path(cache_key)
-        
-        # Comprovar cache
-        if self._is_cache_valid(cache_path, self.cache_ttl["price_data"]):
-            cached_data = self._read_cache(cache_path)
-            if cached_data:
-                return self._filter_by_period(cached_data, period)
+        cache_path = self._get_series_path(cache_key)
+        if repair:
+            series = self._flight.do(
+                f"{cache_key}:repair",
+                lambda: self._fetch_daily_series(av_ticker, outputsize, cache_path, repair=True)
+            )
+            return self._filter_by_period(series, period) if series else None
+        fetch = lambda: self._fetch_daily_series(av_ticker, outputsize, cache_path)
+        
+        # Comprovar cache (stale-while-revalidate: el refresc en segon pla sí que espera el rate limit)
+        cached, state = self._read_series_cache(cache_path, force)
+        if cached:
+            if state == STALE:
+                self._refresher.schedule(
+                    cache_key, lambda: self._fetch_daily_series(av_ticker, outputsize, cache_path, wait=True)
+                )
+            return self._filter_by_period(cached, period)
+        
+        # Una sola descàrrega en curs per clau (independent del període, que es filtra localment)
+        series = self._flight.do(cache_key, fetch)
+        if not series:
+            return None
         
-        # Obtenir dades d'Alpha Vantage
+        # Filtrar per període
+        return self._filter_by_period(series, period)
+    
+    def get_cache_age(self, ticker: str, outputsize: str = "compact") -> Optional[float]:
+        """Edat en segons de l'històric diari en cache d'un ticker (None si no n'hi ha)"""
+        av_ticker = self._convert_ticker_format(ticker)
+        cache_path = self._get_series_path(f"daily_{av_ticker.replace('.', '_')}_{outputsize}")
+        cached = self._memory_cache.get_entry(str(cache_path))
+        if cached is not None:
+            return time.time() - cached[1]["fetched_at"]
+        return series_cache_age(cache_path)
+    
+    def _fetch_daily_series(
+        self,
+        av_ticker: str,
+        outputsize: str,
+        cache_path: Path,
+        repair: bool = False,
+        wait: bool = False
+    ) -> Optional[PriceSeries]:
+        """Descarrega TIME_SERIES_DAILY (compact si ja en tenim la cua) i el desa al cache"""
+        cache_key = cache_path.stem
+        base = None if repair else self._cached_tail(cache_key, cache_path)
         params = {
             'function': 'TIME_SERIES_DAILY',
             'symbol': av_ticker,
-            'outputsize': outputsize
+            'outputsize': "compact" if base else outputsize
         }
         
-        data = self._make_request(params)
+        data = self._make_request(params, wait=wait)
         if not data or 'Time Series (Daily)' not in data:
             print(f"❌ No s'han trobat dades diàries per {av_ticker}")
             return None
         
-        # Convertir a format consistent
+        # Convertir a format columnar (PriceSeries ordena per data)
         time_series = data['Time Series (Daily)']
-        price_data = []
-        
-        for date_str, values in sorted(time_series.items()):
-            price_data.append({
-                "date": date_str,
-                "open": float(values['1. open']),
-                "high": float(values['2. high']),
-                "low": float(values['3. low']),
-                "close": float(values['4. close']),
-                "volume": int(values['5. volume'])
-            })
+        dates = list(time_series.keys())
+        values = list(time_series.values())
+        series = PriceSeries.from_columns(
+            dates,
+            [v['1. open'] for v in values],
+            [v['2. high'] for v in values],
+            [v['3. low'] for v in values],
+            [v['4. close'] for v in values],
+            [v['5. volume'] for v in values]
+        )
+        
+        # Registrar la descàrrega i combinar-la amb el que ja tenim (les barres noves guanyen)
+        self._log.append(cache_key, series, mode=DELTA if base else FULL, base=base)
+        if base:
+            series = PriceSeries.merge(base, series)
+            if outputsize == "compact":
+                # La finestra demanada: sense tallar creixeria una barra per refresc
+                series = series[-self.COMPACT_BARS:]
+            print(f"🔁 Delta {cache_key}: {params['outputsize']} en lloc de {outputsize}")
+            self._log.compact(cache_key, series)
         
         # Guardar al cache
-        self._write_cache(cache_path, price_data)
+        self._write_series_cache(cache_path, series)
         
-        # Filtrar per període
-        return self._filter_by_period(price_data, period)
+        return series
     
-    def _filter_by_period(self, price_data: List[Dict], period: str) -> List[Dict]:
-        """Filtra dades de preus per període"""
-        if not price_data:
-            return []
-        
-        # Calcular data de tall
-        period_map = {
-            "1mo": 30,
-            "3mo": 90,
-            "6mo": 180,
-            "1y": 365,
-            "2y": 730,
-            "5y": 1825
-        }
-        
-        days = period_map.get(period, 365)
-        cutoff_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+    def _cached_tail(self, cache_key: str, cache_path: Path) -> Optional[PriceSeries]:
+        """
+        Sèrie que ja tenim per a una clau, encara que hagi caducat (memòria, disc o registre)
+        None si no n'hi ha o si `compact` ja no arriba fins a l'última barra
+        """
+        cached = self._memory_cache.get_entry(str(cache_path)) or read_series(cache_path)
+        series = cached[0] if cached else self._log.replay(cache_key)
+        if not series:
+            return None
         
-        return [p for p in price_data if p['date'] >= cutoff_date]
+        # Dies hàbils des de l'última barra: si en falten més de COMPACT_BARS, cal `full`
+        missing = np.busday_count(series.dates[-1], np.datetime64(datetime.now().date(), "D"))
+        return series if missing < self.COMPACT_BARS else None
+    
+    def _filter_by_period(self, series: PriceSeries, period: str) -> PriceSeries:
+        """Filtra dades de preus per període (cerca binària, sense còpia)"""
+        if not series:
+            return series
+        
+        # Calcular data de tall ("max" = tot l'històric)
+        if period == "max":
+            return series
+        days = dict(PERIOD_DAYS).get(period, 365)
+        cutoff_date = (datetime.now() - timedelta(days=days)).date()
+        
+        return series.slice_dates(start=cutoff_date)
     
     def get_quote(self, ticker: str) -> Optional[Dict]:
         """
@@ -258,10 +424,9 @@ class AlphaVantageService:
         cache_path = self._get_cache_path(cache_key)
         
         # Comprovar cache
-        if self._is_cache_valid(cache_path, self.cache_ttl["intraday"]):
-            cached_data = self._read_cache(cache_path)
-            if cached_data:
-                return cached_data
+        cached_data = self._read_json_cache(cache_path, self.cache_ttl["intraday"])
+        if cached_data:
+            return cached_data
         
         # Obtenir cotització
         params = {
@@ -292,21 +457,39 @@ class AlphaVantageService:
         }
         
         # Guardar al cache
-        self._write_cache(cache_path, current_data)
+        self._write_cache(cache_path, current_data, self.cache_ttl["intraday"])
         
         return current_data
     
-    def clear_cache(self, ticker: Optional[str] = None):
-        """Neteja el cache"""
+    def get_flight_stats(self) -> Dict[str, int]:
+        """Estadístiques de coalescència de descàrregues i refrescos en segon pla"""
+        stats = self._flight.get_stats()
+        stats["background_refreshes"] = self._refresher.scheduled
+        return stats
+    
+    def clear_cache(self, ticker: Optional[str] = None, repair: bool = False):
+        """Neteja el cache (amb `repair` també el registre de descàrregues)"""
         if ticker:
             av_ticker = self._convert_ticker_format(ticker)
             safe_ticker = av_ticker.replace('.', '_')
-            for cache_file in self.cache_dir.glob(f"*{safe_ticker}*.json"):
-                cache_file.unlink()
-                print(f"🗑️  Cache eliminat: {cache_file.name}")
+            prefix = str(self.cache_dir)
+            self._memory_cache.discard_where(
+                lambda key: key.startswith(prefix) and safe_ticker in key
+            )
+            for pattern in (f"*{safe_ticker}*.json", f"*{safe_ticker}*.bin"):
+                for cache_file in self.cache_dir.glob(pattern):
+                    cache_file.unlink()
+                    print(f"🗑️  Cache eliminat: {cache_file.name}")
+            if repair:
+                self._log.clear(f"daily_{safe_ticker}_")
         else:
-            for cache_file in self.cache_dir.glob("*.json"):
-                cache_file.unlink()
+            prefix = str(self.cache_dir)
+            self._memory_cache.discard_where(lambda key: key.startswith(prefix))
+            for pattern in ("*.json", "*.bin"):
+                for cache_file in self.cache_dir.glob(pattern):
+                    cache_file.unlink()
+            if repair:
+                self._log.clear()
             print("🗑️  Tot el cache d'Alpha Vantage eliminat")
 
 
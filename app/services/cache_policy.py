@@ -0,0 +1,83 @@
+"""
+Política de cache stale-while-revalidate compartida pels serveis de dades
+
+Per cada tipus de dada hi ha un TTL (dades fresques) i una finestra de gràcia:
+dins la gràcia es serveixen les dades caducades immediatament i es refresquen
+en segon pla; passat TTL + gràcia (edat màxima), la petició espera la descàrrega.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from app.services.singleflight import SingleFlight
+
+# Estats d'una entrada de cache
+FRESH = "fresh"
+STALE = "stale"
+EXPIRED = "expired"
+
+
+def load_minutes(defaults: Dict[str, int], env_prefix: str, overrides: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """
+    Minuts per tipus de dada: valors per defecte < variables d'entorn < paràmetres
+    Variables d'entorn: {env_prefix}_{TIPUS} (ex: CACHE_TTL_PRICE_DATA=30)
+    """
+    values = dict(defaults)
+    for data_type in defaults:
+        env_value = os.getenv(f"{env_prefix}_{data_type.upper()}")
+        if env_value:
+            try:
+                values[data_type] = int(env_value)
+            except ValueError:
+                print(f"⚠️  Valor no vàlid per {env_prefix}_{data_type.upper()}: {env_value}")
+    if overrides:
+        values.update(overrides)
+    return values
+
+
+def cache_state(age_seconds: Optional[float], ttl_minutes: int, grace_minutes: int) -> str:
+    """Classifica una entrada segons la seva edat: fresh, stale o expired"""
+    if age_seconds is None:
+        return EXPIRED
+    if age_seconds < ttl_minutes * 60:
+        return FRESH
+    if age_seconds < (ttl_minutes + grace_minutes) * 60:
+        return STALE
+    return EXPIRED
+
+
+class BackgroundRefresher:
+    """Refresca entrades caducades en segon pla, com a màxim un cop per clau alhora"""
+
+    def __init__(self, flight: SingleFlight, max_workers: int = 2):
+        self._flight = flight
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cache-refresh")
+        self._pending = set()
+        self._lock = threading.Lock()
+        self.scheduled = 0
+
+    def schedule(self, key: str, fn: Callable[[], object]) -> bool:
+        """Programa un refresc si no n'hi ha cap de pendent ni en curs per aquesta clau"""
+        with self._lock:
+            if key in self._pending or self._flight.in_flight(key):
+                return False
+            self._pending.add(key)
+            self.scheduled += 1
+
+        def run():
+            try:
+                self._flight.do(key, fn)
+            except Exception as e:
+                print(f"⚠️  Error refrescant {key} en segon pla: {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+
+        self._executor.submit(run)
+        return True
+
+    def pending(self) -> int:
+        """Refrescos programats que encara no han acabat"""
+        return len(self._pending)
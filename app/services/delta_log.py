@@ -0,0 +1,163 @@
+"""
+Registre append-only de les barres descarregades (una línia JSON per descàrrega)
+
+Estructura:
+    {root}/{clau}.ndjson
+
+Cada línia és una descàrrega: `full` (sèrie completa) o `delta` (només les barres
+noves des de l'última data en cache). El binari del cache és una vista derivada:
+si es perd, `replay` la reconstrueix a partir de l'última descàrrega completa
+i els deltas posteriors. Només una reparació explícita esborra el registre.
+
+Els deltas només guarden les barres noves o revisades (un refresc sense canvis no
+escriu res) i, quan el registre passa de DELTA_LOG_MAX_RECORDS línies o de
+DELTA_LOG_MAX_BYTES, es reescriu com una sola descàrrega completa amb la sèrie actual.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+
+from app.series import PriceSeries
+from app.services.series_cache import atomic_write_bytes
+
+FULL = "full"
+DELTA = "delta"
+
+# Mida a partir de la qual el registre d'una clau es compacta en una sola línia completa
+DELTA_LOG_MAX_RECORDS = int(os.getenv("DELTA_LOG_MAX_RECORDS", "50"))
+DELTA_LOG_MAX_BYTES = int(os.getenv("DELTA_LOG_MAX_BYTES", str(4 * 1024 * 1024)))
+
+
+def changed_bars(base: Optional[PriceSeries], series: PriceSeries) -> PriceSeries:
+    """Barres de `series` que no són a `base` o que hi són amb valors diferents"""
+    if not base or not series:
+        return series
+    positions = np.minimum(np.searchsorted(base.dates, series.dates), len(base) - 1)
+    same = base.dates[positions] == series.dates
+    for name in ("open", "high", "low", "close", "volume"):
+        same &= getattr(base, name)[positions] == getattr(series, name)
+    return series[~same]
+
+
+class DeltaLog:
+    """Registre append-only de descàrregues completes i incrementals per clau de cache"""
+
+    def __init__(self, root: Path, source: str = "yfinance"):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.source = source
+        self._lock = threading.Lock()
+        self._records: Dict[str, int] = {}  # Línies per clau (es compten el primer cop)
+        self.compactions = 0
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key.replace('/', '_')}.ndjson"
+
+    def _line(self, series: PriceSeries, mode: str) -> str:
+        record = {
+            "fetched_at": time.time(),
+            "mode": mode,
+            "source": self.source,
+            "intraday": series.is_intraday,
+            "columns": series.to_columns()
+        }
+        return json.dumps(record, separators=(",", ":")) + "\n"
+
+    def _count(self, key: str) -> int:
+        if key not in self._records:
+            try:
+                with open(self._path(key), "rb") as f:
+                    self._records[key] = sum(1 for _ in f)
+            except OSError:
+                self._records[key] = 0
+        return self._records[key]
+
+    def append(
+        self,
+        key: str,
+        series: PriceSeries,
+        mode: str = DELTA,
+        base: Optional[PriceSeries] = None
+    ) -> int:
+        """
+        Afegeix una descàrrega al registre; retorna el nombre de barres escrites
+        Un delta sobre `base` només escriu les barres noves o revisades (res si no n'hi ha)
+        """
+        if mode == DELTA:
+            series = changed_bars(base, series)
+            if not series:
+                return 0
+        line = self._line(series, mode)
+        with self._lock:
+            count = self._count(key)
+            with open(self._path(key), "a", encoding="utf-8") as f:
+                f.write(line)
+            self._records[key] = count + 1
+        return len(series)
+
+    def compact(self, key: str, series: PriceSeries, force: bool = False) -> bool:
+        """
+        Reescriu el registre com una sola descàrrega completa amb `series` (la sèrie actual)
+        si passa dels límits de línies o de mida; retorna True si s'ha compactat
+        """
+        path = self._path(key)
+        with self._lock:
+            size = path.stat().st_size if path.exists() else 0
+            if not force and self._count(key) <= DELTA_LOG_MAX_RECORDS and size <= DELTA_LOG_MAX_BYTES:
+                return False
+            atomic_write_bytes(path, [self._line(series, FULL).encode("utf-8")])
+            self._records[key] = 1
+            self.compactions += 1
+        return True
+
+    def entries(self, key: str) -> Iterator[Dict]:
+        """Descàrregues del registre en ordre (les línies malmeses s'ignoren)"""
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue  # Línia a mig escriure (p. ex. tall de corrent)
+        except OSError:
+            return
+
+    def replay(self, key: str) -> Optional[PriceSeries]:
+        """
+        Reconstrueix la sèrie: última descàrrega completa + deltas posteriors
+        None si el registre no té cap descàrrega completa
+        """
+        series = None
+        for entry in self.entries(key):
+            columns = entry["columns"]
+            part = PriceSeries.from_columns(
+                columns["date"], columns["open"], columns["high"], columns["low"],
+                columns["close"], columns["volume"], intraday=entry.get("intraday", False)
+            )
+            if entry["mode"] == FULL:
+                series = part
+            elif series is not None:
+                series = PriceSeries.merge(series, part)
+        return series
+
+    def stats(self, key: str) -> Dict[str, int]:
+        """Nombre de descàrregues completes i incrementals i mida del registre"""
+        counts = {FULL: 0, DELTA: 0}
+        for entry in self.entries(key):
+            counts[entry["mode"]] = counts.get(entry["mode"], 0) + 1
+        path = self._path(key)
+        counts["bytes"] = path.stat().st_size if path.exists() else 0
+        return counts
+
+    def clear(self, prefix: str = ""):
+        """Esborra els registres amb claus que comencen per `prefix` (tots si és buit)"""
+        with self._lock:
+            for path in self.root.glob(f"{prefix.replace('/', '_')}*.ndjson"):
+                path.unlink()
+            self._records.clear()
@@ -0,0 +1,151 @@
+"""
+Cache LRU en memòria compartit (primer nivell davant del cache en disc)
+
+Limitat per nombre d'entrades i per bytes, amb caducitat per entrada.
+El fan servir els serveis de dades (sèries llegides del disc o descarregades)
+i el DataManager (sèries ja resoltes per ticker). Una lectura calenta no fa cap syscall.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+def _size_of(value: Any, _seen: Optional[set] = None) -> int:
+    """
+    Mida aproximada d'un valor en bytes (usa `nbytes` si en té)
+    Recorre el contingut de diccionaris, col·leccions i objectes (p. ex. models pydantic)
+    """
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0  # Objecte compartit o referència circular: ja comptat
+    _seen.add(id(value))
+
+    size = sys.getsizeof(value)
+    if isinstance(value, (str, bytes, bytearray, int, float, bool)) or value is None:
+        return size
+    if isinstance(value, dict):
+        return size + sum(_size_of(k, _seen) + _size_of(v, _seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(_size_of(v, _seen) for v in value)
+    fields = getattr(value, "__dict__", None)
+    if isinstance(fields, dict):
+        return size + _size_of(fields, _seen)
+    return size
+
+
+class _Entry:
+    __slots__ = ("value", "meta", "size", "expires_at")
+
+    def __init__(self, value: Any, meta: Optional[Dict], size: int, expires_at: Optional[float]):
+        self.value = value
+        self.meta = meta
+        self.size = size
+        self.expires_at = expires_at
+
+
+class LRUCache:
+    """Cache LRU thread-safe amb límit d'entrades, límit de bytes i TTL per entrada"""
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0
+        }
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, Optional[Dict]]]:
+        """Retorna (valor, metadades) si hi és i no ha caducat"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            if entry.expires_at is not None and entry.expires_at <= time.time():
+                self._remove(key)
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry.value, entry.meta
+
+    def get(self, key: str) -> Any:
+        """Retorna el valor si hi és i no ha caducat (None si no)"""
+        entry = self.get_entry(key)
+        return entry[0] if entry else None
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[float] = None,
+        meta: Optional[Dict] = None,
+        size: Optional[int] = None
+    ):
+        """Desa un valor (ttl en segons; None = sense caducitat) i expulsa els menys usats"""
+        size = _size_of(value) if size is None else size
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                return  # Massa gran per al cache: no es desa
+            self._entries[key] = _Entry(value, meta, size, expires_at)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats["evictions"] += 1
+
+    def __contains__(self, key: str) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and (entry.expires_at is None or entry.expires_at > time.time())
+
+    def discard(self, key: str):
+        """Elimina una entrada si existeix"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def discard_where(self, predicate: Callable[[str], bool]) -> int:
+        """Elimina totes les entrades la clau de les quals compleix el predicat"""
+        with self._lock:
+            keys = [k for k in self._entries if predicate(k)]
+            for key in keys:
+                self._remove(key)
+        return len(keys)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def stats(self) -> Dict[str, int]:
+        """Comptadors d'encerts, fallades, expulsions i ocupació"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+            stats["max_entries"] = self.max_entries
+            stats["max_bytes"] = self.max_bytes
+        return stats
+
+
+# Instància compartida per tot el procés
+memory_cache = LRUCache(
+    max_entries=int(os.getenv("MEMORY_CACHE_MAX_ENTRIES", "1024")),
+    max_bytes=int(os.getenv("MEMORY_CACHE_MAX_MB", "256")) * 1024 * 1024
+)
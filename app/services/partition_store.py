@@ -0,0 +1,147 @@
+"""
+Històric llarg en particions al disc (un fitxer binari per ticker, interval i període)
+
+Estructura:
+    {root}/{ticker}/{interval}/{partició}.bin   (format de series_cache)
+    {root}/{ticker}/{interval}/manifest.json    (cobertura i moment de l'última descàrrega)
+
+Les barres diàries es parteixen per any ("2024") i les intradia per mes ("2024-10").
+Afegir barres noves només reescriu les particions afectades (normalment l'última),
+i llegir un rang només obre les particions que s'hi solapen.
+"""
+
+import json
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.series import DateLike, PriceSeries, to_day
+from app.services.series_cache import atomic_write_bytes, read_series, write_series
+
+
+def _partition_keys(dates: np.ndarray, intraday: bool) -> np.ndarray:
+    """Clau de partició de cada data: any (diari) o any-mes (intradia)"""
+    unit = "M" if intraday else "Y"
+    return np.datetime_as_string(dates.astype(f"datetime64[{unit}]"), unit=unit)
+
+
+def _partition_key(day: DateLike, intraday: bool) -> str:
+    return str(_partition_keys(np.array([to_day(day)]), intraday)[0])
+
+
+class PartitionStore:
+    """Sèries partides per any/mes amb manifest de cobertura"""
+
+    def __init__(self, root: Path, source: str = "yfinance"):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.source = source
+        self._lock = threading.Lock()
+
+    def _dir(self, ticker: str, interval: str) -> Path:
+        return self.root / ticker.replace("/", "_") / interval
+
+    def partitions(self, ticker: str, interval: str) -> List[str]:
+        """Claus de les particions existents, ordenades"""
+        directory = self._dir(ticker, interval)
+        if not directory.exists():
+            return []
+        return sorted(path.stem for path in directory.glob("*.bin"))
+
+    def manifest(self, ticker: str, interval: str) -> Dict:
+        """Cobertura de l'històric: `covered_from` (data o "max"), `fetched_at`, `last`"""
+        try:
+            with open(self._dir(ticker, interval) / "manifest.json", "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def update_manifest(self, ticker: str, interval: str, **fields) -> Dict:
+        """Actualitza camps del manifest (escriptura atòmica)"""
+        with self._lock:
+            manifest = self.manifest(ticker, interval)
+            manifest.update(fields)
+            directory = self._dir(ticker, interval)
+            directory.mkdir(parents=True, exist_ok=True)
+            atomic_write_bytes(directory / "manifest.json", [json.dumps(manifest).encode("utf-8")])
+            return manifest
+
+    def read(
+        self,
+        ticker: str,
+        interval: str,
+        start: Optional[DateLike] = None,
+        end: Optional[DateLike] = None
+    ) -> PriceSeries:
+        """Llegeix només les particions que se solapen amb [start, end]"""
+        keys = self.partitions(ticker, interval)
+        if not keys:
+            return PriceSeries.empty()
+
+        intraday = interval != "1d"
+        first = _partition_key(start, intraday) if start is not None else None
+        last = _partition_key(end, intraday) if end is not None else None
+        directory = self._dir(ticker, interval)
+
+        parts = []
+        for key in keys:
+            if (first and key < first) or (last and key > last):
+                continue
+            cached = read_series(directory / f"{key}.bin")
+            if cached:
+                parts.append(cached[0])
+        return PriceSeries.concat(parts).slice_dates(start, end)
+
+    def merge(self, ticker: str, interval: str, series: PriceSeries) -> List[str]:
+        """
+        Afegeix barres a les particions que toquen (les noves guanyen en dates repetides)
+        Retorna les claus de les particions reescrites
+        """
+        if not series:
+            return []
+
+        keys = _partition_keys(series.dates, series.is_intraday)
+        # Les dates estan ordenades: cada partició és un tram contigu
+        bounds = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+        starts = np.concatenate([[0], bounds])
+        ends = np.concatenate([bounds, [len(keys)]])
+
+        directory = self._dir(ticker, interval)
+        directory.mkdir(parents=True, exist_ok=True)
+        written = []
+        with self._lock:
+            for lo, hi in zip(starts, ends):
+                key = str(keys[lo])
+                path = directory / f"{key}.bin"
+                existing = read_series(path)
+                chunk = series[int(lo):int(hi)]
+                merged = PriceSeries.merge(existing[0], chunk) if existing else chunk
+                write_series(path, merged, source=self.source)
+                written.append(key)
+        return written
+
+    def last_date(self, ticker: str, interval: str) -> Optional[np.datetime64]:
+        """Data (o marca de temps) de l'última barra emmagatzemada"""
+        keys = self.partitions(ticker, interval)
+        if not keys:
+            return None
+        cached = read_series(self._dir(ticker, interval) / f"{keys[-1]}.bin")
+        if not cached or not cached[0]:
+            return None
+        return cached[0].dates[-1]
+
+    def age(self, ticker: str, interval: str) -> Optional[float]:
+        """Segons des de l'última descàrrega (None si no n'hi ha cap)"""
+        fetched_at = self.manifest(ticker, interval).get("fetched_at")
+        return time.time() - fetched_at if fetched_at else None
+
+    def clear(self, ticker: Optional[str] = None):
+        """Elimina les particions d'un ticker (o totes)"""
+        target = self.root / ticker.replace("/", "_") if ticker else self.root
+        if target.exists():
+            shutil.rmtree(target, ignore_errors=True)
+        self.root.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,129 @@
+"""
+Rate limiter token-bucket compartit entre processos
+L'estat es guarda en un fitxer protegit amb un lock (fcntl), de manera que tots els
+workers de gunicorn/uvicorn consumeixen del mateix pressupost per minut i per dia
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional
+
+try:
+    import fcntl
+    FILE_LOCK_AVAILABLE = True
+except ImportError:  # Windows: només coordinació dins del procés
+    fcntl = None
+    FILE_LOCK_AVAILABLE = False
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket amb quota per minut (recàrrega contínua) i quota diària (UTC)
+
+    `try_acquire()` consumeix un token si n'hi ha i retorna 0, o retorna els segons
+    que cal esperar: és el que fan servir les peticions d'usuari (no esperen mai).
+    `acquire()` espera bloquejant el fil i només s'usa des dels fils de refresc en segon
+    pla. Si la quota diària està exhaurida, retorna False immediatament.
+    """
+
+    def __init__(self, state_path: Path, per_minute: int = 5, per_day: int = 500):
+        self.state_path = Path(state_path)
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self._refill_per_second = per_minute / 60.0
+        self._thread_lock = threading.Lock()
+
+    @contextmanager
+    def _locked_state(self):
+        """Obre l'estat compartit amb lock exclusiu i el desa en sortir"""
+        with self._thread_lock:
+            fd = os.open(self.state_path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if FILE_LOCK_AVAILABLE:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                raw = b""
+                while True:
+                    chunk = os.read(fd, 4096)
+                    if not chunk:
+                        break
+                    raw += chunk
+                try:
+                    state = json.loads(raw) if raw else {}
+                except ValueError:
+                    state = {}
+
+                yield state
+
+                data = json.dumps(state).encode()
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.ftruncate(fd, 0)
+                os.write(fd, data)
+            finally:
+                if FILE_LOCK_AVAILABLE:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+
+    def _refill(self, state: Dict, now: float):
+        """Recarrega tokens pel temps transcorregut i reinicia la quota diària si canvia el dia"""
+        today = datetime.fromtimestamp(now, tz=timezone.utc).strftime("%Y-%m-%d")
+        if state.get("day") != today:
+            state["day"] = today
+            state["day_count"] = 0
+
+        tokens = state.get("tokens", float(self.per_minute))
+        updated = state.get("updated", now)
+        tokens = min(float(self.per_minute), tokens + max(0.0, now - updated) * self._refill_per_second)
+        state["tokens"] = tokens
+        state["updated"] = now
+
+    def try_acquire(self) -> Optional[float]:
+        """
+        Intenta consumir un token
+        Retorna 0 si s'ha consumit, els segons d'espera si no n'hi ha,
+        o None si la quota diària està exhaurida
+        """
+        with self._locked_state() as state:
+            now = time.time()
+            self._refill(state, now)
+
+            if state["day_count"] >= self.per_day:
+                return None
+
+            if state["tokens"] >= 1.0:
+                state["tokens"] -= 1.0
+                state["day_count"] += 1
+                return 0.0
+
+            return (1.0 - state["tokens"]) / self._refill_per_second
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Espera (bloquejant el fil) fins a obtenir un token"""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            wait = self.try_acquire()
+            if wait is None:
+                return False
+            if wait == 0:
+                return True
+            if deadline is not None and time.time() + wait > deadline:
+                return False
+            print(f"⏳ Esperant {wait:.1f}s per rate limit...")
+            time.sleep(wait)
+
+    def status(self) -> Dict:
+        """Tokens disponibles i consum diari (sense consumir cap token)"""
+        with self._locked_state() as state:
+            self._refill(state, time.time())
+            return {
+                "tokens_available": round(state["tokens"], 2),
+                "per_minute": self.per_minute,
+                "used_today": state["day_count"],
+                "per_day": self.per_day,
+                "shared_across_processes": FILE_LOCK_AVAILABLE
+            }
@@ -0,0 +1,150 @@
+"""
+Cache binari en disc per sèries OHLCV
+
+Format del fitxer (little-endian):
+    capçalera de 64 bytes: magic "CDPS", versió, flags, moment de descàrrega, nombre de files, font
+    columnes contigües: dates (int64, dies des de 1970; segons si el flag intradia és actiu),
+    open, high, low, close (float64), volume (int64)
+
+Les escriptures són atòmiques (fitxer temporal + rename) i les lectures fan servir
+memory-mapping: les columnes són vistes de només lectura sobre el fitxer, sense parsejar.
+"""
+
+import os
+import struct
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.series import PriceSeries
+
+MAGIC = b"CDPS"
+FORMAT_VERSION = 1
+HEADER_SIZE = 64
+# magic, versió, flags, fetched_at, files, font
+_HEADER = struct.Struct("<4sHHdQ32s")
+
+# Flags de la capçalera
+FLAG_INTRADAY = 1
+_INTRADAY_DATES = np.dtype("<M8[s]")
+
+# Columnes en ordre d'escriptura amb el seu dtype en disc
+_COLUMNS = (
+    ("dates", np.dtype("<M8[D]")),
+    ("open", np.dtype("<f8")),
+    ("high", np.dtype("<f8")),
+    ("low", np.dtype("<f8")),
+    ("close", np.dtype("<f8")),
+    ("volume", np.dtype("<i8"))
+)
+
+
+def _columns(flags: int):
+    """Columnes amb el dtype en disc segons els flags (dates diàries o en segons)"""
+    if flags & FLAG_INTRADAY:
+        return (("dates", _INTRADAY_DATES),) + _COLUMNS[1:]
+    return _COLUMNS
+
+
+def atomic_write_bytes(path: Path, chunks):
+    """Escriu un fitxer de forma atòmica: temporal al mateix directori + os.replace"""
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def encode_series(series: PriceSeries, source: str, fetched_at: Optional[float] = None) -> List[bytes]:
+    """Capçalera i columnes en el format binari del cache (també és el format de l'API binària)"""
+    fetched_at = time.time() if fetched_at is None else fetched_at
+    flags = FLAG_INTRADAY if series.is_intraday else 0
+    header = _HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        flags,
+        fetched_at,
+        len(series),
+        source.encode("utf-8")[:32]
+    ).ljust(HEADER_SIZE, b"\0")
+
+    chunks = [header]
+    for name, dtype in _columns(flags):
+        chunks.append(np.ascontiguousarray(getattr(series, name), dtype=dtype).tobytes())
+    return chunks
+
+
+def write_series(path: Path, series: PriceSeries, source: str, fetched_at: Optional[float] = None):
+    """Desa una sèrie al cache binari (atòmic)"""
+    atomic_write_bytes(path, encode_series(series, source, fetched_at))
+
+
+def _parse_header(raw: bytes) -> Optional[Dict]:
+    if len(raw) < HEADER_SIZE:
+        return None
+    magic, version, flags, fetched_at, rows, source = _HEADER.unpack_from(raw)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        return None
+    return {
+        "flags": flags,
+        "fetched_at": fetched_at,
+        "rows": rows,
+        "source": source.rstrip(b"\0").decode("utf-8", errors="replace")
+    }
+
+
+def read_header(path: Path) -> Optional[Dict]:
+    """Llegeix només la capçalera (moment de descàrrega, files, font)"""
+    try:
+        with open(path, "rb") as f:
+            return _parse_header(f.read(HEADER_SIZE))
+    except OSError:
+        return None
+
+
+def read_series(path: Path) -> Optional[Tuple[PriceSeries, Dict]]:
+    """
+    Llegeix una sèrie del cache binari amb memory-mapping
+    Retorna (sèrie, capçalera) o None si el fitxer no existeix o no és vàlid
+    """
+    try:
+        mm = np.memmap(path, dtype=np.uint8, mode="r")
+    except (OSError, ValueError):
+        return None
+
+    header = _parse_header(mm[:HEADER_SIZE].tobytes())
+    if header is None:
+        return None
+
+    rows = header["rows"]
+    columns_spec = _columns(header["flags"])
+    expected = HEADER_SIZE + rows * sum(dtype.itemsize for _, dtype in columns_spec)
+    if len(mm) < expected:
+        return None
+
+    columns = []
+    offset = HEADER_SIZE
+    for _, dtype in columns_spec:
+        columns.append(np.frombuffer(mm, dtype=dtype, count=rows, offset=offset))
+        offset += rows * dtype.itemsize
+
+    return PriceSeries(*columns), header
+
+
+def cache_age(path: Path) -> Optional[float]:
+    """Edat en segons segons el moment de descàrrega de la capçalera"""
+    header = read_header(path)
+    if header is None:
+        return None
+    return time.time() - header["fetched_at"]
@@ -0,0 +1,83 @@
+"""
+Coalescència de peticions (single-flight)
+Crides concurrents amb la mateixa clau comparteixen una única descàrrega en curs
+"""
+
+import threading
+from typing import Any, Callable, Dict
+
+
+class _Call:
+    """Descàrrega en curs: els seguidors esperen l'event i llegeixen el resultat"""
+
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Executa `fn` un sol cop per clau mentre hi hagi una crida en curs
+
+    El primer fil que demana una clau (el líder) executa la funció; els altres
+    esperen i reben el mateix resultat (o la mateixa excepció).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._stats = {
+            "calls": 0,
+            "executed": 0,
+            "deduplicated": 0,
+            "errors": 0
+        }
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Executa fn (o espera la crida en curs amb la mateixa clau)"""
+        with self._lock:
+            self._stats["calls"] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._stats["deduplicated"] += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._stats["executed"] += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                self._stats["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def in_flight(self, key: str) -> bool:
+        """Indica si hi ha una crida en curs per aquesta clau"""
+        return key in self._calls
+
+    def get_stats(self) -> Dict[str, int]:
+        """Comptadors de crides, execucions reals i crides deduplicades"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls)
+        return stats
@@ -5,33 +5,76 @@ Inclou sistema de cache per minimitzar requests a l'API
 
 import yfinance as yf
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Tuple
 import json
 import os
+import time
 from pathlib import Path
 
+from app.series import DAILY_INTERVAL, INTRADAY_MAX_DAYS, DateLike, PriceSeries, days_since, period_start, to_day
+from app.services.cache_policy import STALE, EXPIRED, BackgroundRefresher, cache_state, load_minutes
+from app.services.series_cache import atomic_write_bytes, cache_age as series_cache_age, read_series, write_series
+from app.services.delta_log import DELTA, FULL, DeltaLog
+from app.services.memory_cache import memory_cache
+from app.services.partition_store import PartitionStore
+from app.services.singleflight import SingleFlight
+
+# Inici de l'històric quan es demana tot (MAX)
+HISTORY_EPOCH = "1950-01-01"
+
 
 class StockDataService:
     """Gestor de dades bursàtils reals amb cache"""
     
-    def __init__(self, cache_dir: str = "data/cache"):
+    def __init__(
+        self,
+        cache_dir: str = "data/cache",
+        cache_ttl: Optional[Dict[str, int]] = None,
+        cache_grace: Optional[Dict[str, int]] = None,
+        downloader: Optional[Callable] = None
+    ):
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         
-        # Cache en memòria per rendiment
-        self._memory_cache = {}
+        # Cache en memòria (LRU compartit, primer nivell davant del disc)
+        self._memory_cache = memory_cache
+        
+        # Coalescència de descàrregues concurrents del mateix ticker
+        self._flight = SingleFlight()
+        self._refresher = BackgroundRefresher(self._flight)
+        
+        # Descàrrega multi-símbol (injectable per proves amb un stub local)
+        self._download = downloader or yf.download
         
-        # Temps de vida del cache (en minuts)
-        self.cache_ttl = {
+        # Històric llarg i intradia en particions per any/mes
+        self._partitions = PartitionStore(self.cache_dir / "history", source="yfinance")
+        
+        # Registre append-only de descàrregues (completes i incrementals)
+        self._log = DeltaLog(self.cache_dir / "log", source="yfinance")
+        
+        # Temps de vida del cache (en minuts), configurable amb CACHE_TTL_<TIPUS>
+        self.cache_ttl = load_minutes({
             "company_info": 1440,  # 24 hores
             "price_data": 60,      # 1 hora per dades històriques
             "realtime": 5          # 5 minuts per dades en temps real
-        }
+        }, "CACHE_TTL", cache_ttl)
+        
+        # Finestra de gràcia després del TTL (en minuts), configurable amb CACHE_GRACE_<TIPUS>
+        # Dins la gràcia es serveixen dades caducades i es refresquen en segon pla
+        self.cache_grace = load_minutes({
+            "company_info": 1440,
+            "price_data": 240,
+            "realtime": 0
+        }, "CACHE_GRACE", cache_grace)
     
     def _get_cache_path(self, ticker: str, data_type: str) -> Path:
         """Genera path per fitxer de cache"""
         return self.cache_dir / f"{ticker}_{data_type}.json"
     
+    def _get_series_path(self, cache_key: str) -> Path:
+        """Genera path per fitxer de cache binari d'una sèrie de preus"""
+        return self.cache_dir / f"{cache_key}_prices.bin"
+    
     def _is_cache_valid(self, cache_path: Path, ttl_minutes: int) -> bool:
         """Comprova si el cache és vàlid segons TTL"""
         if not cache_path.exists():
@@ -42,6 +85,25 @@ class StockDataService:
         
         return age < timedelta(minutes=ttl_minutes)
     
+    def _read_json_cache(self, cache_path: Path, ttl_minutes: int) -> Optional[Dict]:
+        """Llegeix un JSON vàlid del cache: primer de memòria i, si no hi és, del disc"""
+        key = str(cache_path)
+        cached_data = self._memory_cache.get(key)
+        if cached_data is not None:
+            return cached_data
+        
+        try:
+            age = time.time() - cache_path.stat().st_mtime
+        except OSError:
+            return None
+        if age >= ttl_minutes * 60:
+            return None
+        
+        cached_data = self._read_cache(cache_path)
+        if cached_data:
+            self._memory_cache.set(key, cached_data, ttl=ttl_minutes * 60 - age)
+        return cached_data
+    
     def _read_cache(self, cache_path: Path) -> Optional[Dict]:
         """Llegeix dades del cache"""
         try:
@@ -51,11 +113,51 @@ class StockDataService:
             print(f"Error llegint cache {cache_path}: {e}")
             return None
     
-    def _write_cache(self, cache_path: Path, data: Dict):
-        """Escriu dades al cache"""
+    def _write_cache(self, cache_path: Path, data: Dict, ttl_minutes: Optional[int] = None):
+        """Escriu dades al cache (atòmic: els lectors mai veuen un fitxer a mig escriure)"""
+        if ttl_minutes:
+            self._memory_cache.set(str(cache_path), data, ttl=ttl_minutes * 60)
+        try:
+            atomic_write_bytes(cache_path, [json.dumps(data, ensure_ascii=False).encode('utf-8')])
+        except Exception as e:
+            print(f"Error escrivint cache {cache_path}: {e}")
+    
+    def _read_series_cache(self, cache_path: Path, force: bool = False) -> Tuple[Optional[PriceSeries], str]:
+        """
+        Llegeix una sèrie del cache binari (memory-mapped) i en classifica l'edat
+        Retorna (sèrie o None, estat fresh/stale/expired)
+        """
+        if force:
+            return None, EXPIRED
+        
+        # Primer nivell: memòria (sense syscalls); segon nivell: fitxer binari
+        cached = self._memory_cache.get_entry(str(cache_path))
+        if cached is None:
+            cached = read_series(cache_path)
+            if not cached or not cached[0]:
+                return None, EXPIRED
+            self._remember_series(cache_path, *cached)
+        
+        series, header = cached
+        state = cache_state(
+            time.time() - header["fetched_at"],
+            self.cache_ttl["price_data"],
+            self.cache_grace["price_data"]
+        )
+        return (series if state != EXPIRED else None), state
+    
+    def _remember_series(self, cache_path: Path, series: PriceSeries, header: Dict):
+        """Desa una sèrie al cache en memòria fins a la seva edat màxima (TTL + gràcia)"""
+        max_age = (self.cache_ttl["price_data"] + self.cache_grace["price_data"]) * 60
+        remaining = max_age - (time.time() - header["fetched_at"])
+        if remaining > 0:
+            self._memory_cache.set(str(cache_path), series, ttl=remaining, meta=header)
+    
+    def _write_series_cache(self, cache_path: Path, series: PriceSeries):
+        """Desa una sèrie al cache binari i a memòria"""
+        self._remember_series(cache_path, series, {"fetched_at": time.time(), "source": "yfinance"})
         try:
-            with open(cache_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            write_series(cache_path, series, source="yfinance")
         except Exception as e:
             print(f"Error escrivint cache {cache_path}: {e}")
     
@@ -67,10 +169,9 @@ class StockDataService:
         cache_path = self._get_cache_path(ticker, "info")
         
         # Comprovar cache
-        if self._is_cache_valid(cache_path, self.cache_ttl["company_info"]):
-            cached_data = self._read_cache(cache_path)
-            if cached_data:
-                return cached_data
+        cached_data = self._read_json_cache(cache_path, self.cache_ttl["company_info"])
+        if cached_data:
+            return cached_data
         
         # Obtenir dades de Yahoo Finance
         try:
@@ -92,7 +193,7 @@ class StockDataService:
             }
             
             # Guardar al cache
-            self._write_cache(cache_path, company_data)
+            self._write_cache(cache_path, company_data, self.cache_ttl["company_info"])
             
             return company_data
             
@@ -104,58 +205,258 @@ class StockDataService:
         self, 
         ticker: str, 
         period: str = "1y",
-        interval: str = "1d"
-    ) -> Optional[List[Dict]]:
+        interval: str = "1d",
+        force: bool = False,
+        repair: bool = False
+    ) -> Optional[PriceSeries]:
         """
         Obté dades històriques de preus
         
+        Quan el cache caduca només es descarreguen les barres posteriors a l'última data
+        que ja tenim (delta); la descàrrega completa del període queda per al primer cop
+        i per a les reparacions explícites.
+        
         Args:
             ticker: Símbol de l'empresa (ex: "CABK.MC")
             period: Període de temps (1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, 10y, ytd, max)
             interval: Interval de dades (1m, 2m, 5m, 15m, 30m, 60m, 90m, 1h, 1d, 5d, 1wk, 1mo, 3mo)
+            force: Ignorar el TTL i actualitzar ara (delta)
+            repair: Descartar el que tenim i tornar a descarregar tot el període
         
         Returns:
-            Llista de diccionaris amb dades OHLCV
+            Sèrie OHLCV columnar ordenada per data
         """
         cache_key = f"{ticker}_{period}_{interval}"
-        cache_path = self._get_cache_path(cache_key, "prices")
+        cache_path = self._get_series_path(cache_key)
+        if repair:
+            return self._flight.do(
+                f"{cache_key}:repair",
+                lambda: self._fetch_historical_data(ticker, period, interval, cache_path, repair=True)
+            )
+        fetch = lambda: self._fetch_historical_data(ticker, period, interval, cache_path)
         
-        # Comprovar cache
-        if self._is_cache_valid(cache_path, self.cache_ttl["price_data"]):
-            cached_data = self._read_cache(cache_path)
-            if cached_data:
-                return cached_data
+        # Comprovar cache (stale-while-revalidate)
+        cached, state = self._read_series_cache(cache_path, force)
+        if cached:
+            if state == STALE:
+                self._refresher.schedule(cache_key, fetch)
+            return cached
         
-        # Obtenir dades de Yahoo Finance
+        # Una sola descàrrega en curs per clau; la resta de crides l'esperen
+        return self._flight.do(cache_key, fetch)
+    
+    def get_cache_age(self, ticker: str, period: str = "1y", interval: str = "1d") -> Optional[float]:
+        """Edat en segons de l'històric en cache d'un ticker (None si no n'hi ha)"""
+        cache_path = self._get_series_path(f"{ticker}_{period}_{interval}")
+        cached = self._memory_cache.get_entry(str(cache_path))
+        if cached is not None:
+            return time.time() - cached[1]["fetched_at"]
+        return series_cache_age(cache_path)
+    
+    def _fetch_historical_data(
+        self,
+        ticker: str,
+        period: str,
+        interval: str,
+        cache_path: Path,
+        repair: bool = False
+    ) -> Optional[PriceSeries]:
+        """Descarrega l'històric de Yahoo Finance (delta si ja en tenim la cua) i el desa al cache"""
+        cache_key = f"{ticker}_{period}_{interval}"
+        base = None if repair else self._cached_tail(cache_key, cache_path, period)
         try:
             stock = yf.Ticker(ticker)
-            hist = stock.history(period=period, interval=interval)
+            if base:
+                # Des de l'última barra inclosa: pot ser la d'avui encara a mig formar
+                hist = stock.history(start=str(base.dates[-1].astype("datetime64[D]")), interval=interval)
+            else:
+                hist = stock.history(period=period, interval=interval)
             
-            if hist.empty:
+            if hist.empty and not base:
                 print(f"No s'han trobat dades per {ticker}")
                 return None
             
-            # Convertir a format dict
-            price_data = []
-            for date, row in hist.iterrows():
-                price_data.append({
-                    "date": date.strftime("%Y-%m-%d"),
-                    "open": float(row["Open"]),
-                    "high": float(row["High"]),
-                    "low": float(row["Low"]),
-                    "close": float(row["Close"]),
-                    "volume": int(row["Volume"])
-                })
-            
-            # Guardar al cache
-            self._write_cache(cache_path, price_data)
+            # Convertir a columnes (sense iterar fila a fila)
+            series = self._series_from_history(hist, intraday=interval != DAILY_INTERVAL)
             
-            return price_data
+            # Combinar amb el que ja tenim, registrar i guardar al cache
+            return self._store_download(cache_key, cache_path, period, base, series)
             
         except Exception as e:
             print(f"Error obtenint dades de {ticker}: {e}")
             return None
     
+    def _cached_tail(self, cache_key: str, cache_path: Path, period: str) -> Optional[PriceSeries]:
+        """
+        Sèrie que ja tenim per a una clau, encara que hagi caducat (memòria, disc o registre)
+        None si no n'hi ha o si la finestra que falta és més llarga que el període
+        """
+        cached = self._memory_cache.get_entry(str(cache_path)) or read_series(cache_path)
+        series = cached[0] if cached else self._log.replay(cache_key)
+        if not series:
+            return None
+        
+        start = period_start(period)
+        gap = days_since(series.dates[-1])
+        if start is not None and gap > days_since(start):
+            return None  # Més barat (i més simple) tornar a descarregar tot el període
+        return series
+    
+    def _store_download(
+        self,
+        cache_key: str,
+        cache_path: Path,
+        period: str,
+        base: Optional[PriceSeries],
+        downloaded: PriceSeries
+    ) -> PriceSeries:
+        """Afegeix la descàrrega al registre, la combina amb `base` i desa el cache del període"""
+        written = self._log.append(cache_key, downloaded, mode=DELTA if base else FULL, base=base)
+        if base:
+            # Les barres noves guanyen; la finestra del període avança amb elles
+            series = PriceSeries.merge(base, downloaded).slice_dates(period_start(period))
+            print(f"🔁 Delta {cache_key}: {written} barres noves o revisades")
+            self._log.compact(cache_key, series)
+        else:
+            series = downloaded
+        
+        # Es desa encara que no hi hagi barres noves: reinicia el TTL
+        self._write_series_cache(cache_path, series)
+        return series
+    
+    def get_history(
+        self,
+        ticker: str,
+        start: Optional[DateLike] = None,
+        interval: str = DAILY_INTERVAL,
+        force: bool = False
+    ) -> Optional[PriceSeries]:
+        """
+        Històric llarg (5Y, 10Y, MAX) o intradia des de l'emmagatzematge per particions
+        
+        Només es descarrega el que falta: el tram anterior a la cobertura actual quan es
+        demana més història, i la partició en curs quan caduca el TTL.
+        
+        Args:
+            ticker: Símbol de l'empresa
+            start: Primera data (None = tot l'històric disponible)
+            interval: 1d o un interval intradia (1m, 5m, 15m, 30m, 1h)
+            force: Refrescar la partició en curs encara que no hagi caducat
+        """
+        start = self._history_start(start, interval)
+        self.ensure_history(ticker, start, interval, force)
+        return self._partitions.read(ticker, interval, start) or None
+    
+    def ensure_history(
+        self,
+        ticker: str,
+        start: Optional[DateLike] = None,
+        interval: str = DAILY_INTERVAL,
+        force: bool = False
+    ) -> Dict:
+        """Descarrega el que falti de l'històric (sense llegir-lo) i retorna el manifest"""
+        start = self._history_start(start, interval)
+        key = f"history:{ticker}_{interval}"
+        
+        # 1. Història més antiga que encara no tenim
+        if not self._history_covers(self._partitions.manifest(ticker, interval), start):
+            self._flight.do(f"{key}:{start}", lambda: self._extend_history(ticker, interval, start))
+        
+        # 2. Partició en curs (stale-while-revalidate com la resta de preus)
+        ttl_type = "realtime" if interval != DAILY_INTERVAL else "price_data"
+        age = self._partitions.age(ticker, interval)
+        if age is not None:
+            state = EXPIRED if force else cache_state(age, self.cache_ttl[ttl_type], self.cache_grace[ttl_type])
+            refresh = lambda: self._refresh_history_tail(ticker, interval)
+            if state == STALE:
+                self._refresher.schedule(f"{key}:tail", refresh)
+            elif state == EXPIRED:
+                self._flight.do(f"{key}:tail", refresh)
+        
+        return self._partitions.manifest(ticker, interval)
+    
+    @staticmethod
+    def _history_start(start: Optional[DateLike], interval: str) -> Optional[DateLike]:
+        """Yahoo Finance només serveix uns quants dies d'intradia: retalla l'inici"""
+        if interval == DAILY_INTERVAL:
+            return start
+        earliest = to_day(datetime.now().date() - timedelta(days=INTRADAY_MAX_DAYS[interval]))
+        return earliest if start is None else max(to_day(start), earliest)
+    
+    @staticmethod
+    def _history_covers(manifest: Dict, start: Optional[DateLike]) -> bool:
+        """True si les particions ja cobreixen des de `start`"""
+        covered_from = manifest.get("covered_from")
+        if not covered_from:
+            return False
+        if covered_from == "max":
+            return True
+        return start is not None and to_day(covered_from) <= to_day(start)
+    
+    def _extend_history(self, ticker: str, interval: str, start: Optional[DateLike]) -> int:
+        """Descarrega el tram d'història anterior a la cobertura actual (o tot, si no n'hi ha)"""
+        manifest = self._partitions.manifest(ticker, interval)
+        covered_from = manifest.get("covered_from")
+        first_fetch = not covered_from
+        try:
+            hist = yf.Ticker(ticker).history(
+                start=str(start) if start is not None else HISTORY_EPOCH,
+                end=None if first_fetch else covered_from,
+                interval=interval
+            )
+        except Exception as e:
+            print(f"Error obtenint històric de {ticker}: {e}")
+            return 0
+        
+        if hist.empty and first_fetch:
+            print(f"No s'han trobat dades per {ticker}")
+            return 0
+        
+        series = self._series_from_history(hist, intraday=interval != DAILY_INTERVAL)
+        self._partitions.merge(ticker, interval, series)
+        fields = {"covered_from": "max" if start is None else str(start)}
+        if first_fetch:
+            fields["fetched_at"] = time.time()
+        self._partitions.update_manifest(ticker, interval, **fields)
+        return len(series)
+    
+    def _refresh_history_tail(self, ticker: str, interval: str) -> int:
+        """Descarrega només les barres des de l'última data emmagatzemada (delta)"""
+        last = self._partitions.last_date(ticker, interval)
+        if last is None:
+            return 0
+        
+        intraday = interval != DAILY_INTERVAL
+        tail_start = self._history_start(to_day(last), interval)
+        
+        try:
+            hist = yf.Ticker(ticker).history(start=str(tail_start), interval=interval)
+        except Exception as e:
+            print(f"Error refrescant històric de {ticker}: {e}")
+            return 0
+        
+        series = self._series_from_history(hist, intraday=intraday)
+        self._partitions.merge(ticker, interval, series)
+        self._partitions.update_manifest(ticker, interval, fetched_at=time.time())
+        return len(series)
+    
+    @staticmethod
+    def _series_from_history(hist, intraday: bool = False) -> PriceSeries:
+        """Converteix un DataFrame de yfinance (OHLCV) a PriceSeries"""
+        index = hist.index
+        if getattr(index, "tz", None) is not None:
+            index = index.tz_localize(None)
+        
+        return PriceSeries.from_columns(
+            index.values,
+            hist["Open"].to_numpy(),
+            hist["High"].to_numpy(),
+            hist["Low"].to_numpy(),
+            hist["Close"].to_numpy(),
+            hist["Volume"].to_numpy(),
+            intraday=intraday
+        )
+    
     def get_current_price(self, ticker: str) -> Optional[Dict]:
         """
         Obté preu actual i dades del dia
@@ -164,10 +465,9 @@ class StockDataService:
         cache_path = self._get_cache_path(ticker, "realtime")
         
         # Comprovar cache
-        if self._is_cache_valid(cache_path, self.cache_ttl["realtime"]):
-            cached_data = self._read_cache(cache_path)
-            if cached_data:
-                return cached_data
+        cached_data = self._read_json_cache(cache_path, self.cache_ttl["realtime"])
+        if cached_data:
+            return cached_data
         
         # Obtenir dades del dia (més ràpid que info completa)
         try:
@@ -196,7 +496,7 @@ class StockDataService:
             }
             
             # Guardar al cache
-            self._write_cache(cache_path, current_data)
+            self._write_cache(cache_path, current_data, self.cache_ttl["realtime"])
             
             return current_data
             
@@ -204,33 +504,166 @@ class StockDataService:
             print(f"Error obtenint preu actual de {ticker}: {e}")
             return None
     
-    def clear_cache(self, ticker: Optional[str] = None):
-        """Neteja el cache (tot o només un ticker)"""
+    def get_flight_stats(self) -> Dict[str, int]:
+        """Estadístiques de coalescència de descàrregues i refrescos en segon pla"""
+        stats = self._flight.get_stats()
+        stats["background_refreshes"] = self._refresher.scheduled
+        return stats
+    
+    def clear_cache(self, ticker: Optional[str] = None, repair: bool = False):
+        """
+        Neteja el cache (tot o només un ticker)
+        Sense `repair` es conserven el registre de descàrregues i les particions, i la
+        propera lectura només descarrega el delta; amb `repair` s'esborra tot
+        """
         if ticker:
             # Netejar cache d'un ticker específic
-            for cache_file in self.cache_dir.glob(f"{ticker}_*.json"):
-                cache_file.unlink()
-                print(f"Cache eliminat: {cache_file}")
+            prefix = str(self.cache_dir / f"{ticker}_")
+            self._memory_cache.discard_where(lambda key: key.startswith(prefix))
+            for pattern in (f"{ticker}_*.json", f"{ticker}_*.bin"):
+                for cache_file in self.cache_dir.glob(pattern):
+                    cache_file.unlink()
+                    print(f"Cache eliminat: {cache_file}")
+            if repair:
+                self._log.clear(f"{ticker}_")
+                self._partitions.clear(ticker)
         else:
             # Netejar tot el cache
-            for cache_file in self.cache_dir.glob("*.json"):
-                cache_file.unlink()
+            prefix = str(self.cache_dir)
+            self._memory_cache.discard_where(lambda key: key.startswith(prefix))
+            for pattern in ("*.json", "*.bin"):
+                for cache_file in self.cache_dir.glob(pattern):
+                    cache_file.unlink()
+            if repair:
+                self._log.clear()
+                self._partitions.clear()
             print("Tot el cache ha estat eliminat")
     
-    def get_multiple_tickers(self, tickers: List[str], period: str = "1y") -> Dict[str, List[Dict]]:
+    def get_multiple_tickers(
+        self,
+        tickers: List[str],
+        period: str = "1y",
+        interval: str = "1d"
+    ) -> Dict[str, PriceSeries]:
         """
         Obté dades per múltiples tickers de cop
-        Més eficient per actualitzacions massives
+        Els tickers amb cache vàlid es llegeixen del disc; la resta es descarreguen
+        en una sola petició multi-símbol i es desen com a entrades de cache individuals
+        Els caducats dins la gràcia es retornen de seguida i es refresquen en un lot en segon pla
         """
         results = {}
+        cold = []
+        stale = []
         
         for ticker in tickers:
-            data = self.get_historical_data(ticker, period=period)
-            if data:
-                results[ticker] = data
+            cached, state = self._read_series_cache(self._get_series_path(f"{ticker}_{period}_{interval}"))
+            if cached:
+                results[ticker] = cached
+                if state == STALE:
+                    stale.append(ticker)
             else:
-                print(f"No s'han pogut obtenir dades per {ticker}")
+                cold.append(ticker)
+        
+        if stale:
+            self._refresher.schedule(
+                f"batch:{','.join(sorted(stale))}_{period}_{interval}",
+                lambda: self._fetch_batch_delta(stale, period, interval)
+            )
+        
+        if cold:
+            batch = self._flight.do(
+                f"batch:{','.join(sorted(cold))}_{period}_{interval}",
+                lambda: self._fetch_batch_delta(cold, period, interval)
+            )
+            results.update(batch)
+        
+        for ticker in tickers:
+            if ticker not in results:
+                # Fallback individual per tickers que el lot no ha retornat
+                data = self.get_historical_data(ticker, period=period, interval=interval)
+                if data:
+                    results[ticker] = data
+                else:
+                    print(f"No s'han pogut obtenir dades per {ticker}")
+        
+        return results
+    
+    def _fetch_batch_delta(self, tickers: List[str], period: str, interval: str) -> Dict[str, PriceSeries]:
+        """
+        Lot en dues peticions com a molt: els tickers que ja tenen cua en cache només
+        demanen les barres des de la seva última data (la més antiga del grup); la resta,
+        tot el període
+        """
+        bases = {}
+        for ticker in tickers:
+            cache_key = f"{ticker}_{period}_{interval}"
+            base = self._cached_tail(cache_key, self._get_series_path(cache_key), period)
+            if base:
+                bases[ticker] = base
+        
+        results = {}
+        if bases:
+            since = min(base.dates[-1].astype("datetime64[D]") for base in bases.values())
+            results.update(self._fetch_batch(list(bases), period, interval, bases, start=str(since)))
+        full = [t for t in tickers if t not in bases]
+        if full:
+            results.update(self._fetch_batch(full, period, interval))
+        return results
+    
+    def _fetch_batch(
+        self,
+        tickers: List[str],
+        period: str,
+        interval: str,
+        bases: Optional[Dict[str, PriceSeries]] = None,
+        start: Optional[str] = None
+    ) -> Dict[str, PriceSeries]:
+        """Descarrega diversos tickers en una sola crida i desa un cache per ticker"""
+        bases = bases or {}
+        window = {"start": start} if start else {"period": period}
+        try:
+            data = self._download(
+                tickers,
+                interval=interval,
+                group_by="ticker",
+                auto_adjust=True,  # Mateix criteri que Ticker.history
+                threads=True,
+                progress=False,
+                **window
+            )
+        except Exception as e:
+            print(f"Error en la descàrrega en lot ({len(tickers)} tickers): {e}")
+            return {}
+        
+        if data is None or data.empty:
+            return {}
+        
+        results = {}
+        multi = getattr(data.columns, "nlevels", 1) > 1
+        for ticker in tickers:
+            if multi:
+                if ticker not in data.columns.get_level_values(0):
+                    continue
+                hist = data[ticker]
+            elif len(tickers) == 1:
+                hist = data
+            else:
+                continue
+            
+            hist = hist.dropna(how="all")
+            if hist.empty:
+                continue
+            
+            cache_key = f"{ticker}_{period}_{interval}"
+            results[ticker] = self._store_download(
+                cache_key,
+                self._get_series_path(cache_key),
+                period,
+                bases.get(ticker),
+                self._series_from_history(hist, intraday=interval != DAILY_INTERVAL)
+            )
         
+        print(f"✅ Descàrrega en lot: {len(results)}/{len(tickers)} tickers")
         return results
 
 
@@ -0,0 +1,32 @@
+// Cotitzacions en directe via Server-Sent Events (/api/stream/quotes)
+// Actualitza els elements marcats amb data-live-price="TICKER" i data-live-change="TICKER"
+function subscribeLiveQuotes(tickers) {
+    if (!window.EventSource || !tickers.length) {
+        return null;
+    }
+    const source = new EventSource('/api/stream/quotes?tickers=' + encodeURIComponent(tickers.join(',')));
+
+    source.addEventListener('quote', function(event) {
+        const quote = JSON.parse(event.data);
+
+        document.querySelectorAll('[data-live-price="' + quote.ticker + '"]').forEach(el => {
+            el.textContent = quote.current_price.toFixed(2);
+        });
+
+        // Mateixa insígnia que el render del servidor: verd si puja, vermell si baixa
+        document.querySelectorAll('[data-live-change="' + quote.ticker + '"]').forEach(el => {
+            const badge = el.firstElementChild;
+            if (!badge) return;
+            const up = quote.change_percent >= 0;
+            badge.classList.toggle('bg-green-100', up);
+            badge.classList.toggle('text-green-800', up);
+            badge.classList.toggle('bg-red-100', !up);
+            badge.classList.toggle('text-red-800', !up);
+            badge.textContent = (up ? '▲ ' : '▼ ') + Math.abs(quote.change_percent).toFixed(2) + '%';
+        });
+    });
+
+    // EventSource es reconnecta sol si es talla la connexió
+    window.addEventListener('beforeunload', () => source.close());
+    return source;
+}
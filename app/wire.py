@@ -0,0 +1,68 @@
+"""
+Formats de resposta de l'API de sèries
+
+- json: llista d'objectes PriceData (format per defecte, compatible)
+- columnar: JSON amb una llista per camp (sense claus repetides per barra)
+- binary: columnes little-endian empaquetades, el mateix format que el cache en disc
+  (capçalera de 64 bytes + dates int64, open/high/low/close float64, volume int64)
+
+El format es tria amb `format=` o, si no s'indica, amb la capçalera Accept.
+Els formats compactes es generen directament de les columnes de NumPy, sense models Pydantic.
+"""
+
+from typing import Dict, Optional, Tuple
+
+from fastapi.responses import Response
+
+from app.responses import dumps
+from app.series import PriceSeries
+from app.services.series_cache import encode_series
+
+FORMATS: Tuple[str, ...] = ("json", "columnar", "binary")
+
+COLUMNAR_MEDIA_TYPE = "application/vnd.catalunya.series.columnar+json"
+BINARY_MEDIA_TYPE = "application/vnd.catalunya.series"
+
+# Tipus MIME acceptats a la capçalera Accept per a cada format compacte
+_ACCEPT_FORMATS = {
+    COLUMNAR_MEDIA_TYPE: "columnar",
+    BINARY_MEDIA_TYPE: "binary",
+    "application/octet-stream": "binary"
+}
+
+
+def negotiate_format(format: Optional[str], accept: Optional[str]) -> Optional[str]:
+    """
+    Format de resposta: el paràmetre `format` té prioritat; si no, el primer tipus
+    compacte de la capçalera Accept; per defecte json. None si `format` no és vàlid
+    """
+    if format is not None:
+        return format if format in FORMATS else None
+    for part in (accept or "").split(","):
+        media_type = part.split(";")[0].strip().lower()
+        if media_type in _ACCEPT_FORMATS:
+            return _ACCEPT_FORMATS[media_type]
+    return "json"
+
+
+def columnar_payload(series: PriceSeries, meta: Dict) -> bytes:
+    """Cos JSON columnar: metadades de la sèrie + `columns` amb una llista per camp"""
+    payload = dict(meta)
+    payload["columns"] = series.to_columns()
+    return dumps(payload)
+
+
+def columnar_response(series: PriceSeries, meta: Dict) -> Response:
+    """Resposta JSON columnar"""
+    return Response(content=columnar_payload(series, meta), media_type=COLUMNAR_MEDIA_TYPE)
+
+
+def binary_response(series: PriceSeries, meta: Dict) -> Response:
+    """Resposta binària; les metadades van a capçaleres X-Series-*"""
+    headers = {
+        f"X-Series-{key.replace('_', '-').title()}": str(value)
+        for key, value in meta.items()
+        if value is not None
+    }
+    body = b"".join(encode_series(series, source=meta.get("ticker", "")))
+    return Response(content=body, media_type=BINARY_MEDIA_TYPE, headers=headers)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark de peticions per segon de les rutes calentes de l'API
+
+Compara les rutes actuals (codificació ràpida + bytes precodificats per versió de dades)
+amb el camí anterior (response_model de FastAPI + models Pydantic + json estàndard),
+reproduït en una aplicació mínima dins d'aquest script amb el mateix DataManager.
+
+Executa les aplicacions en el mateix procés via httpx.ASGITransport.
+
+Requereix: pip install httpx
+Ús: python scripts/bench_api_throughput.py [--requests 500] [--concurrency 10]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import List
+
+# Afegir directori arrel al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import httpx
+from fastapi import FastAPI
+
+from app.db import db
+from app.main import app
+from app.models import CompanyKPI, SeriesResponse
+from app.responses import ORJSON_AVAILABLE
+
+
+def build_legacy_app() -> FastAPI:
+    """Rutes tal com eren abans: response_model valida i codifica cada resposta"""
+    legacy = FastAPI()
+
+    @legacy.get("/api/companies", response_model=List[CompanyKPI])
+    async def legacy_companies():
+        return await db.aget_company_kpis()
+
+    @legacy.get("/api/companies/{ticker}/series", response_model=SeriesResponse)
+    async def legacy_series(ticker: str, range: str = "1Y"):
+        prices = await db.aget_series_data(ticker, range)
+        return SeriesResponse(ticker=ticker, range=range, prices=prices.to_models())
+
+    return legacy
+
+
+async def requests_per_second(application, url: str, n: int, concurrency: int) -> float:
+    """Llança n peticions amb concurrència limitada i retorna peticions/segon"""
+    transport = httpx.ASGITransport(app=application)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        (await client.get(url)).raise_for_status()  # Escalfar caches
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with semaphore:
+                response = await client.get(url)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(n)))
+        return n / (time.perf_counter() - start)
+
+
+async def run(n_requests: int, concurrency: int):
+    legacy = build_legacy_app()
+    ticker = db.get_companies()[0].ticker
+    # MAX: les dades mock no cobreixen necessàriament l'últim any
+    urls = ["/api/companies", f"/api/companies/{ticker}/series?range=MAX"]
+
+    print(f"{'Ruta':<40} {'Abans (req/s)':>14} {'Ara (req/s)':>12} {'Millora':>9}")
+    print("-" * 78)
+    for url in urls:
+        try:
+            before = await requests_per_second(legacy, url, n_requests, concurrency)
+            after = await requests_per_second(app, url, n_requests, concurrency)
+        except httpx.HTTPStatusError as e:
+            print(f"{url:<40} ⚠️  s'omet ({e.response.status_code}: sense dades per aquesta ruta)")
+            continue
+        print(f"{url:<40} {before:>14.0f} {after:>12.0f} {after / before:>8.1f}x")
+    print()
+    print(f"Encoder: {'orjson' if ORJSON_AVAILABLE else 'json (stdlib)'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de peticions/segon de l'API")
+    parser.add_argument("--requests", type=int, default=500, help="Peticions per ruta")
+    parser.add_argument("--concurrency", type=int, default=10, help="Peticions simultànies")
+    args = parser.parse_args()
+
+    print("=" * 78)
+    print("🧪 BENCHMARK: throughput de les rutes calentes de l'API")
+    print("=" * 78)
+    asyncio.run(run(args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
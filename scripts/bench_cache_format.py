@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark del cache en disc: JSON indentat (format anterior) vs binari columnar
+
+Mesura mida del fitxer, temps d'escriptura i temps de lectura calenta
+(fitxer a la page cache del sistema) per sèries d'1 i 10 anys.
+
+Ús: python scripts/bench_cache_format.py [--repeat 50]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, Dict
+
+# Afegir directori arrel al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.series import PriceSeries
+from app.services.series_cache import read_series, write_series
+
+
+def generate_series(n_bars: int) -> PriceSeries:
+    """Genera una sèrie sintètica de barres diàries"""
+    records = []
+    day = date(2015, 1, 1)
+    price = 100.0
+    for _ in range(n_bars):
+        price *= 1 + random.gauss(0, 0.02)
+        records.append({
+            "date": day.isoformat(),
+            "open": price * 0.99,
+            "high": price * 1.01,
+            "low": price * 0.98,
+            "close": price,
+            "volume": random.randint(10000, 1000000)
+        })
+        day += timedelta(days=1)
+    return PriceSeries.from_records(records)
+
+
+def json_write(path: Path, series: PriceSeries):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(series.to_records(), f, indent=2, ensure_ascii=False)
+
+
+def json_read(path: Path) -> PriceSeries:
+    path.stat()  # El codi anterior feia stat() per comprovar el TTL
+    with open(path, 'r', encoding='utf-8') as f:
+        return PriceSeries.from_records(json.load(f))
+
+
+def binary_write(path: Path, series: PriceSeries):
+    write_series(path, series, source="bench")
+
+
+def binary_read(path: Path) -> PriceSeries:
+    return read_series(path)[0]
+
+
+def timed(fn: Callable, repeat: int) -> float:
+    """Temps mitjà en ms"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def bench(series: PriceSeries, directory: Path, repeat: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for name, write, read, suffix in [
+        ("JSON indent=2", json_write, json_read, ".json"),
+        ("Binari mmap", binary_write, binary_read, ".bin"),
+    ]:
+        path = directory / f"series{suffix}"
+        write_ms = timed(lambda: write(path, series), repeat)
+        read_ms = timed(lambda: read(path), repeat)
+        # Accés a una columna sencera (força la lectura real de les pàgines)
+        touch_ms = timed(lambda: float(read(path).close.sum()), repeat)
+        results[name] = {
+            "size_kb": path.stat().st_size / 1024,
+            "write_ms": write_ms,
+            "read_ms": read_ms,
+            "read_sum_ms": touch_ms,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON vs cache binari")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    random.seed(42)
+    print("=" * 86)
+    print("🧪 BENCHMARK: format del cache en disc")
+    print("=" * 86)
+    print(f"{'Barres':>7} {'Format':<15} {'Mida (KB)':>10} {'Escriptura (ms)':>16} {'Lectura (ms)':>13} {'Lectura+suma (ms)':>18}")
+    print("-" * 86)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for years in (1, 10):
+            series = generate_series(252 * years)
+            for name, stats in bench(series, Path(tmp), args.repeat).items():
+                print(f"{len(series):>7} {name:<15} {stats['size_kb']:>10.1f} {stats['write_ms']:>16.3f} "
+                      f"{stats['read_ms']:>13.3f} {stats['read_sum_ms']:>18.3f}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark dels indicadors: recàlcul complet vs avanç incremental (IndicatorStore)
+
+Simula refrescos diaris del cache d'1 any: cada dia entra una barra nova i en surt
+la més antiga (finestra lliscant), i de tant en tant es revisa l'última barra.
+Comprova que el magatzem avança en O(1) i que el resultat coincideix amb el recàlcul.
+
+Ús: python scripts/bench_indicators.py [--days 1000] [--window 252]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+# Afegir directori arrel al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.indicators import IndicatorState, IndicatorStore
+from app.series import PriceSeries
+
+from bench_series_store import generate_records
+
+# Diferència màxima acceptada respecte al recàlcul (llavor de l'EMA/RSI)
+TOLERANCE = 1e-5
+
+
+def max_difference(a, b) -> float:
+    worst = 0.0
+    for field, expected in b.model_dump().items():
+        value = getattr(a, field)
+        if isinstance(expected, float) and isinstance(value, float):
+            worst = max(worst, abs(value - expected))
+        elif value != expected:
+            return float("inf")
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark d'indicadors incrementals")
+    parser.add_argument("--days", type=int, default=1000, help="Refrescos simulats")
+    parser.add_argument("--window", type=int, default=252, help="Barres de la finestra lliscant")
+    args = parser.parse_args()
+
+    random.seed(42)
+    records = generate_records(args.window + args.days)
+    windows = [PriceSeries.from_records(records[day:day + args.window]) for day in range(args.days + 1)]
+    # Cada 5 dies, l'última barra es revisa (p. ex. la del dia en curs amb un preu nou)
+    revised = {}
+    for day in range(0, args.days + 1, 5):
+        window = records[day:day + args.window]
+        revised[day] = PriceSeries.from_records(window[:-1] + [dict(window[-1], close=window[-1]["close"] * 1.01)])
+
+    store = IndicatorStore()
+    version = 0
+    start = time.perf_counter()
+    for day, series in enumerate(windows):
+        if day in revised:
+            version += 1
+            store.get("T", version, revised[day])
+        version += 1
+        store.get("T", version, series)
+    incremental_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for day, series in enumerate(windows):
+        if day in revised:
+            IndicatorState.from_series(revised[day]).snapshot("T", revised[day])
+        IndicatorState.from_series(series).snapshot("T", series)
+    full_s = time.perf_counter() - start
+
+    check = IndicatorStore()
+    worst = 0.0
+    for day, series in enumerate(windows):
+        expected = IndicatorState.from_series(series).snapshot("T", series)
+        worst = max(worst, max_difference(check.get("T", day, series), expected))
+
+    print("=" * 70)
+    print(f"🧪 BENCHMARK: indicadors, finestra lliscant de {args.window} barres × {args.days} dies")
+    print("=" * 70)
+    print(f"   Recàlcul complet: {full_s * 1000:>10.1f} ms")
+    print(f"   Incremental:      {incremental_s * 1000:>10.1f} ms  {store.stats}")
+    print(f"   Diferència màxima amb el recàlcul: {worst:.2e}")
+    print()
+
+    # L'avanç O(1) ha de córrer sobre la finestra lliscant (només el primer dia és complet)
+    if check.stats["full"] != 1 or check.stats["incremental"] != args.days:
+        print(f"❌ La finestra lliscant no avança incrementalment: {check.stats}")
+        sys.exit(1)
+    if worst > TOLERANCE:
+        print(f"❌ Els indicadors incrementals difereixen del recàlcul ({worst:.2e})")
+        sys.exit(1)
+    print("✅ Avanç incremental sobre la finestra lliscant")
+
+
+if __name__ == "__main__":
+    main()
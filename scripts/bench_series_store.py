@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark del magatzem de sèries: llistes de PriceData vs PriceSeries columnar
+
+Mesura memòria (tracemalloc) i latència de construcció i de lectura típica
+(KPIs + últim any) per 1, 100 i 1000 tickers × 10 anys de barres diàries.
+
+Ús: python scripts/bench_series_store.py [--tickers 1 100 1000] [--years 10] [--legacy-max 100]
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+from typing import Callable, Dict, List
+
+# Afegir directori arrel al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models import PriceData
+from app.series import PriceSeries
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+def generate_records(n_bars: int) -> List[Dict]:
+    """Genera barres diàries sintètiques (random walk)"""
+    records = []
+    day = date(2015, 1, 1)
+    price = 100.0
+    for _ in range(n_bars):
+        while day.weekday() >= 5:
+            day += timedelta(days=1)
+        price *= 1 + random.gauss(0, 0.02)
+        records.append({
+            "date": day.isoformat(),
+            "open": price * 0.99,
+            "high": price * 1.01,
+            "low": price * 0.98,
+            "close": price,
+            "volume": random.randint(10000, 1000000)
+        })
+        day += timedelta(days=1)
+    return records
+
+
+def build_legacy(records: List[Dict]) -> List[PriceData]:
+    return [PriceData(**r) for r in records]
+
+
+def build_columnar(records: List[Dict]) -> PriceSeries:
+    return PriceSeries.from_records(records)
+
+
+def read_legacy(prices: List[PriceData]):
+    """Lectura típica del codi anterior: ordenar, 52 setmanes i filtrar últim any"""
+    prices.sort(key=lambda x: x.date, reverse=True)
+    max(p.high for p in prices[:252])
+    min(p.low for p in prices[:252])
+    cutoff = prices[min(len(prices) - 1, 252)].date
+    [p for p in prices if p.date >= cutoff]
+
+
+def read_columnar(series: PriceSeries):
+    series.high[-252:].max()
+    series.low[-252:].min()
+    series[-252:]
+
+
+def measure(n_tickers: int, records: List[Dict], build: Callable, read: Callable) -> Dict[str, float]:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    store = {f"T{i}": build(records) for i in range(n_tickers)}
+    build_s = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for series in store.values():
+        read(series)
+    read_s = time.perf_counter() - start
+
+    del store
+    gc.collect()
+    return {"mem_mb": current / 1024 / 1024, "build_ms": build_s * 1000, "read_ms": read_s * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PriceData vs PriceSeries")
+    parser.add_argument("--tickers", type=int, nargs="+", default=[1, 100, 1000])
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--legacy-max", type=int, default=1000,
+                        help="No mesurar llistes de PriceData per sobre d'aquest nombre de tickers")
+    args = parser.parse_args()
+
+    random.seed(42)
+    records = generate_records(args.years * TRADING_DAYS_PER_YEAR)
+
+    print("=" * 78)
+    print(f"🧪 BENCHMARK: magatzem de sèries ({len(records)} barres per ticker)")
+    print("=" * 78)
+    print(f"{'Tickers':>8} {'Format':<14} {'Memòria (MB)':>14} {'Construcció (ms)':>18} {'Lectura (ms)':>14}")
+    print("-" * 78)
+
+    for n in args.tickers:
+        formats = [("PriceSeries", build_columnar, read_columnar)]
+        if n <= args.legacy_max:
+            formats.insert(0, ("PriceData[]", build_legacy, read_legacy))
+        for name, build, read in formats:
+            stats = measure(n, records, build, read)
+            print(f"{n:>8} {name:<14} {stats['mem_mb']:>14.1f} {stats['build_ms']:>18.1f} {stats['read_ms']:>14.2f}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
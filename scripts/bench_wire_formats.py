@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark dels formats de resposta de l'API de sèries
+
+Compara, per sèries d'1 i 10 anys, la mida del cos (en brut i amb gzip) i el temps
+de serialització de:
+  - response_model: llista de PriceData validada i codificada com fa FastAPI
+  - columnar: JSON amb una llista per camp, des de les columnes de NumPy
+  - binary: columnes little-endian empaquetades (format del cache en disc)
+
+Ús: python scripts/bench_wire_formats.py [--repeat 50]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from typing import Callable
+
+import numpy as np
+
+# Afegir directori arrel al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.encoders import jsonable_encoder
+
+from app.models import SeriesResponse
+from app.series import PriceSeries
+from app.services.series_cache import encode_series
+from app.wire import columnar_payload
+
+
+def generate_series(n_bars: int) -> PriceSeries:
+    """Genera una sèrie sintètica de barres diàries"""
+    rng = np.random.default_rng(42)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n_bars)))
+    dates = np.datetime64("2015-01-01") + np.arange(n_bars)
+    return PriceSeries.from_columns(
+        dates, close * 0.99, close * 1.01, close * 0.98, close, rng.integers(10000, 1000000, n_bars)
+    )
+
+
+def response_model_body(series: PriceSeries) -> bytes:
+    """Camí actual: models Pydantic + validació del response_model + jsonable_encoder + json"""
+    response = SeriesResponse(ticker="BENCH", range="1Y", prices=series.to_models())
+    validated = SeriesResponse.model_validate(response.model_dump())
+    return json.dumps(jsonable_encoder(validated)).encode("utf-8")
+
+
+def columnar_body(series: PriceSeries) -> bytes:
+    return columnar_payload(series, {"ticker": "BENCH", "range": "1Y"})
+
+
+def binary_body(series: PriceSeries) -> bytes:
+    return b"".join(encode_series(series, source="BENCH"))
+
+
+def timed(fn: Callable, repeat: int) -> float:
+    """Temps mitjà en ms"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de formats de l'API de sèries")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print("=" * 78)
+    print("🧪 BENCHMARK: formats de resposta de /api/companies/{ticker}/series")
+    print("=" * 78)
+    print(f"{'Barres':>7} {'Format':<16} {'Mida (KB)':>10} {'gzip (KB)':>10} {'Serialitzar (ms)':>17} {'vs actual':>10}")
+    print("-" * 78)
+
+    for years in (1, 10):
+        series = generate_series(252 * years)
+        baseline_ms = None
+        for name, encode in [
+            ("response_model", response_model_body),
+            ("columnar", columnar_body),
+            ("binary", binary_body),
+        ]:
+            body = encode(series)
+            ms = timed(lambda: encode(series), args.repeat)
+            baseline_ms = baseline_ms or ms
+            print(f"{len(series):>7} {name:<16} {len(body) / 1024:>10.1f} {len(gzip.compress(body)) / 1024:>10.1f} "
+                  f"{ms:>17.3f} {baseline_ms / ms:>9.1f}x")
+    print()
+
+
+if __name__ == "__main__":
+    main()
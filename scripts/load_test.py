@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Prova de càrrega: latència de /health i /api/companies (cache calent)
+mentre una descàrrega freda (lenta) s'està executant.
+
+Executa l'aplicació en el mateix procés via httpx.ASGITransport, de manera que
+qualsevol crida bloquejant dins d'una ruta async es veu com un augment del p99.
+
+Requereix: pip install httpx
+Ús: python scripts/load_test.py [--requests 200] [--cold-seconds 3]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Dict, List
+
+# Afegir directori arrel al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import httpx
+
+from app.main import app
+from app.db import db
+from app.series import DAILY_INTERVAL
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil simple (nearest-rank)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def install_slow_series(cold_seconds: float, cold_ticker: str):
+    """Simula una descàrrega freda d'upstream per un ticker (com yfinance amb cache caducat)"""
+    original = db.get_series_data
+
+    def slow_get_series_data(ticker: str, range_param: str = "1Y", start=None, end=None, interval=DAILY_INTERVAL):
+        if ticker == cold_ticker:
+            time.sleep(cold_seconds)
+        return original(ticker, range_param, start, end, interval)
+
+    db.get_series_data = slow_get_series_data
+
+
+async def measure(client: httpx.AsyncClient, url: str, n: int, concurrency: int) -> List[float]:
+    """Llança n peticions amb concurrència limitada i retorna latències en ms"""
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(url)
+            latencies.append((time.perf_counter() - start) * 1000)
+            response.raise_for_status()
+
+    await asyncio.gather(*(one() for _ in range(n)))
+    return latencies
+
+
+def summary(latencies: List[float]) -> Dict[str, float]:
+    return {
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies) if latencies else 0.0,
+    }
+
+
+async def run(n_requests: int, concurrency: int, cold_seconds: float):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        # Escalfar cache de KPIs
+        await client.get("/api/companies")
+
+        companies = db.get_companies()
+        cold_ticker = companies[0].ticker
+        install_slow_series(cold_seconds, cold_ticker)
+
+        results = {}
+        for url in ["/health", "/api/companies"]:
+            results[(url, "sense descàrrega")] = summary(await measure(client, url, n_requests, concurrency))
+
+        for url in ["/health", "/api/companies"]:
+            cold = asyncio.create_task(client.get(f"/api/companies/{cold_ticker}/series?range=3M"))
+            await asyncio.sleep(0.05)  # Assegurar que la descàrrega freda ja és en curs
+            latencies = await measure(client, url, n_requests, concurrency)
+            results[(url, "amb descàrrega")] = summary(latencies)
+            still_running = not cold.done()
+            await cold
+            if not still_running:
+                print(f"⚠️  La descàrrega freda ha acabat abans que les mesures de {url}")
+
+    print()
+    print(f"{'Ruta':<18} {'Escenari':<18} {'p50 (ms)':>10} {'p99 (ms)':>10} {'max (ms)':>10}")
+    print("-" * 70)
+    for (url, scenario), stats in results.items():
+        print(f"{url:<18} {scenario:<18} {stats['p50']:>10.2f} {stats['p99']:>10.2f} {stats['max']:>10.2f}")
+    print()
+    print(f"Descàrrega freda simulada: {cold_seconds:.1f}s per {cold_ticker}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prova de càrrega amb descàrrega freda concurrent")
+    parser.add_argument("--requests", type=int, default=200, help="Peticions per escenari")
+    parser.add_argument("--concurrency", type=int, default=20, help="Peticions simultànies")
+    parser.add_argument("--cold-seconds", type=float, default=3.0, help="Durada de la descàrrega freda")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("🧪 LOAD TEST: latència amb descàrregues fredes en curs")
+    print("=" * 70)
+    asyncio.run(run(args.requests, args.concurrency, args.cold_seconds))
+
+
+if __name__ == "__main__":
+    main()
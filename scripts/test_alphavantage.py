@@ -70,8 +70,8 @@ def test_alphavantage():
                 history = service.get_historical_data(ticker, period="1mo")
                 if history:
                     print(f"   ✅ {len(history)} dies de dades")
-                    print(f"      Primer: {history[0]['date']}")
-                    print(f"      Últim: {history[-1]['date']}")
+                    print(f"      Primer: {history.bar(0).date}")
+                    print(f"      Últim: {history.latest().date}")
                     print()
                 else:
                     print(f"   ❌ No s'han pogut obtenir dades històriques")
@@ -58,7 +58,7 @@ def test_real_data():
             
             # Mostrar últimes 5 dades
             print("Últimes 5 sessions:")
-            for price in sorted(prices, key=lambda x: x.date, reverse=True)[:5]:
+            for price in prices[-5:].reversed().to_models():
                 print(f"   {price.date}: €{price.close:.2f} (Vol: {price.volume:,})")
             print()
             